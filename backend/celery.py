@@ -3,8 +3,11 @@ from __future__ import absolute_import, unicode_literals
 import os
 
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from django.conf import settings
 
+from reservations.metrics import mark_process_dead
+
 # setting the Django settings module.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings.DJANGO_SETTINGS_MODULE)
 app = Celery("backend")
@@ -16,4 +19,33 @@ app.autodiscover_tasks()
 app.conf.update(
     BROKER_URL=settings.BROKER_URL, CELERY_RESULT_BACKEND=settings.CELERY_RESULT_BACKEND
 )
-app.conf.broker_transport_options = {"visibility_timeout": 1209600}  # 14 days
+app.conf.broker_transport_options = {
+    "visibility_timeout": settings.BROKER_VISIBILITY_TIMEOUT_SECONDS
+}
+app.conf.beat_schedule = {
+    "crawl-slots": {
+        "task": "reservations.tasks.crawl_slots",
+        "schedule": settings.SLOT_CRAWL_INTERVAL_SECONDS,
+    },
+    "dispatch-reservation-jobs": {
+        "task": "reservations.tasks.dispatch_reservation_jobs",
+        "schedule": settings.RESERVATION_DISPATCH_INTERVAL_SECONDS,
+    },
+    "drain-notifications": {
+        "task": "reservations.tasks.drain_notifications",
+        "schedule": settings.NOTIFICATION_DRAIN_INTERVAL_SECONDS,
+    },
+    "check-baskets": {
+        "task": "reservations.tasks.check_baskets",
+        "schedule": settings.BASKET_CHECK_INTERVAL_SECONDS,
+    },
+    "prune-reservation-attempts": {
+        "task": "reservations.tasks.prune_reservation_attempts",
+        "schedule": 24 * 60 * 60,
+    },
+}
+
+
+@worker_process_shutdown.connect
+def remove_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
@@ -166,6 +166,14 @@ CELERY_RESULT_BACKEND = env("REDIS_URL")
 CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# Must outlive the furthest ETA in the broker, unacked tasks are redelivered
+# after it. Raise it to the reservation horizon without the dispatcher.
+BROKER_VISIBILITY_TIMEOUT_SECONDS = env(
+    "BROKER_VISIBILITY_TIMEOUT_SECONDS", cast=int, default=3600
+)
+# Revoked task ids are kept in this file, so a restarted worker still skips
+# the ETA jobs cancelled before it went down
+CELERY_WORKER_STATE_DB = env("CELERY_WORKER_STATE_DB", default=None)
 
 DEFAULT_TASK_COUNTDOWN_MINUTES = env(
     "DEFAULT_TASK_COUNTDOWN_MINUTES", cast=int, default=3
@@ -174,11 +182,174 @@ DEFAULT_TASK_COUNTDOWN_SECONDS = env(
     "DEFAULT_TASK_COUNTDOWN_SECONDS", cast=int, default=10
 )
 
+# Try the other courts at the same time when the selected one has no slot
+COURT_FAN_OUT_PARALLEL = env("COURT_FAN_OUT_PARALLEL", cast=bool, default=True)
+
+# Pacing between upstream requests of a reservation chain, "fast" or "polite"
+RESERVATION_PACING_MODE = env("RESERVATION_PACING_MODE", default="fast")
+RESERVATION_PACING_MIN_GAP_SECONDS = env(
+    "RESERVATION_PACING_MIN_GAP_SECONDS", cast=float, default=0
+)
+RESERVATION_PACING_JITTER_SECONDS = env(
+    "RESERVATION_PACING_JITTER_SECONDS", cast=float, default=0
+)
+
+# Cached court form state, lets a chain land on the court page in one request
+FORM_STATE_CACHE_ENABLED = env("FORM_STATE_CACHE_ENABLED", cast=bool, default=True)
+FORM_STATE_CACHE_TTL_SECONDS = env(
+    "FORM_STATE_CACHE_TTL_SECONDS", cast=int, default=3600
+)
+
+# Slot availability snapshots served by the show slots endpoint
+SLOT_CACHE_ENABLED = env("SLOT_CACHE_ENABLED", cast=bool, default=True)
+SLOT_CACHE_TTL_SECONDS = env("SLOT_CACHE_TTL_SECONDS", cast=int, default=30)
+SLOT_CACHE_STALE_TTL_SECONDS = env(
+    "SLOT_CACHE_STALE_TTL_SECONDS", cast=int, default=600
+)
+# Requests missing a snapshot wait this long for the one request fetching it
+SLOT_CACHE_FILL_WAIT_SECONDS = env("SLOT_CACHE_FILL_WAIT_SECONDS", cast=int, default=15)
+
+# ETA reservation jobs log in and fill the form this many seconds before the
+# slot opens, then wait for the opening instant
+RESERVATION_PREWARM_SECONDS = env("RESERVATION_PREWARM_SECONDS", cast=int, default=30)
+
+# ETA jobs stay in the database until they are due within the dispatch
+# window, a periodic dispatcher then hands them to the broker
+RESERVATION_DISPATCHER_ENABLED = env(
+    "RESERVATION_DISPATCHER_ENABLED", cast=bool, default=True
+)
+RESERVATION_DISPATCH_INTERVAL_SECONDS = env(
+    "RESERVATION_DISPATCH_INTERVAL_SECONDS", cast=int, default=10
+)
+RESERVATION_DISPATCH_WINDOW_SECONDS = env(
+    "RESERVATION_DISPATCH_WINDOW_SECONDS", cast=int, default=120
+)
+RESERVATION_DISPATCH_BATCH_SIZE = env(
+    "RESERVATION_DISPATCH_BATCH_SIZE", cast=int, default=500
+)
+
+# Longest a reservation chain may hold the lock of its user and selection,
+# warming up included
+RESERVATION_LOCK_TIMEOUT_SECONDS = env(
+    "RESERVATION_LOCK_TIMEOUT_SECONDS", cast=int, default=300
+)
+
+# ETA jobs opening at the same instant are fired together by one burst task
+RESERVATION_BURST_ENABLED = env("RESERVATION_BURST_ENABLED", cast=bool, default=True)
+
+# When set, every sync reservation chain records its upstream responses into a
+# gzipped transcript file in this directory of the worker running it. Cookies
+# and member pages are redacted, the court pages are kept as served.
+RESERVATION_TRANSCRIPT_DIR = env("RESERVATION_TRANSCRIPT_DIR", default=None)
+
+# The site reservations are made on, pointed at reservations.fake_upstream
+# for load tests
+UPSTREAM_BASE_URL = env("UPSTREAM_BASE_URL", default="https://online.spor.istanbul")
+
+# Persist a trace of every reservation chain run with its step timings
+RESERVATION_ATTEMPTS_ENABLED = env(
+    "RESERVATION_ATTEMPTS_ENABLED", cast=bool, default=True
+)
+# Slot fetches and crawls are left out, they run far more often than the
+# chains touching the cart
+RESERVATION_ATTEMPT_CHAIN_TYPES = env.list(
+    "RESERVATION_ATTEMPT_CHAIN_TYPES",
+    default=["reserve", "remove-basket", "check-basket"],
+)
+# Older attempts are deleted by prune_reservation_attempts once a day
+RESERVATION_ATTEMPT_RETENTION_DAYS = env(
+    "RESERVATION_ATTEMPT_RETENTION_DAYS", cast=int, default=30
+)
+
+# Concurrent court fetches of the multi court show slots endpoint
+SLOT_FETCH_MAX_WORKERS = env("SLOT_FETCH_MAX_WORKERS", cast=int, default=4)
+
+# Periodic slot availability crawler, logs in upstream as this user
+SLOT_CRAWLER_USER_TCKN = env("SLOT_CRAWLER_USER_TCKN", default=None)
+SLOT_CRAWL_INTERVAL_SECONDS = env("SLOT_CRAWL_INTERVAL_SECONDS", cast=int, default=60)
+
+# Event targets crawled from the court at most this long ago, and on the same
+# upstream day, are clicked right away instead of being resolved from the grid
+KNOWN_EVENT_TARGET_MAX_AGE_SECONDS = env(
+    "KNOWN_EVENT_TARGET_MAX_AGE_SECONDS", cast=int, default=600
+)
+# Time zone of the upstream site, its slot grid starts at its own midnight
+UPSTREAM_TIME_ZONE = env("UPSTREAM_TIME_ZONE", default="Europe/Istanbul")
+
+# /metrics answers scrapers from these addresses, or sending this bearer token
+METRICS_ALLOWED_IPS = env.list("METRICS_ALLOWED_IPS", default=["127.0.0.1", "::1"])
+METRICS_TOKEN = env("METRICS_TOKEN", default=None)
+
+# Cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("REDIS_URL"),
+    }
+}
+
+# Upstream session pool
+UPSTREAM_SESSION_POOL_ENABLED = env(
+    "UPSTREAM_SESSION_POOL_ENABLED", cast=bool, default=True
+)
+UPSTREAM_SESSION_POOL_SHARED = env(
+    "UPSTREAM_SESSION_POOL_SHARED", cast=bool, default=False
+)
+UPSTREAM_SESSION_POOL_SIZE = env("UPSTREAM_SESSION_POOL_SIZE", cast=int, default=100)
+UPSTREAM_SESSION_TTL_SECONDS = env(
+    "UPSTREAM_SESSION_TTL_SECONDS", cast=int, default=900
+)
+UPSTREAM_SESSION_PROBE_SECONDS = env(
+    "UPSTREAM_SESSION_PROBE_SECONDS", cast=int, default=60
+)
+
+# Keep-alive connections to the upstream site shared by the runners of a process
+UPSTREAM_CONNECTION_POOL_SHARED = env(
+    "UPSTREAM_CONNECTION_POOL_SHARED", cast=bool, default=True
+)
+UPSTREAM_CONNECTION_POOL_SIZE = env(
+    "UPSTREAM_CONNECTION_POOL_SIZE", cast=int, default=20
+)
+
+
+# Reservations left in the cart are checked for payment by a periodic sweep,
+# logging in once per user
+BASKET_CHECK_DELAY_SECONDS = env("BASKET_CHECK_DELAY_SECONDS", cast=int, default=1800)
+BASKET_CHECK_INTERVAL_SECONDS = env(
+    "BASKET_CHECK_INTERVAL_SECONDS", cast=int, default=300
+)
+BASKET_CHECK_CONCURRENCY = env("BASKET_CHECK_CONCURRENCY", cast=int, default=5)
+# Reservations of a user whose basket check failed this many sweeps in a row are
+# marked expired instead of logging in again every sweep
+BASKET_CHECK_MAX_LOGIN_FAILURES = env(
+    "BASKET_CHECK_MAX_LOGIN_FAILURES", cast=int, default=3
+)
+
 
 # Mailjet Keys
 MAILJET_SECRET_KEY = env("MAILJET_SECRET_KEY")
 MAILJET_API_KEY = env("MAILJET_API_KEY")
 MAIL_ENABLED = env("MAIL_ENABLED")
+# Mailjet endpoint, pointed at reservations.mail.fake_mailjet for throughput tests
+MAILJET_API_URL = env("MAILJET_API_URL", default="https://api.mailjet.com/")
+
+# Reservation emails are queued in Redis and sent in batches by drain_notifications
+NOTIFICATION_QUEUE_ENABLED = env("NOTIFICATION_QUEUE_ENABLED", cast=bool, default=True)
+NOTIFICATION_QUEUE_URL = env("NOTIFICATION_QUEUE_URL", default=env("REDIS_URL"))
+# Mailjet accepts up to 50 messages per send call
+NOTIFICATION_BATCH_SIZE = env("NOTIFICATION_BATCH_SIZE", cast=int, default=50)
+NOTIFICATION_DRAIN_INTERVAL_SECONDS = env(
+    "NOTIFICATION_DRAIN_INTERVAL_SECONDS", cast=int, default=5
+)
+# Drains pause this long after Mailjet failed or throttled a send call
+NOTIFICATION_BACKOFF_SECONDS = env("NOTIFICATION_BACKOFF_SECONDS", cast=int, default=60)
+# Messages Mailjet keeps rejecting are dropped after this many send calls
+NOTIFICATION_MAX_ATTEMPTS = env("NOTIFICATION_MAX_ATTEMPTS", cast=int, default=5)
+# Batches claimed this long ago and never acknowledged belong to a worker that
+# died mid send, the next drain queues them again
+NOTIFICATION_PROCESSING_TIMEOUT_SECONDS = env(
+    "NOTIFICATION_PROCESSING_TIMEOUT_SECONDS", cast=int, default=300
+)
 
 # Default Settings Module
 DJANGO_SETTINGS_MODULE = env(
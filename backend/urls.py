@@ -7,15 +7,16 @@ from rest_framework_simplejwt.views import (TokenObtainPairView,
 
 from preferences.views import PreferenceViewSet
 from reservations.views import (ReservationJobViewSet, ReservationViewSet,
-                                ShowSlotsView)
-from selections.views import (SelectionViewSet, SlotViewSet,
-                              SportSelectionViewSet)
+                                ShowManySlotsView, ShowSlotsView, metrics)
+from selections.views import (SelectionViewSet, SlotAvailabilityViewSet,
+                              SlotViewSet, SportSelectionViewSet)
 from users.views import RegisterView, TestTokenView
 
 router = routers.DefaultRouter(trailing_slash=False)
 
 router.register(r"selections", SelectionViewSet)
 router.register(r"slots", SlotViewSet)
+router.register(r"slot-availabilities", SlotAvailabilityViewSet)
 router.register(r"sport-selections", SportSelectionViewSet)
 router.register(r"preferences", PreferenceViewSet)
 router.register(r"reservations", ReservationViewSet)
@@ -30,6 +31,9 @@ urlpatterns = [
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     # Slots
     path("show-slots/", ShowSlotsView.as_view(), name="show-slots"),
+    path("show-slots/batch/", ShowManySlotsView.as_view(), name="show-many-slots"),
+    # Prometheus
+    path("metrics", metrics, name="metrics"),
     # Register
     path("register/", RegisterView.as_view(), name="register"),
     # test
@@ -1,7 +1,10 @@
 from django.contrib import admin
 
-from reservations.models import Reservation, ReservationJob
+from reservations.models import (Reservation, ReservationAttempt,
+                                 ReservationAttemptStep, ReservationJob)
 
 # Register your models here.
 admin.site.register(Reservation)
 admin.site.register(ReservationJob)
+admin.site.register(ReservationAttempt)
+admin.site.register(ReservationAttemptStep)
@@ -0,0 +1,187 @@
+import re
+from urllib.parse import urlencode, urljoin
+
+from bs4 import BeautifulSoup
+
+
+class HtmlForm:
+    # Mirrors the field serialization of mechanicalsoup.Form so the browsers
+    # post exactly the same payloads as the original chain
+    def __init__(self, form):
+        self.method = form.get("method", "get").lower()
+        self.action = form.get("action")
+        self.fields = []
+        self._values = {}
+
+        submit_chosen = False
+        for tag in form.select(
+            "input[name], button[name], textarea[name], select[name]"
+        ):
+            if tag.has_attr("disabled"):
+                continue
+
+            name = tag.get("name")
+            tag_type = tag.get("type", "").lower()
+            if tag.name == "input":
+                if tag_type in ("radio", "checkbox"):
+                    if "checked" not in tag.attrs:
+                        continue
+                    value = tag.get("value", "on")
+                elif tag_type == "submit":
+                    if submit_chosen:
+                        continue
+                    submit_chosen = True
+                    value = tag.get("value", "")
+                else:
+                    value = tag.get("value", "")
+            elif tag.name == "button":
+                if tag_type in ("button", "reset") or submit_chosen:
+                    continue
+                submit_chosen = True
+                value = tag.get("value", "")
+            elif tag.name == "textarea":
+                value = tag.text
+            else:
+                options = tag.select("option")
+                selected = [
+                    o.get("value", o.text) for o in options if "selected" in o.attrs
+                ]
+                if selected:
+                    value = selected[-1]
+                elif options:
+                    value = options[0].get("value", options[0].text)
+                else:
+                    continue
+
+            if name not in self._values:
+                self.fields.append(name)
+                self._values[name] = value
+
+    def __setitem__(self, name, value):
+        if name not in self._values:
+            self.fields.append(name)
+        self._values[name] = value
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    @property
+    def data(self):
+        return [(name, self._values[name]) for name in self.fields]
+
+
+def encode_form_data(data):
+    # requests drops None values and stringifies everything else
+    items = data.items() if isinstance(data, dict) else data
+    return urlencode([(k, str(v)) for k, v in items if v is not None])
+
+
+class BaseBrowser:
+    # Keeps the current document only, so a runner holds a single page no
+    # matter how many requests its chain sends
+    def __init__(self):
+        self.url = None
+        self.response = None
+        self.form = None
+        self._page = None
+
+    @property
+    def page(self):
+        # Only parse the current document when a command asks for it, with the
+        # declared encoding so bs4 does not guess it with chardet
+        if self._page is None and self.response is not None:
+            self._page = BeautifulSoup(
+                self.response.content, "lxml", from_encoding=self.response.encoding
+            )
+        return self._page
+
+    def _update_state(self, response):
+        self.response = response
+        self.url = str(response.url)
+        self.form = None
+        self._page = None
+
+    def find_link(self, url_regex):
+        link = self.page.find("a", href=re.compile(url_regex))
+        return urljoin(self.url, link["href"])
+
+    def select_form(self, selector="form"):
+        self.form = HtmlForm(self.page.select_one(selector))
+        return self.form
+
+    def __setitem__(self, name, value):
+        self.form[name] = value
+
+
+class Browser(BaseBrowser):
+    # Sends what mechanicalsoup.StatefulBrowser sends, without parsing every
+    # response into a soup
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+    def open(self, url, **kwargs):
+        response = self.session.get(url, **kwargs)
+        self._update_state(response)
+        return response
+
+    def follow_link(self, url_regex):
+        return self.open(self.find_link(url_regex), headers={"Referer": self.url})
+
+    def post(self, url, data=None, headers=None, update_state=False):
+        response = self.session.post(url, data=data, headers=headers)
+        if update_state:
+            self._update_state(response)
+        return response
+
+    def submit_selected(self):
+        url = urljoin(self.url, self.form.action)
+        headers = {"Referer": self.url}
+        if self.form.method == "get":
+            response = self.session.get(url, params=self.form.data, headers=headers)
+        else:
+            response = self.session.post(url, data=self.form.data, headers=headers)
+        self._update_state(response)
+        return response
+
+
+class AsyncBrowser(BaseBrowser):
+    FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    async def open(self, url, **kwargs):
+        kwargs.pop("verify", None)
+        response = await self.client.get(url, **kwargs)
+        self._update_state(response)
+        return response
+
+    async def follow_link(self, url_regex):
+        return await self.open(self.find_link(url_regex), headers={"Referer": self.url})
+
+    async def post(self, url, data=None, headers=None, update_state=False):
+        response = await self.client.post(
+            url,
+            content=encode_form_data(data or {}),
+            headers={**self.FORM_HEADERS, **(headers or {})},
+        )
+        if update_state:
+            self._update_state(response)
+        return response
+
+    async def submit_selected(self):
+        url = urljoin(self.url, self.form.action)
+        headers = {"Referer": self.url}
+        if self.form.method == "get":
+            response = await self.client.get(
+                url, params=self.form.data, headers=headers
+            )
+        else:
+            response = await self.post(url, data=self.form.data, headers=headers)
+        self._update_state(response)
+        return response
+
+    async def close(self):
+        await self.client.aclose()
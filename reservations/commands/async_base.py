@@ -0,0 +1,297 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from reservations.browser import AsyncBrowser
+from reservations.commands.base import (AddToCartCommand,
+                                        CreateReservationCommand,
+                                        FillFormCommand,
+                                        FirstSuccessCoordinator, LoginCommand,
+                                        ReservationChoiceCommand,
+                                        ReservationClickCommand,
+                                        ReservationCommandRunner,
+                                        ResolveEventTargetCommand,
+                                        WaitForOpeningCommand)
+from reservations.pacing import async_wait_until
+from reservations.parsers.delta import DeltaParseError
+from reservations.sessions import session_pool
+from reservations.utils import (get_async_legacy_client, get_legacy_session,
+                                loop_shared_transport)
+
+
+class AsyncFirstSuccessCoordinator(FirstSuccessCoordinator):
+    # Same race between chains running on one event loop, a thread lock would
+    # block the loop while the winner's add to cart request is in flight
+    def __init__(self):
+        self.winner = None
+        self._lock = asyncio.Lock()
+
+    async def claim(self):
+        await self._lock.acquire()
+        if self.winner is not None:
+            self._lock.release()
+            return False
+        return True
+
+
+class AsyncReservationCommandRunner(ReservationCommandRunner):
+    def build_browser(self):
+        cookies = (
+            self.upstream_session.session.cookies if self.upstream_session else None
+        )
+        return AsyncBrowser(get_async_legacy_client(cookies=cookies))
+
+    def build_recorder(self):
+        # Transcripts are recorded from the requests based chain only
+        return None
+
+    @staticmethod
+    def build(commands=None):
+        if not commands:
+            commands = [
+                AsyncLoginCommand(),
+                AsyncFillFormCommand(),
+                AsyncWaitForOpeningCommand(),
+                ResolveEventTargetCommand(),
+                AsyncReservationClickCommand(),
+                AsyncReservationChoiceCommand(),
+                AsyncAddToCartCommand(),
+                AsyncCreateReservationCommand(),
+            ]
+        return ReservationCommandRunner.build(commands)
+
+    async def __call__(self, *args, **kwargs):
+        try:
+            command = self.current_command
+            while getattr(command, "next", None):
+                command = await self.run_command(command)
+            # Execute last command if no early return
+            if command:
+                result = await self.run_command(command)
+                print(f"Chain finished {self.format_step_timings()}")
+                return result
+        finally:
+            await sync_to_async(self.save_attempt)()
+            self.release_session()
+            await self.browser.close()
+
+    async def run_command(self, command):
+        # Commands without any I/O, like resolving the event target, are shared
+        # with the sync chain
+        result = command(self)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    def release_session(self):
+        if not (settings.UPSTREAM_SESSION_POOL_ENABLED and self.is_logged_in):
+            return
+        if self.session is not None:
+            return
+        session = (
+            self.upstream_session.session
+            if self.upstream_session
+            else get_legacy_session()
+        )
+        session.cookies.update(self.browser.client.cookies.jar)
+        session_pool.release(self.user, session, self.cookie, self.session_validated_at)
+
+
+class AsyncLoginCommand(LoginCommand):
+    async def execute(self, runner_instance):
+        if not runner_instance.password:
+            runner_instance.is_failure = True
+            return self.next
+
+        if runner_instance.is_failure:
+            return self.next
+
+        if runner_instance.upstream_session and await self.is_session_valid(
+            runner_instance
+        ):
+            runner_instance.is_logged_in = True
+            return self.next
+
+        browser = runner_instance.browser
+        await browser.open(f"{self.base_url}/{self.URL_PATH}")
+        browser.select_form()
+        browser["txtTCPasaport"] = runner_instance.tckn
+        browser["txtSifre"] = runner_instance.password
+        response = await browser.submit_selected()
+        runner_instance.pacing.mark()
+        runner_instance.cookie = response.request.headers["Cookie"]
+        runner_instance.is_logged_in = True
+        runner_instance.session_validated_at = time.time()
+        return self.next
+
+    async def is_session_valid(self, runner_instance):
+        upstream_session = runner_instance.upstream_session
+        if not upstream_session.needs_probe:
+            runner_instance.session_validated_at = upstream_session.validated_at
+            return True
+
+        client = runner_instance.browser.client
+        response = await client.get(
+            f"{self.base_url}/{self.PROBE_URL_PATH}",
+            headers={"Cookie": runner_instance.cookie},
+            follow_redirects=False,
+        )
+        if response.status_code == 200:
+            runner_instance.session_validated_at = time.time()
+            return True
+
+        session_pool.invalidate(runner_instance.user)
+        runner_instance.upstream_session = None
+        client.cookies.clear()
+        runner_instance.cookie = None
+        return False
+
+
+class AsyncFillFormCommand(FillFormCommand):
+    async def execute(self, runner_instance):
+        if runner_instance.is_failure:
+            return self.next
+        # Satis Kiralik Form Doldurma
+        browser = runner_instance.browser
+        pacing = runner_instance.pacing
+
+        form_state = self.get_form_state(runner_instance)
+        if form_state:
+            runner_instance.response = await browser.post(
+                form_state["url"],
+                data=form_state["data"],
+                headers={"Referer": form_state["url"]},
+                update_state=True,
+            )
+            pacing.mark()
+            if self.is_court_page(runner_instance):
+                return self.next
+            # The server rejected the cached state, fill the form from scratch
+            self.invalidate_form_state(runner_instance)
+            await browser.open(f"{self.base_url}/{self.URL_PATH}")
+        elif browser.page is None:
+            await browser.open(f"{self.base_url}/{self.URL_PATH}")
+        else:
+            await browser.follow_link(self.URL_PATH)
+        pacing.mark()
+
+        for step, field, value in self.get_filters(runner_instance):
+            await pacing.async_wait(step)
+            browser.select_form()
+            browser[field] = value
+            runner_instance.response = await browser.submit_selected()
+            pacing.mark()
+
+        self.set_form_state(runner_instance)
+        return self.next
+
+    @classmethod
+    async def refresh_slot_grid(cls, runner_instance):
+        browser = runner_instance.browser
+        browser.select_form()
+        _, field, value = cls.get_filters(runner_instance)[-1]
+        browser[field] = value
+        runner_instance.response = await browser.submit_selected()
+        runner_instance.pacing.mark()
+
+
+class AsyncWaitForOpeningCommand(WaitForOpeningCommand):
+    async def execute(self, runner_instance):
+        if runner_instance.is_failure or runner_instance.opens_at is None:
+            return self.next
+
+        if time.time() >= runner_instance.opens_at:
+            return self.next
+
+        await async_wait_until(runner_instance.opens_at)
+        runner_instance.released_at = time.time()
+        if not runner_instance.is_known_event_target:
+            await AsyncFillFormCommand.refresh_slot_grid(runner_instance)
+        return self.next
+
+
+class AsyncReservationClickCommand(ReservationClickCommand):
+    async def execute(self, runner_instance):
+        if runner_instance.is_failure:
+            return self.next
+
+        await self.click(runner_instance)
+        if self.is_stale_event_target(runner_instance):
+            await AsyncFillFormCommand.refresh_slot_grid(runner_instance)
+            if ResolveEventTargetCommand.resolve(runner_instance):
+                await self.click(runner_instance)
+        return self.next
+
+    async def click(self, runner_instance):
+        await runner_instance.pacing.async_wait("click")
+        browser = runner_instance.browser
+        runner_instance.response = await browser.post(
+            browser.url, **self.get_request_kwargs(runner_instance)
+        )
+        runner_instance.pacing.mark()
+
+
+class AsyncReservationChoiceCommand(ReservationChoiceCommand):
+    async def execute(self, runner_instance):
+        if runner_instance.is_failure:
+            return self.next
+
+        await runner_instance.pacing.async_wait("choice")
+        browser = runner_instance.browser
+        try:
+            request_kwargs = self.get_request_kwargs(runner_instance)
+        except DeltaParseError as error:
+            print(f"Unexpected reservation click response: {error}")
+            runner_instance.failure_reason = "parse_error"
+            runner_instance.is_failure = True
+            return self.next
+
+        runner_instance.response = await browser.post(browser.url, **request_kwargs)
+        runner_instance.pacing.mark()
+        return self.next
+
+
+class AsyncAddToCartCommand(AddToCartCommand):
+    async def execute(self, runner_instance):
+        if runner_instance.is_failure:
+            return self.next
+
+        await runner_instance.pacing.async_wait("add_to_cart")
+        coordinator = runner_instance.coordinator
+        if coordinator and not await coordinator.claim():
+            runner_instance.is_failure = True
+            runner_instance.is_cancelled = True
+            return self.next
+
+        is_success = False
+        try:
+            browser = runner_instance.browser
+            request_kwargs = self.get_request_kwargs(runner_instance)
+            runner_instance.record_fire_latency()
+            response = await browser.post(browser.url, **request_kwargs)
+            runner_instance.pacing.mark()
+            is_success = not response.is_error
+        except DeltaParseError as error:
+            print(f"Unexpected reservation choice response: {error}")
+            runner_instance.failure_reason = "parse_error"
+        finally:
+            if coordinator:
+                coordinator.settle(runner_instance, is_success)
+        runner_instance.is_failure = not is_success
+        return self.next
+
+
+class AsyncCreateReservationCommand(CreateReservationCommand):
+    async def execute(self, runner_instance):
+        return await sync_to_async(super().execute)(runner_instance)
+
+
+async def run_chains(runners):
+    try:
+        return await asyncio.gather(
+            *(runner() for runner in runners), return_exceptions=True
+        )
+    finally:
+        await loop_shared_transport.close_pool()
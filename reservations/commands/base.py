@@ -1,16 +1,56 @@
 import abc
+import asyncio
 import re
+import threading
 import time
-
-import mechanicalsoup
-
-from reservations.enums import StatusCode
-from reservations.helpers import show_slots
-from reservations.models import Reservation
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+from reservations.browser import Browser
+from reservations.form_state import form_state_cache
+from reservations.metrics import current_step, observe_command
+from reservations.models import (Reservation, ReservationAttempt,
+                                 ReservationAttemptStep)
+from reservations.pacing import PacingPolicy, wait_until
+from reservations.parsers.delta import (DeltaParseError, DeltaResponse,
+                                        find_postback_target)
+from reservations.parsers.reservations import index_member_reservations
+from reservations.parsers.slots import resolve_event_target
+from reservations.sessions import session_pool
+from reservations.transcripts import TranscriptRecorder
 from reservations.utils import get_legacy_session
 from selections.constants import BRANCH_TENNIS_ID
 
 
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class FirstSuccessCoordinator:
+    # Lets several runners race for the same slot on different courts while
+    # only one of them is allowed to add a slot to the cart
+    def __init__(self):
+        self.winner = None
+        self._lock = threading.Lock()
+
+    def claim(self):
+        self._lock.acquire()
+        if self.winner is not None:
+            self._lock.release()
+            return False
+        return True
+
+    def settle(self, runner_instance, is_success):
+        if is_success:
+            self.winner = runner_instance
+        self._lock.release()
+
+    def is_cancelled(self, runner_instance):
+        return self.winner is not None and self.winner is not runner_instance
+
+
 class ReservationCommandRunner:
     def __init__(
         self,
@@ -21,14 +61,36 @@ class ReservationCommandRunner:
         commands=None,
         is_max_retry=False,
         court_selection=None,
+        coordinator=None,
+        pacing=None,
+        session=None,
+        opens_at=None,
+        chain_type="reserve",
+        reservation_job=None,
     ):
-        # Browser
-        self.browser = mechanicalsoup.StatefulBrowser(session=get_legacy_session())
         # User
         self.user = user
         self.tckn = user.tckn
         self.password = user.third_party_app_password
-        self.cookie = None
+
+        # Browser, reusing a logged in upstream session when there is a warm one.
+        # A session lent by the caller stays owned by the caller. Recorded
+        # chains always run cold, so the transcript holds the whole chain.
+        self.session = session
+        self.recorder = self.build_recorder()
+        self.upstream_session = (
+            session_pool.acquire(user)
+            if settings.UPSTREAM_SESSION_POOL_ENABLED
+            and session is None
+            and self.recorder is None
+            else None
+        )
+        self.browser = self.build_browser()
+        if self.recorder:
+            self.recorder.attach(self.browser.session)
+        self.cookie = self.upstream_session.cookie if self.upstream_session else None
+        self.is_logged_in = False
+        self.session_validated_at = None
 
         # Pitch
         self.selection = selection
@@ -37,8 +99,10 @@ class ReservationCommandRunner:
             self.sport_selection.pitch_id if selection else court_selection
         )
 
-        # One of these must be set
+        # One of these must be set, a known event target is clicked without
+        # resolving it from the slot grid
         self.event_target = event_target
+        self.is_known_event_target = event_target is not None
         self.slot_date_time = selection.slot.date_time if selection else None
 
         # Response
@@ -50,9 +114,9 @@ class ReservationCommandRunner:
             "Accept-Language": "en-US,en;q=0.9",
             "Connection": "keep-alive",
             "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "Host": "online.spor.istanbul",
-            "Origin": "https://online.spor.istanbul",
-            "Referer": "https://online.spor.istanbul/satiskiralik",
+            "Host": urlparse(settings.UPSTREAM_BASE_URL).netloc,
+            "Origin": settings.UPSTREAM_BASE_URL,
+            "Referer": f"{settings.UPSTREAM_BASE_URL}/satiskiralik",
             "Sec-Fetch-Site": "same-origin",
             "Sec-GPC": "1",
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/105.0.0.0 Safari/537.36",
@@ -71,13 +135,47 @@ class ReservationCommandRunner:
         self.is_no_slot = False
         self.is_max_retry = is_max_retry
 
+        # Set when racing other runners for the same slot
+        self.coordinator = coordinator
+        self.is_cancelled = False
+
+        # Pacing between upstream requests and how long each step took
+        self.pacing = pacing or PacingPolicy.from_settings()
+        self.step_timings = []
+        # reserve, show-slots, check-basket or remove-basket
+        self.chain_type = chain_type
+        self.reservation_job = reservation_job
+        self.failure_reason = None
+
+        # Set when the chain is warmed up ahead of the slot opening, the fire
+        # latency is how long after the opening AddToCart was sent
+        self.opens_at = opens_at.timestamp() if opens_at else None
+        self.released_at = None
+        self.fire_latency = None
+
+    def build_browser(self):
+        if self.session is not None:
+            session = self.session
+        elif self.upstream_session:
+            session = self.upstream_session.session
+        else:
+            session = get_legacy_session()
+        return Browser(session)
+
+    def build_recorder(self):
+        if not settings.RESERVATION_TRANSCRIPT_DIR or self.session is not None:
+            return None
+        return TranscriptRecorder()
+
     @staticmethod
     def build(commands=None):
         if not commands:
             base_command = LoginCommand()
             base_command.set_next(FillFormCommand()).set_next(
-                ResolveEventTargetCommand()
-            ).set_next(ReservationClickCommand()).set_next(
+                WaitForOpeningCommand()
+            ).set_next(ResolveEventTargetCommand()).set_next(
+                ReservationClickCommand()
+            ).set_next(
                 ReservationChoiceCommand()
             ).set_next(
                 AddToCartCommand()
@@ -92,28 +190,182 @@ class ReservationCommandRunner:
 
         return base_command
 
-    def __call__(self, *args, **kwargs):
-        command = self.current_command
-        while getattr(command, "next", None):
-            command = command(self)
-        # Execute last command if no early return
-        if command:
-            result = command(self)
-            print("Chain finished")
-            return result
+    def __call__(self, *args, keep_session=False, **kwargs):
+        # keep_session holds on to a pooled session the caller goes on using
+        # and releases itself
+        try:
+            command = self.current_command
+            while getattr(command, "next", None):
+                command = command(self)
+            # Execute last command if no early return
+            if command:
+                result = command(self)
+                print(f"Chain finished {self.format_step_timings()}")
+                return result
+        finally:
+            if self.recorder:
+                self.recorder.save(self, settings.RESERVATION_TRANSCRIPT_DIR)
+            self.save_attempt()
+            if not keep_session:
+                self.release_session()
+
+    def start_step(self, command):
+        return {
+            "command": command.__class__.__name__,
+            "was_failure": self.is_failure,
+            "started_at": time.time(),
+            "perf_started_at": time.perf_counter(),
+            "status_codes": [],
+            "bytes_sent": 0,
+            "bytes_received": 0,
+        }
+
+    def finish_step(self, step, outcome, error=None):
+        step["duration"] = time.perf_counter() - step.pop("perf_started_at")
+        step["finished_at"] = time.time()
+        step["waited"] = self.pacing.pop_waited()
+        step["outcome"] = outcome
+        if error is not None:
+            self.failure_reason = f"error: {error!r}"[:255]
+        self.step_timings.append(step)
+        observe_command(self, step["command"], step["duration"], outcome)
+
+    def get_outcome(self, was_failure):
+        if was_failure:
+            return "skipped"
+        if self.is_cancelled:
+            return "cancelled"
+        return "failure" if self.is_failure else "success"
+
+    def get_failure_reason(self):
+        if self.failure_reason or not self.is_failure:
+            return self.failure_reason
+        if self.is_cancelled:
+            return "cancelled"
+        if self.is_no_slot:
+            return "no_slot"
+        if not self.password:
+            return "no_password"
+        if any(
+            status >= 400
+            for step in self.step_timings
+            for status in step["status_codes"]
+        ):
+            return "http_error"
+        return "unknown"
+
+    def save_attempt(self):
+        if not (
+            settings.RESERVATION_ATTEMPTS_ENABLED
+            and self.chain_type in settings.RESERVATION_ATTEMPT_CHAIN_TYPES
+            and self.step_timings
+        ):
+            return
+
+        failure_reason = self.get_failure_reason()
+        try:
+            attempt = ReservationAttempt.objects.create(
+                user=self.user,
+                selection=self.selection,
+                reservation_job=self.reservation_job,
+                chain_type=self.chain_type,
+                court_selection=self.court_selection,
+                event_target=self.event_target,
+                started_at=to_datetime(self.step_timings[0]["started_at"]),
+                finished_at=to_datetime(self.step_timings[-1]["finished_at"]),
+                is_success=failure_reason is None,
+                failure_reason=failure_reason,
+            )
+            ReservationAttemptStep.objects.bulk_create(
+                [
+                    ReservationAttemptStep(
+                        attempt=attempt,
+                        position=position,
+                        command=step["command"],
+                        outcome=step["outcome"],
+                        started_at=to_datetime(step["started_at"]),
+                        finished_at=to_datetime(step["finished_at"]),
+                        duration=step["duration"],
+                        waited=step["waited"],
+                        status_codes=step["status_codes"],
+                        bytes_sent=step["bytes_sent"],
+                        bytes_received=step["bytes_received"],
+                    )
+                    for position, step in enumerate(self.step_timings)
+                ]
+            )
+        except Exception as error:
+            # Tracing must never fail a reservation
+            print(f"Could not save the reservation attempt: {error}")
+
+    def format_step_timings(self):
+        return ", ".join(
+            f"{timing['command']}: {timing['duration']:.3f}s ({timing['waited']:.3f}s paced)"
+            for timing in self.step_timings
+        )
+
+    def record_fire_latency(self):
+        if self.opens_at is None:
+            return
+        self.fire_latency = time.time() - self.opens_at
+        print(f"AddToCart sent {self.fire_latency:.3f}s after the slot opened")
+
+    def release_session(self):
+        if not (settings.UPSTREAM_SESSION_POOL_ENABLED and self.is_logged_in):
+            return
+        if self.session is not None:
+            return
+        session_pool.release(
+            self.user, self.browser.session, self.cookie, self.session_validated_at
+        )
 
 
 class BaseReservationCommand(metaclass=abc.ABCMeta):
     URL_PATH = None
 
     def __init__(self):
-        self.base_url = "https://online.spor.istanbul"
+        self.base_url = settings.UPSTREAM_BASE_URL
         # Next Command to execute
         self.next = None
 
     def __call__(self, *args, **kwargs):
         runner_instance = args[0]
-        return self.execute(runner_instance)
+        coordinator = runner_instance.coordinator
+        if coordinator and coordinator.is_cancelled(runner_instance):
+            runner_instance.is_failure = True
+            runner_instance.is_cancelled = True
+
+        # Upstream responses are attributed to the step running in this
+        # thread or task
+        step = runner_instance.start_step(self)
+        token = current_step.set(step)
+        try:
+            result = self.execute(runner_instance)
+        except Exception as error:
+            runner_instance.finish_step(step, "error", error)
+            raise
+        finally:
+            current_step.reset(token)
+        if asyncio.iscoroutine(result):
+            return self.record_async(runner_instance, result, step)
+        runner_instance.finish_step(
+            step, runner_instance.get_outcome(step["was_failure"])
+        )
+        return result
+
+    async def record_async(self, runner_instance, coroutine, step):
+        token = current_step.set(step)
+        try:
+            result = await coroutine
+        except Exception as error:
+            runner_instance.finish_step(step, "error", error)
+            raise
+        finally:
+            current_step.reset(token)
+        runner_instance.finish_step(
+            step, runner_instance.get_outcome(step["was_failure"])
+        )
+        return result
 
     @abc.abstractmethod
     def execute(self, runner_instance):
@@ -129,6 +381,7 @@ class BaseReservationCommand(metaclass=abc.ABCMeta):
 
 class LoginCommand(BaseReservationCommand):
     URL_PATH = "uyegiris"
+    PROBE_URL_PATH = "uyespor"
 
     def execute(self, runner_instance):
         if not runner_instance.password:
@@ -137,43 +390,169 @@ class LoginCommand(BaseReservationCommand):
 
         if runner_instance.is_failure:
             return self.next
+
+        if runner_instance.upstream_session and self.is_session_valid(runner_instance):
+            runner_instance.is_logged_in = True
+            return self.next
+
         browser = runner_instance.browser
         browser.open(f"{self.base_url}/{self.URL_PATH}", verify=False)
         browser.select_form()
         browser["txtTCPasaport"] = runner_instance.tckn
         browser["txtSifre"] = runner_instance.password
         response = browser.submit_selected()
+        runner_instance.pacing.mark()
         runner_instance.cookie = response.request.headers["Cookie"]
+        runner_instance.is_logged_in = True
+        runner_instance.session_validated_at = time.time()
         return self.next
 
+    def is_session_valid(self, runner_instance):
+        upstream_session = runner_instance.upstream_session
+        if not upstream_session.needs_probe:
+            runner_instance.session_validated_at = upstream_session.validated_at
+            return True
+
+        # An expired upstream session redirects member pages to the login page
+        response = runner_instance.browser.session.get(
+            f"{self.base_url}/{self.PROBE_URL_PATH}",
+            headers={"Cookie": runner_instance.cookie},
+            allow_redirects=False,
+            verify=False,
+        )
+        if response.status_code == 200:
+            runner_instance.session_validated_at = time.time()
+            return True
+
+        session_pool.invalidate(runner_instance.user)
+        runner_instance.upstream_session = None
+        runner_instance.browser.session.cookies.clear()
+        runner_instance.cookie = None
+        return False
+
 
 class FillFormCommand(BaseReservationCommand):
+    URL_PATH = "satiskiralik"
+
     def execute(self, runner_instance):
         if runner_instance.is_failure:
             return self.next
         # Satis Kiralik Form Doldurma
         browser = runner_instance.browser
+        pacing = runner_instance.pacing
+
+        form_state = self.get_form_state(runner_instance)
+        if form_state:
+            runner_instance.response = browser.post(
+                form_state["url"],
+                data=form_state["data"],
+                headers={"Referer": form_state["url"]},
+                update_state=True,
+            )
+            pacing.mark()
+            if self.is_court_page(runner_instance):
+                return self.next
+            # The server rejected the cached state, fill the form from scratch
+            self.invalidate_form_state(runner_instance)
+            browser.open(f"{self.base_url}/{self.URL_PATH}")
+        # A pooled session skips the login page, so there is no link to follow
+        elif browser.page is None:
+            browser.open(f"{self.base_url}/{self.URL_PATH}")
+        else:
+            browser.follow_link(self.URL_PATH)
+        pacing.mark()
 
-        browser.follow_link("satiskiralik")
-        browser.select_form()
-        browser[
-            "ctl00$pageContent$ddlBransFiltre"
-        ] = "59b7bd71-1aab-4751-8248-7af4a7790f8c"
-        browser.submit_selected()
-        time.sleep(0.5)
+        for step, field, value in self.get_filters(runner_instance):
+            pacing.wait(step)
+            browser.select_form()
+            browser[field] = value
+            runner_instance.response = browser.submit_selected()
+            pacing.mark()
 
-        browser.select_form()
-        browser[
-            "ctl00$pageContent$ddlTesisFiltre"
-        ] = runner_instance.sport_selection.complex_id
-        browser.submit_selected()
-        time.sleep(0.8)
+        self.set_form_state(runner_instance)
+        return self.next
 
+    @staticmethod
+    def get_form_state_key(runner_instance):
+        return (
+            BRANCH_TENNIS_ID,
+            runner_instance.sport_selection.complex_id,
+            runner_instance.court_selection.strip(),
+        )
+
+    def get_form_state(self, runner_instance):
+        if not settings.FORM_STATE_CACHE_ENABLED or runner_instance.recorder:
+            return None
+        return form_state_cache.get(*self.get_form_state_key(runner_instance))
+
+    def set_form_state(self, runner_instance):
+        if not (
+            settings.FORM_STATE_CACHE_ENABLED and self.is_court_page(runner_instance)
+        ):
+            return
+        browser = runner_instance.browser
+        form_state_cache.set(
+            *self.get_form_state_key(runner_instance), browser.page, browser.url
+        )
+
+    def invalidate_form_state(self, runner_instance):
+        form_state_cache.invalidate(*self.get_form_state_key(runner_instance))
+
+    @staticmethod
+    def is_court_page(runner_instance):
+        court_select = runner_instance.browser.page.find(
+            "select", {"id": "ddlSalonFiltre"}
+        )
+        if court_select is None:
+            return False
+        court_data = court_select.find("option", {"selected": "selected"})
+        return (
+            court_data is not None
+            and court_data.get("value") == runner_instance.court_selection.strip()
+        )
+
+    @classmethod
+    def refresh_slot_grid(cls, runner_instance):
+        browser = runner_instance.browser
         browser.select_form()
-        browser["ctl00$pageContent$ddlSalonFiltre"] = runner_instance.court_selection.strip()
-        browser.submit_selected()
-        time.sleep(0.5)
+        _, field, value = cls.get_filters(runner_instance)[-1]
+        browser[field] = value
+        runner_instance.response = browser.submit_selected()
+        runner_instance.pacing.mark()
+
+    @staticmethod
+    def get_filters(runner_instance):
+        # Each dropdown change is a postback filtering the next dropdown
+        return (
+            ("branch", "ctl00$pageContent$ddlBransFiltre", BRANCH_TENNIS_ID),
+            (
+                "complex",
+                "ctl00$pageContent$ddlTesisFiltre",
+                runner_instance.sport_selection.complex_id,
+            ),
+            (
+                "court",
+                "ctl00$pageContent$ddlSalonFiltre",
+                runner_instance.court_selection.strip(),
+            ),
+        )
 
+
+class WaitForOpeningCommand(BaseReservationCommand):
+    def execute(self, runner_instance):
+        if runner_instance.is_failure or runner_instance.opens_at is None:
+            return self.next
+
+        # Only a chain warmed up ahead of time waits, retries fire right away
+        if time.time() >= runner_instance.opens_at:
+            return self.next
+
+        wait_until(runner_instance.opens_at)
+        runner_instance.released_at = time.time()
+        # The grid loaded while warming up has no reservable slots yet, a known
+        # event target is clicked without reloading it
+        if not runner_instance.is_known_event_target:
+            FillFormCommand.refresh_slot_grid(runner_instance)
         return self.next
 
 
@@ -183,42 +562,77 @@ class ResolveEventTargetCommand(BaseReservationCommand):
             return self.next
 
         if not runner_instance.event_target:
-            slots_data = show_slots(runner_instance.browser)
-            slots = slots_data["slots"]
-            all_reservables_for_selected_date = [
-                s1
-                for s in slots
-                for s1 in s["slots"]
-                if s1["is_reservable"] is True
-                and s1["status_code"] != StatusCode.WILL_BE_AVAILABLE.value
-                and s["date"] == runner_instance.slot_date_time.strftime("%d.%m.%Y")
-            ]
-
-            hour = str(runner_instance.slot_date_time.hour)
-            hour_to_match = ("0" + hour) if len(hour) == 1 else hour
-            reservable_slots = [
-                slot
-                for slot in all_reservables_for_selected_date
-                if slot["slot"].startswith(hour_to_match)
-            ]
-            if not reservable_slots:
-                print("No reservable field found! Returning")
-                runner_instance.is_failure = True
-                runner_instance.is_no_slot = True
-                return self.next
+            self.resolve(runner_instance)
+        return self.next
 
-            event_target = reservable_slots[0]["event_target"]
-            runner_instance.event_target = event_target
+    @staticmethod
+    def resolve(runner_instance):
+        event_target, alternatives = resolve_event_target(
+            runner_instance.response.content, runner_instance.slot_date_time
+        )
+        if event_target is None:
+            print(
+                "No reservable field found! Returning, reservable hours: "
+                f"{[hour for hour, _ in alternatives]}"
+            )
+            runner_instance.is_failure = True
+            runner_instance.is_no_slot = True
+            return False
 
-        return self.next
+        runner_instance.event_target = event_target
+        return True
 
 
 class ReservationClickCommand(BaseReservationCommand):
+    # Only rendered when the server accepted the clicked slot
+    CHOICE_LIST_ID = "rblKiralikTenisSatisTuru"
+
     def execute(self, runner_instance):
         if runner_instance.is_failure:
             return self.next
 
-        time.sleep(1)
+        self.click(runner_instance)
+        if self.is_stale_event_target(runner_instance):
+            # Fall back to resolving the target from a fresh slot grid
+            FillFormCommand.refresh_slot_grid(runner_instance)
+            if ResolveEventTargetCommand.resolve(runner_instance):
+                self.click(runner_instance)
+        return self.next
+
+    def click(self, runner_instance):
+        runner_instance.pacing.wait("click")
+        browser = runner_instance.browser
+        runner_instance.response = browser.post(
+            browser.url, **self.get_request_kwargs(runner_instance)
+        )
+        runner_instance.pacing.mark()
+
+    @classmethod
+    def is_stale_event_target(cls, runner_instance):
+        if not runner_instance.is_known_event_target:
+            return False
+        runner_instance.is_known_event_target = False
+        if cls.is_accepted(runner_instance.response):
+            return False
+
+        print(f"Known event target {runner_instance.event_target} was rejected")
+        runner_instance.event_target = None
+        return True
+
+    @classmethod
+    def is_accepted(cls, response):
+        if response.status_code >= 400:
+            return False
+        try:
+            delta = DeltaResponse(response.content)
+        except DeltaParseError:
+            return False
+        return any(
+            cls.CHOICE_LIST_ID in delta.panel(panel_id) for panel_id in delta.panel_ids
+        )
+
+    @staticmethod
+    def get_request_kwargs(runner_instance):
         browser = runner_instance.browser
         # Satis Kiralik Rezervasyon
 
@@ -245,9 +659,7 @@ class ReservationClickCommand(BaseReservationCommand):
             "__EVENTTARGET": runner_instance.event_target,
             **runner_instance.base_data,
         }
-
-        runner_instance.response = browser.post(browser.url, data=data, headers=headers)
-        return self.next
+        return {"data": data, "headers": headers}
 
 
 class ReservationChoiceCommand(BaseReservationCommand):
@@ -255,13 +667,26 @@ class ReservationChoiceCommand(BaseReservationCommand):
         if runner_instance.is_failure:
             return self.next
 
-        time.sleep(1)
-        # Kiralama Secimi
+        runner_instance.pacing.wait("choice")
         browser = runner_instance.browser
+        try:
+            request_kwargs = self.get_request_kwargs(runner_instance)
+        except DeltaParseError as error:
+            print(f"Unexpected reservation click response: {error}")
+            runner_instance.failure_reason = "parse_error"
+            runner_instance.is_failure = True
+            return self.next
 
-        rc = runner_instance.response.content.decode("utf8")
-        viewstate = rc[rc.find("__VIEWSTATE") : rc.find("|8|")]
-        view_state = viewstate.replace("__VIEWSTATE|", "")
+        runner_instance.response = browser.post(browser.url, **request_kwargs)
+        runner_instance.pacing.mark()
+        return self.next
+
+    @staticmethod
+    def get_request_kwargs(runner_instance):
+        # Kiralama Secimi
+        view_state = DeltaResponse(runner_instance.response.content).viewstate
+        if view_state is None:
+            raise DeltaParseError("No __VIEWSTATE in the delta response")
         event_target = (
             "ctl00$pageContent$rblKiralikTenisSatisTuru$rblKiralikTenisSatisTuru_2"
         )
@@ -282,30 +707,47 @@ class ReservationChoiceCommand(BaseReservationCommand):
             "__EVENTTARGET": event_target,
             **runner_instance.base_data,
         }
-        runner_instance.response = browser.post(browser.url, data=data, headers=headers)
-        return self.next
+        return {"data": data, "headers": headers}
 
 
 class AddToCartCommand(BaseReservationCommand):
     def execute(self, runner_instance):
-        from bs4 import BeautifulSoup as bs
-
         if runner_instance.is_failure:
             return self.next
 
-        time.sleep(1)
-        response = runner_instance.response
+        runner_instance.pacing.wait("add_to_cart")
+        coordinator = runner_instance.coordinator
+        if coordinator and not coordinator.claim():
+            runner_instance.is_failure = True
+            runner_instance.is_cancelled = True
+            return self.next
+
+        is_success = False
+        try:
+            browser = runner_instance.browser
+            request_kwargs = self.get_request_kwargs(runner_instance)
+            runner_instance.record_fire_latency()
+            response = browser.post(browser.url, **request_kwargs)
+            runner_instance.pacing.mark()
+            is_success = response.ok
+        except DeltaParseError as error:
+            print(f"Unexpected reservation choice response: {error}")
+            runner_instance.failure_reason = "parse_error"
+        finally:
+            if coordinator:
+                coordinator.settle(runner_instance, is_success)
+        runner_instance.is_failure = not is_success
+        return self.next
+
+    @staticmethod
+    def get_request_kwargs(runner_instance):
         browser = runner_instance.browser
 
-        # add "lxml"
-        soup = bs(
-            response.content.decode("utf8"), parser="html.parser", features="lxml"
+        event_target = find_postback_target(
+            runner_instance.response.content, "pageContent_lbtnSepeteEkle"
         )
-        anchor = soup.find("a", id="pageContent_lbtnSepeteEkle")
-        href = anchor.get("href")
-        event_target = href[
-            href.find("ctl") : href.find("SepeteEkle") + len("SepeteEkle")
-        ]
+        if event_target is None:
+            raise DeltaParseError("No add to cart link in the response")
         page_content_script = f"ctl00$pageContent$UpdatePanel1|{event_target}"
         inp = browser.page.find("input", id="__VIEWSTATE")
         view_state = inp.get("value")
@@ -330,9 +772,7 @@ class AddToCartCommand(BaseReservationCommand):
             "__ASYNCPOST": True,
             **runner_instance.base_data,
         }
-        response = browser.post(browser.url, data=data, headers=headers)
-        runner_instance.is_failure = True if not response.ok else False
-        return self.next
+        return {"data": data, "headers": headers}
 
 
 class RemoveFromBasketCommand(BaseReservationCommand):
@@ -411,88 +851,12 @@ class CheckReservationCommand(BaseReservationCommand):
     URL_PATH = "uyespor"
 
     def execute(self, runner_instance):
-        from bs4 import BeautifulSoup as bs
-
-        browser = runner_instance.browser
-        browser.open(f"{self.base_url}/{self.URL_PATH}")
-        event_target = None
-        table = browser.page.find("table", id="dtUyeSpor")
-        tbody = table.find("tbody")
-        trs = tbody.findAll("tr")
-        for tr in trs:
-            tds = tr.findAll("td")
-            td_time = tds[2]
-            time_match = re.search(
-                r"(\d{1}\d{1}):\d{1}\d{1}:\d{1}\d{1}\s-\s(\d{1}\d{1})", td_time.text
-            ).groups()
-            slot_start_hour = time_match[0] if time_match else None
-            slot_start_hour = (
-                slot_start_hour[1]
-                if slot_start_hour.startswith("0")
-                else slot_start_hour[:]
-            )
-
-            td_date = tds[3]
-            td_date_match = re.search(
-                r"(\d+\.\d+\.\d+)\s-\s(\d+\.\d+\.\d+)", td_date.text
-            ).groups()
-            slot_date = td_date_match[0] if td_date_match else None
-
-            if all(
-                (
-                    (slot_start_hour is not None),
-                    (runner_instance.selection is not None),
-                    (
-                        str(runner_instance.selection.slot.date_time.hour)
-                        == slot_start_hour
-                    ),
-                    (
-                        str(
-                            runner_instance.selection.slot.date_time.strftime(
-                                "%d.%m.%Y"
-                            )
-                        )
-                        == slot_date
-                    ),
-                )
-            ):
-                event_target = tds[-1].find("a").get("href")[25:73]
-                break
+        # Statuses of all the member's reservations, None when not logged in
+        if runner_instance.is_failure:
+            return None
 
-        if event_target:
-            inp = browser.page.find("input", id="__VIEWSTATE")
-            view_state = inp.get("value")
-            headers = {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Cache-Control": "max-age=0",
-                "Cookie": runner_instance.cookie,
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-User": "?1",
-                "Upgrade-Insecure-Requests": "1",
-                **runner_instance.base_headers,
-            }
-            data = {
-                "__VIEWSTATE": view_state,
-                "__EVENTTARGET": event_target,
-                "__VIEWSTATEGENERATOR": "76CD4AB0",
-                "__EVENT_ARGUMENT": None,
-            }
-            response = browser.post(browser.url, data=data, headers=headers)
-            runner_instance.is_failure = True if not response.ok else False
-            soup = bs(
-                response.content.decode("utf8"), parser="html.parser", features="lxml"
-            )
-            table = soup.find("table", id="dtUyeSpor")
-            tbody = table.find("tbody")
-            tr = tbody.findAll("tr")[2]
-            td = tr.findAll("td")[4]
-            status_text = td.text
-            if status_text == "Satış Yapıldı":
-                return True
-            else:
-                return False
-        return False
+        response = runner_instance.browser.open(f"{self.base_url}/{self.URL_PATH}")
+        return index_member_reservations(response.content)
 
 
 class CreateReservationCommand(BaseReservationCommand):
@@ -0,0 +1,385 @@
+import argparse
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from selections.constants import (BRANCH_TENNIS_ID, CLOSED_COURT_IDS,
+                                  COMPLEX_MALTEPE_ID)
+
+DAYS = ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"]
+HOURS = range(7, 22)
+RESERVATION_TARGET_REGEX = re.compile(
+    r"rptList\$ctl(\d+)\$repeaterSeans\$ctl(\d+)\$lbtnRezervasyon"
+)
+REMOVE_TARGET_REGEX = re.compile(r"rptSepet\$ctl(\d+)\$lbSil")
+CHOICE_TARGET = "ctl00$pageContent$rblKiralikTenisSatisTuru"
+ADD_TO_CART_TARGET = "ctl00$pageContent$lbtnSepeteEkle"
+
+
+def delta(*entries):
+    # ASP.NET UpdatePanel response, the length counting characters
+    return "".join(
+        f"{len(content)}|{entry_type}|{entry_id}|{content}|"
+        for entry_type, entry_id, content in entries
+    )
+
+
+class FakeUpstream:
+    # Stand-in for online.spor.istanbul serving the pages and postbacks the
+    # reservation commands use. Slots of the next days can be added to the
+    # cart of `capacity` users, every later attempt loses with a 409.
+    def __init__(
+        self,
+        courts=None,
+        days=7,
+        reservable_days=3,
+        capacity=1,
+        latency=0.05,
+        jitter=0.0,
+    ):
+        self.courts = courts or CLOSED_COURT_IDS
+        self.days = days
+        self.reservable_days = reservable_days
+        self.capacity = capacity
+        self.latency = latency
+        self.jitter = jitter
+
+        self.inventory = {}
+        self.sessions = {}
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self.server = None
+
+    def start(self, host="127.0.0.1", port=0):
+        upstream = self
+
+        class Handler(FakeUpstreamHandler):
+            fake = upstream
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_dates(self):
+        today = datetime.now().date()
+        return [today + timedelta(days=day) for day in range(self.days)]
+
+    def event_target(self, date, hour):
+        day_index = self.get_dates().index(date)
+        return (
+            f"ctl00$pageContent$rptList$ctl{day_index:02d}"
+            f"$repeaterSeans$ctl{HOURS.index(hour):02d}$lbtnRezervasyon"
+        )
+
+    def is_reservable(self, court_id, date, hour):
+        day_index = self.get_dates().index(date)
+        return (
+            day_index < self.reservable_days
+            and self.remaining(court_id, date, hour) > 0
+        )
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def remaining(self, court_id, date, hour):
+        return self.capacity - self.inventory.get((court_id, date, hour), 0)
+
+    def add_to_cart(self, session, slot):
+        with self._lock:
+            if slot in session["basket"] or self.remaining(*slot) <= 0:
+                self.stats["contention_losses"] += 1
+                return False
+            self.inventory[slot] = self.inventory.get(slot, 0) + 1
+            session["basket"].append(slot)
+            return True
+
+    def remove_from_cart(self, session, index):
+        with self._lock:
+            if index >= len(session["basket"]):
+                return
+            slot = session["basket"].pop(index)
+            self.inventory[slot] -= 1
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real site
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body
+    # back until the client acknowledges the headers
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.fake.count("connections")
+
+    def do_GET(self):
+        self.delay()
+        path = urlparse(self.path).path.strip("/")
+        session = self.get_session()
+        if path == "uyegiris":
+            return self.send_html(self.login_page())
+        if session is None:
+            return self.redirect("/uyegiris")
+        if path == "satiskiralik":
+            return self.send_html(self.court_page(session, {}))
+        if path == "uyesepet":
+            return self.send_html(self.basket_page(session))
+        if path == "uyespor":
+            return self.send_html(self.reservations_page(session))
+        return self.send_html('<a href="/satiskiralik">Satış Kiralık</a>')
+
+    def do_POST(self):
+        self.delay()
+        path = urlparse(self.path).path.strip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        data = {
+            name: values[0]
+            for name, values in parse_qs(self.rfile.read(length).decode()).items()
+        }
+        if path == "uyegiris":
+            return self.login()
+
+        session = self.get_session()
+        if session is None:
+            return self.redirect("/uyegiris")
+        if path == "satiskiralik":
+            return self.court_postback(session, data)
+        if path == "uyesepet":
+            match = REMOVE_TARGET_REGEX.search(data.get("__EVENTTARGET", ""))
+            if match:
+                self.fake.remove_from_cart(session, int(match.group(1)))
+            return self.send_html(self.basket_page(session))
+        if path == "uyespor":
+            return self.send_html(self.reservations_page(session))
+        return self.send_error(404)
+
+    def delay(self):
+        self.fake.count("requests")
+        delay = self.fake.latency + random.uniform(0, self.fake.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def get_session(self):
+        cookies = self.headers.get("Cookie") or ""
+        match = re.search(r"ASP\.NET_SessionId=([^;]+)", cookies)
+        return self.fake.sessions.get(match.group(1)) if match else None
+
+    def login(self):
+        session_id = uuid.uuid4().hex
+        self.fake.sessions[session_id] = {"basket": [], "pending": None}
+        self.fake.count("logins")
+        self.send_response(302)
+        self.send_header("Set-Cookie", f"ASP.NET_SessionId={session_id}; path=/")
+        self.send_header("Location", "/anasayfa")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def court_postback(self, session, data):
+        event_target = data.get("__EVENTTARGET", "")
+        court_id = data.get("ctl00$pageContent$ddlSalonFiltre")
+
+        match = RESERVATION_TARGET_REGEX.search(event_target)
+        if match:
+            date = self.fake.get_dates()[int(match.group(1))]
+            hour = HOURS[int(match.group(2))]
+            # Like ASP.NET, a postback of a link that is no longer rendered
+            # only refreshes the panel
+            if not self.fake.is_reservable(court_id, date, hour):
+                panel = "".join(self.slot_grid(court_id))
+            else:
+                session["pending"] = (court_id, date, hour)
+                panel = (
+                    '<div id="pageContent_pnlKiralikSatis">Kiralama Seçimi'
+                    '<input id="pageContent_rblKiralikTenisSatisTuru_2" type="radio" '
+                    'name="ctl00$pageContent$rblKiralikTenisSatisTuru" value="3"/></div>'
+                )
+            return self.send_text(
+                delta(
+                    ("updatePanel", "pageContent_UpdatePanel1", panel),
+                    ("hiddenField", "__VIEWSTATE", uuid.uuid4().hex),
+                )
+            )
+
+        if event_target == ADD_TO_CART_TARGET:
+            if session["pending"] is None or not self.fake.add_to_cart(
+                session, session["pending"]
+            ):
+                return self.send_text(delta(("error", "409", "Slot taken")), 409)
+            session["pending"] = None
+            return self.send_text(
+                delta(("updatePanel", "pageContent_UpdatePanel1", "Sepete eklendi"))
+            )
+
+        page = self.court_page(session, data)
+        if event_target.startswith(CHOICE_TARGET) and session["pending"]:
+            page += (
+                '<a id="pageContent_lbtnSepeteEkle" '
+                f'href="javascript:__doPostBack(&#39;{ADD_TO_CART_TARGET}&#39;,&#39;&#39;)">'
+                "Sepete Ekle</a>"
+            )
+        return self.send_html(page)
+
+    def send_html(self, body, status=200):
+        self.send_body(body, "text/html; charset=utf-8", status)
+
+    def send_text(self, body, status=200):
+        self.send_body(body, "text/plain; charset=utf-8", status)
+
+    def send_body(self, body, content_type, status):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    @staticmethod
+    def login_page():
+        return (
+            '<form method="post" action="./uyegiris" id="form1">'
+            '<input type="text" name="txtTCPasaport"/>'
+            '<input type="password" name="txtSifre"/>'
+            '<input type="submit" name="btnGirisYap" value="Giriş Yap"/>'
+            "</form>"
+        )
+
+    @staticmethod
+    def select(name, element_id, options, selected):
+        return (
+            f'<select name="{name}" id="{element_id}"><option value="">Seçiniz</option>'
+            + "".join(
+                f'<option value="{value}"'
+                + (' selected="selected"' if value == selected else "")
+                + f">{value}</option>"
+                for value in options
+            )
+            + "</select>"
+        )
+
+    def court_page(self, session, data):
+        branch_id = data.get("ctl00$pageContent$ddlBransFiltre")
+        complex_id = data.get("ctl00$pageContent$ddlTesisFiltre")
+        court_id = data.get("ctl00$pageContent$ddlSalonFiltre")
+        parts = [
+            '<form method="post" action="./satiskiralik" id="form1">',
+            f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{uuid.uuid4().hex}"/>',
+            self.select(
+                "ctl00$pageContent$ddlBransFiltre",
+                "ddlBransFiltre",
+                [BRANCH_TENNIS_ID],
+                branch_id,
+            ),
+            self.select(
+                "ctl00$pageContent$ddlTesisFiltre",
+                "ddlTesisFiltre",
+                [COMPLEX_MALTEPE_ID] if branch_id else [],
+                complex_id,
+            ),
+            self.select(
+                "ctl00$pageContent$ddlSalonFiltre",
+                "ddlSalonFiltre",
+                self.fake.courts if complex_id else [],
+                court_id,
+            ),
+        ]
+        if court_id in self.fake.courts:
+            parts.extend(self.slot_grid(court_id))
+        parts.append("</form>")
+        return "".join(parts)
+
+    def slot_grid(self, court_id):
+        for day_index, date in enumerate(self.fake.get_dates()):
+            yield (
+                '<div class="panel panel-info"><div class="panel-heading">'
+                f"<h3>{DAYS[date.weekday()]} {date.strftime('%d.%m.%Y')}</h3></div>"
+                '<div class="panel-body">'
+            )
+            if day_index < self.fake.reservable_days:
+                for hour in HOURS:
+                    yield self.slot_well(court_id, date, hour)
+            yield "</div></div>"
+
+    def slot_well(self, court_id, date, hour):
+        slot = f"<span>{hour:02d}:00 - {hour + 1:02d}:00</span>"
+        if self.fake.remaining(court_id, date, hour) <= 0:
+            return (
+                '<div class="well wellPlus"><div>Başka Üye Sepetinde</div>'
+                f"{slot}</div>"
+            )
+        event_target = self.fake.event_target(date, hour)
+        return (
+            f'<div class="well wellPlus"><div>Rezervasyon</div>{slot}'
+            f'<a href="javascript:__doPostBack(&#39;{event_target}&#39;,&#39;&#39;)">'
+            "Rezervasyon</a></div>"
+        )
+
+    def basket_page(self, session):
+        rows = "".join(
+            f"<tr><td>{court_id}</td><td>{hour:02d}:00</td>"
+            f"<td>{date.strftime('%d.%m.%Y')} - {date.strftime('%d.%m.%Y')}</td>"
+            f"<td><a href=\"javascript:__doPostBack('ctl00$pageContent$rptSepet$ctl{index:02d}$lbSil','')\">Sil</a></td></tr>"
+            for index, (court_id, date, hour) in enumerate(session["basket"])
+        )
+        return (
+            '<form method="post" action="./uyesepet" id="form1">'
+            '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="VS"/>'
+            f'<table id="dataTable1"><tbody>{rows}</tbody></table></form>'
+        )
+
+    def reservations_page(self, session):
+        rows = "".join(
+            f"<tr><td>{index}</td><td>{court_id}</td>"
+            f"<td>{hour:02d}:00:00 - {hour + 1:02d}:00:00</td>"
+            f"<td>{date.strftime('%d.%m.%Y')} - {date.strftime('%d.%m.%Y')}</td>"
+            "<td>Sepette</td><td>-</td></tr>"
+            for index, (court_id, date, hour) in enumerate(session["basket"])
+        )
+        return (
+            '<form method="post" action="./uyespor" id="form1">'
+            '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="VS"/>'
+            f'<table id="dtUyeSpor"><tbody>{rows}</tbody></table></form>'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the fake upstream site")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=1)
+    options = parser.parse_args()
+
+    fake = FakeUpstream(
+        capacity=options.capacity, latency=options.latency, jitter=options.jitter
+    )
+    print(f"Fake upstream listening on {fake.start(port=options.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
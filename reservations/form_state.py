@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from reservations.browser import HtmlForm
+
+
+class FormStateCache:
+    CACHE_KEY = "form-state:{}:{}:{}"
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def get(self, branch_id, complex_id, pitch_id):
+        return cache.get(self.CACHE_KEY.format(branch_id, complex_id, pitch_id))
+
+    def set(self, branch_id, complex_id, pitch_id, page, url):
+        # The whole form of the filtered court page, hidden ASP.NET fields
+        # included, reposted as is lands on the same court page
+        form = page.find("form")
+        if form is None:
+            return
+        cache.set(
+            self.CACHE_KEY.format(branch_id, complex_id, pitch_id),
+            {"url": url, "data": HtmlForm(form).data},
+            timeout=self.ttl,
+        )
+
+    def invalidate(self, branch_id, complex_id, pitch_id):
+        cache.delete(self.CACHE_KEY.format(branch_id, complex_id, pitch_id))
+
+
+form_state_cache = FormStateCache(ttl=settings.FORM_STATE_CACHE_TTL_SECONDS)
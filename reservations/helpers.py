@@ -1,25 +1,14 @@
-import re
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
 
 from reservations.enums import StatusCode
 from reservations.models import ReservationJob
-
-sls = [
-    "07:00 - 08:00",
-    "08:00 - 09:00",
-    "09:00 - 10:00",
-    "10:00 - 11:00",
-    "11:00 - 12:00",
-    "12:00 - 13:00",
-    "13:00 - 14:00",
-    "14:00 - 15:00",
-    "16:00 - 17:00",
-    "17:00 - 18:00",
-    "18:00 - 19:00",
-    "19:00 - 20:00",
-]
-RESERVED = "Rezervasyonu"
-SEPET = "Sepetinde"
+from reservations.parsers.slots import parse_slot_grid
 
 
 def create_reservation_job(selection, user):
@@ -36,13 +25,18 @@ def create_reservation_job(selection, user):
     if time_diff_in_hours in reservation_hours_range:
         execution_time = now
         execution_type = ReservationJob.IMMEDIATE
+        opens_at = None
     else:
         # To be able to convert to UTC
-        # Slots are open 3 days before, however there is a buffer of 10 seconds before the slot is opened
-        execution_time = slot_date_time - timedelta(days=3, hours=3, seconds=10)
+        # Slots are open 3 days before, the chain is warmed up before the slot is opened
+        opens_at = timezone.make_aware(slot_date_time - timedelta(days=3, hours=3))
+        execution_time = opens_at - timedelta(
+            seconds=settings.RESERVATION_PREWARM_SECONDS
+        )
         execution_type = ReservationJob.ETA
     return ReservationJob.objects.create(
         execution_time=execution_time,
+        opens_at=opens_at,
         selection=selection,
         user=user,
         execution_type=execution_type,
@@ -51,6 +45,7 @@ def create_reservation_job(selection, user):
 
 def send_reservation_email(reservation):
     from reservations.mail.client import mail_client
+    from reservations.mail.queue import notification_queue
 
     user = reservation.user
     selection = reservation.selection
@@ -63,95 +58,269 @@ def send_reservation_email(reservation):
         "status": reservation.status,
     }
 
-    mail_client.send(context)
+    if settings.NOTIFICATION_QUEUE_ENABLED and settings.MAIL_ENABLED:
+        # Sent in batches by drain_notifications
+        notification_queue.push(context)
+    else:
+        mail_client.send(context)
 
 
-def show_slots(browser, show_future_slots=True):
-    data = {}
-    slots = []
+def show_slots(content, show_future_slots=True):
+    return parse_slot_grid(content, show_future_slots=show_future_slots)
 
-    r = re.compile(r"(Pazartesi|Salı|Çarşamba|Perşembe|\bCuma\b|Cumartesi|Pazar)")
 
-    page = browser.page
+def fetch_slots(user, court_selection, show_future_slots=True):
+    from reservations.commands.base import (FillFormCommand, LoginCommand,
+                                            ReservationCommandRunner)
+    from selections.models import Selection, SportSelection
 
-    panel_infos = page.find_all("div", {"class": "panel panel-info"})
-    court_data = page.find("select", {"id": "ddlSalonFiltre"}).find(
-        "option", {"selected": "selected"}
+    sport_selection = SportSelection.objects.get(pitch_id=court_selection)
+    selection = Selection.objects.filter(sport_selection=sport_selection).last()
+    runner = ReservationCommandRunner(
+        user,
+        selection,
+        sport_selection,
+        commands=[LoginCommand(), FillFormCommand()],
+        court_selection=court_selection,
+        chain_type="show-slots",
     )
-    data["court"] = court_data.text
-    data["court_id"] = court_data["value"]
+    runner()
+    return show_slots(runner.response.content, show_future_slots=show_future_slots)
 
-    reservation_hours_range = range(0, 72)
-    now = datetime.now().replace(tzinfo=None)
-    now_in_turkish_timezone = now + timedelta(hours=3)
 
-    for pinfo in panel_infos:
-        h3 = pinfo.find("h3").text
-        day = r.match(h3).group()
-        date = re.search(r"(\d+\.\d+\.\d+)", h3).group()
-
-        wells = pinfo.find_all("div", {"class": "well wellPlus"})
-
-        day_info = {"day": day, "date": date, "slots": []}
-        day_slots = day_info["slots"]
-
-        for well in wells:
-            status = well.find("div").text
-            if RESERVED in status:
-                continue
-            slot = well.find("span").text
-            anchor = well.select('a[href^="javascript:__doPostBack"]')
-            if anchor:
-                is_reservable = True
-                href = anchor[0].get("href")
-                eventtarget = href[
-                    href.find("ctl") : href.find("Rezervasyon") + len("Rezervasyon")
-                ]
-            else:
-                eventtarget = None
-                is_reservable = False
-
-            if is_reservable:
-                status_code = StatusCode.RESERVABLE.value
-                status = "Reservable"
-            else:
-                status_code = (
-                    StatusCode.ANOTHER_BASKET.value
-                    if SEPET in status
-                    else StatusCode.NO_SLOTS.value
-                )
+class SlotFetchError(Exception):
+    pass
+
+
+def fetch_many_slots(user, sport_selections, show_future_slots=True):
+    from reservations.commands.base import (FillFormCommand, LoginCommand,
+                                            ReservationCommandRunner)
+
+    # Log in once and fill the form of every court concurrently on that session
+    login_runner = ReservationCommandRunner(
+        user,
+        None,
+        sport_selections[0],
+        commands=[LoginCommand()],
+        court_selection=sport_selections[0].pitch_id,
+        chain_type="show-slots",
+    )
 
-            day_slots.append(
-                {
-                    "slot": slot,
-                    "status": status,
-                    "status_code": status_code,
-                    "is_reservable": is_reservable,
-                    "event_target": eventtarget,
-                }
+    def fetch_court_slots(sport_selection):
+        runner = ReservationCommandRunner(
+            user,
+            None,
+            sport_selection,
+            commands=[FillFormCommand()],
+            court_selection=sport_selection.pitch_id,
+            session=login_runner.browser.session,
+            chain_type="show-slots",
+        )
+        try:
+            runner()
+        finally:
+            connections.close_all()
+        if runner.is_failure or runner.response is None:
+            raise SlotFetchError(
+                f"Could not fetch the slots of court {sport_selection.pitch_id}"
             )
+        return show_slots(runner.response.content, show_future_slots=show_future_slots)
 
-        if not day_slots and show_future_slots:
-            date_obj = datetime.strptime(date, "%d.%m.%Y")
-            time_diff_in_hours = (
-                (date_obj - now_in_turkish_timezone).total_seconds() // 60 // 60
+    try:
+        # Pages fetched on a session that is not logged in must not be cached
+        login_runner(keep_session=True)
+        if login_runner.is_failure:
+            raise SlotFetchError(f"Could not log in upstream as {user}")
+        with ThreadPoolExecutor(
+            max_workers=settings.SLOT_FETCH_MAX_WORKERS
+        ) as executor:
+            courts_data = list(executor.map(fetch_court_slots, sport_selections))
+    finally:
+        login_runner.release_session()
+
+    return {
+        sport_selection.pitch_id: data
+        for sport_selection, data in zip(sport_selections, courts_data)
+    }
+
+
+def save_slot_availability(sport_selection, slots_data, observed_at):
+    from selections.models import Slot, SlotAvailability
+
+    availabilities = [
+        SlotAvailability(
+            sport_selection=sport_selection,
+            date=datetime.strptime(day["date"], "%d.%m.%Y").date(),
+            hour=int(slot["slot"][:2]),
+            status_code=slot["status_code"],
+            event_target=slot["event_target"],
+            observed_at=observed_at,
+        )
+        for day in slots_data["slots"]
+        for slot in day["slots"]
+    ]
+    SlotAvailability.objects.bulk_create(
+        availabilities,
+        update_conflicts=True,
+        unique_fields=["sport_selection", "date", "hour"],
+        update_fields=["status_code", "event_target", "observed_at", "modified_at"],
+    )
+
+    # Reserved wells are left out of the grid, known slots of the crawled days
+    # missing from it have been taken since
+    crawled_dates = {
+        datetime.strptime(day["date"], "%d.%m.%Y").date() for day in slots_data["slots"]
+    }
+    crawled_slots = {
+        (availability.date, availability.hour) for availability in availabilities
+    }
+    taken_ids = [
+        availability.id
+        for availability in SlotAvailability.objects.filter(
+            sport_selection=sport_selection, date__in=crawled_dates
+        )
+        .exclude(status_code=StatusCode.ANOTHER_RESERVATION.value)
+        .only("id", "date", "hour")
+        if (availability.date, availability.hour) not in crawled_slots
+    ]
+    SlotAvailability.objects.filter(id__in=taken_ids).update(
+        status_code=StatusCode.ANOTHER_RESERVATION.value,
+        event_target=None,
+        observed_at=observed_at,
+        modified_at=observed_at,
+    )
+
+    # Keep the event targets of the slots users selected on this court current
+    event_targets = {
+        (availability.date, availability.hour): availability.event_target
+        for availability in availabilities
+        if availability.event_target
+    }
+    slots = Slot.objects.filter(
+        selection__sport_selection=sport_selection,
+        date_time__date__in=crawled_dates,
+    ).distinct()
+    changed_slots = []
+    for slot in slots:
+        key = (slot.date_time.date(), slot.date_time.hour)
+        event_target = event_targets.get(key)
+        if key not in crawled_slots and slot.event_target:
+            slot.event_target = None
+        elif event_target and slot.event_target != event_target:
+            slot.event_target = event_target
+        else:
+            continue
+        # bulk_update skips auto_now, this is how fresh the target is
+        slot.modified_at = observed_at
+        changed_slots.append(slot)
+    Slot.objects.bulk_update(changed_slots, ["event_target", "modified_at"])
+    return availabilities
+
+
+def get_known_event_target(selection):
+    from selections.models import SlotAvailability
+
+    # Only a target recently crawled from this court is reused. Targets are
+    # positions in the grid, which shifts by a day at upstream midnight, so
+    # one observed on an earlier upstream day points at another slot
+    upstream_time_zone = ZoneInfo(settings.UPSTREAM_TIME_ZONE)
+    now = timezone.now()
+    upstream_day_start = datetime.combine(
+        timezone.localdate(now, upstream_time_zone), time.min, upstream_time_zone
+    )
+    observed_after = max(
+        now - timedelta(seconds=settings.KNOWN_EVENT_TARGET_MAX_AGE_SECONDS),
+        upstream_day_start,
+    )
+    date_time = selection.slot.date_time
+    availability = (
+        SlotAvailability.objects.filter(
+            sport_selection=selection.sport_selection,
+            date=date_time.date(),
+            hour=date_time.hour,
+            status_code=StatusCode.RESERVABLE.value,
+            event_target__isnull=False,
+            observed_at__gte=observed_after,
+        )
+        .only("event_target")
+        .first()
+    )
+    return availability.event_target if availability else None
+
+
+def get_cached_slots(user, court_selection, show_future_slots=True):
+    from reservations.slot_cache import slot_cache
+    from reservations.tasks import refresh_slots
+
+    snapshot = slot_cache.get(court_selection, show_future_slots)
+    if snapshot is None:
+        # One request fetches a cold snapshot, the others wait for it
+        is_filling = slot_cache.acquire_refresh(court_selection, show_future_slots)
+        if not is_filling:
+            snapshot = slot_cache.wait(court_selection, show_future_slots)
+        if snapshot is None:
+            try:
+                snapshot = slot_cache.set(
+                    court_selection,
+                    show_future_slots,
+                    fetch_slots(user, court_selection, show_future_slots),
+                )
+            finally:
+                if is_filling:
+                    slot_cache.release_refresh(court_selection, show_future_slots)
+    elif not slot_cache.is_fresh(snapshot) and slot_cache.acquire_refresh(
+        court_selection, show_future_slots
+    ):
+        refresh_slots.delay(court_selection, show_future_slots, user.id)
+    return snapshot
+
+
+def get_many_cached_slots(user, sport_selections, show_future_slots=True):
+    from reservations.slot_cache import slot_cache
+    from reservations.tasks import refresh_slots
+
+    snapshots = {}
+    missing_sport_selections = []
+    for sport_selection in sport_selections:
+        court_selection = sport_selection.pitch_id
+        snapshot = slot_cache.get(court_selection, show_future_slots)
+        if snapshot is None:
+            missing_sport_selections.append(sport_selection)
+            continue
+        if not slot_cache.is_fresh(snapshot) and slot_cache.acquire_refresh(
+            court_selection, show_future_slots
+        ):
+            refresh_slots.delay(court_selection, show_future_slots, user.id)
+        snapshots[court_selection] = snapshot
+
+    # One request fetches a cold snapshot, the others wait for it
+    locked_court_selections = {
+        sport_selection.pitch_id
+        for sport_selection in missing_sport_selections
+        if slot_cache.acquire_refresh(sport_selection.pitch_id, show_future_slots)
+    }
+    filling_sport_selections = []
+    for sport_selection in missing_sport_selections:
+        court_selection = sport_selection.pitch_id
+        snapshot = None
+        if court_selection not in locked_court_selections:
+            snapshot = slot_cache.wait(court_selection, show_future_slots)
+        if snapshot is None:
+            filling_sport_selections.append(sport_selection)
+        else:
+            snapshots[court_selection] = snapshot
+
+    if filling_sport_selections:
+        try:
+            courts_data = fetch_many_slots(
+                user, filling_sport_selections, show_future_slots
             )
-            if (time_diff_in_hours not in reservation_hours_range) and (
-                date_obj > now_in_turkish_timezone
-            ):
-                [
-                    day_slots.append(
-                        {
-                            "slot": sl,
-                            "status": "Reservable ETA",
-                            "status_code": StatusCode.WILL_BE_AVAILABLE.value,
-                            "is_reservable": True,
-                            "event_target": None,
-                        }
-                    )
-                    for sl in sls
-                ]
-
-        slots.append(day_info)
-    data["slots"] = slots
-    return data
+            for court_selection, data in courts_data.items():
+                snapshots[court_selection] = slot_cache.set(
+                    court_selection, show_future_slots, data
+                )
+        finally:
+            for court_selection in locked_court_selections:
+                slot_cache.release_refresh(court_selection, show_future_slots)
+
+    return [snapshots[sport_selection.pitch_id] for sport_selection in sport_selections]
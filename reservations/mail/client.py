@@ -12,39 +12,82 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class MailjetUnavailable(Exception):
+    # Mailjet throttled the send call or failed on its side
+    pass
+
+
 class MailJetClient(metaclass=Singleton):
+    # Templates are compiled once per process, the client is a singleton
     def __init__(self):
         self.api_key = settings.MAILJET_API_KEY
         self.secret_key = settings.MAILJET_SECRET_KEY
-        self.client = Client(auth=(self.api_key, self.secret_key), version="v3.1")
 
         self.html = get_template("reservations/reservation.html")
         self.txt = get_template("reservations/reservation.txt")
 
         self.subject = "About Your Reservation"
+        self.clients = {}
+
+    @property
+    def client(self):
+        # Built once per API url, tests and load tests point it elsewhere
+        api_url = settings.MAILJET_API_URL
+        if api_url not in self.clients:
+            self.clients[api_url] = Client(
+                auth=(self.api_key, self.secret_key),
+                version="v3.1",
+                api_url=api_url,
+            )
+        return self.clients[api_url]
+
+    def build_message(self, context):
+        context = dict(context)
+        return {
+            "From": {
+                "Email": "basket.stanbul@gmail.com",
+                "Name": "Basket Istanbul",
+            },
+            "To": [{"Email": context.pop("email"), "Name": context["first_name"]}],
+            "Subject": self.subject,
+            "TextPart": self.txt.render(context),
+            "HTMLPart": self.html.render(context),
+        }
 
     def send(self, context):
         if not settings.MAIL_ENABLED:
             return False
 
-        data = {
-            "Messages": [
-                {
-                    "From": {
-                        "Email": "basket.stanbul@gmail.com",
-                        "Name": "Basket Istanbul",
-                    },
-                    "To": [
-                        {"Email": context.pop("email"), "Name": context["first_name"]}
-                    ],
-                    "Subject": self.subject,
-                    "TextPart": self.txt.render(context),
-                    "HTMLPart": self.html.render(context),
-                }
-            ]
-        }
-        result = self.client.send.create(data=data)
-        return result.status_code == 200
+        try:
+            return not self.send_batch([context])
+        except MailjetUnavailable:
+            return False
+
+    def send_batch(self, contexts):
+        # The contexts Mailjet did not send, all of them when mails are off
+        if not settings.MAIL_ENABLED:
+            return list(contexts)
+
+        data = {"Messages": [self.build_message(context) for context in contexts]}
+        response = self.client.send.create(data=data)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise MailjetUnavailable(f"Mailjet responded with {response.status_code}")
+        return self.get_failed_contexts(response, contexts)
+
+    @staticmethod
+    def get_failed_contexts(response, contexts):
+        # Every message has a status of its own, a 400 may still have sent some
+        try:
+            results = response.json()["Messages"]
+        except (ValueError, KeyError, TypeError):
+            results = []
+        if len(results) != len(contexts):
+            return [] if response.status_code == 200 else list(contexts)
+        return [
+            context
+            for context, result in zip(contexts, results)
+            if result.get("Status") != "success"
+        ]
 
 
 mail_client = MailJetClient()
@@ -0,0 +1,147 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Mailjet rejects send calls carrying more messages
+MAX_MESSAGES = 50
+
+
+class FakeMailjet:
+    # Stand-in for the Mailjet v3.1 send API, accepting every well formed
+    # message after `latency` seconds. Calls fail with `error_status` when it
+    # is set, messages to `rejected_emails` are answered with an error.
+    def __init__(self, latency=0.1, error_status=None, rejected_emails=()):
+        self.latency = latency
+        self.error_status = error_status
+        self.rejected_emails = set(rejected_emails)
+
+        self.stats = Counter()
+        self.message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = None
+
+    def start(self, host="127.0.0.1", port=0):
+        mailjet = self
+
+        class Handler(FakeMailjetHandler):
+            fake = mailjet
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, **counts):
+        with self._lock:
+            self.stats.update(counts)
+
+    def message_result(self, message):
+        rejected = [
+            recipient["Email"]
+            for recipient in message.get("To", [])
+            if recipient["Email"] in self.rejected_emails
+        ]
+        if rejected:
+            return {
+                "Status": "error",
+                "Errors": [
+                    {
+                        "ErrorCode": "mj-0013",
+                        "StatusCode": 400,
+                        "ErrorMessage": f'"{rejected[0]}" is an invalid email address.',
+                        "ErrorRelatedTo": ["To[0].Email"],
+                    }
+                ],
+            }
+
+        with self._lock:
+            message_id = next(self.message_ids)
+        return {
+            "Status": "success",
+            "CustomID": message.get("CustomID", ""),
+            "To": [
+                {
+                    "Email": recipient["Email"],
+                    "MessageUUID": str(uuid.uuid4()),
+                    "MessageID": message_id,
+                    "MessageHref": f"https://api.mailjet.com/v3/REST/message/{message_id}",
+                }
+                for recipient in message.get("To", [])
+            ],
+            "Cc": [],
+            "Bcc": [],
+        }
+
+
+class FakeMailjetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        time.sleep(self.fake.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if urlparse(self.path).path != "/v3.1/send":
+            return self.send_json(404, {"ErrorMessage": "Not found"})
+
+        try:
+            messages = json.loads(body)["Messages"]
+        except (ValueError, KeyError, TypeError):
+            return self.send_json(400, {"ErrorMessage": "Invalid payload"})
+        if not messages or len(messages) > MAX_MESSAGES:
+            self.fake.count(rejected_calls=1)
+            return self.send_json(
+                400, {"ErrorMessage": f"Between 1 and {MAX_MESSAGES} messages"}
+            )
+
+        if self.fake.error_status:
+            self.fake.count(failed_calls=1)
+            return self.send_json(
+                self.fake.error_status, {"ErrorMessage": "Service unavailable"}
+            )
+
+        results = [self.fake.message_result(m) for m in messages]
+        errors = sum(result["Status"] != "success" for result in results)
+        self.fake.count(calls=1, messages=len(messages) - errors)
+        # Like Mailjet, a call with any rejected message is answered with 400
+        self.send_json(400 if errors else 200, {"Messages": results})
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the fake Mailjet send API")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.1)
+    options = parser.parse_args()
+
+    fake = FakeMailjet(latency=options.latency)
+    print(f"Fake Mailjet listening on {fake.start(port=options.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
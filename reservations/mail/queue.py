@@ -0,0 +1,139 @@
+import json
+import time
+import uuid
+
+import redis
+from django.conf import settings
+
+CLAIM_SCRIPT = """
+local messages = redis.call("LRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #messages > 0 then
+    redis.call("LTRIM", KEYS[1], #messages, -1)
+    redis.call("RPUSH", KEYS[2], unpack(messages))
+    redis.call("ZADD", KEYS[3], ARGV[2], KEYS[2])
+end
+return messages
+"""
+
+RESTORE_SCRIPT = """
+local messages = redis.call("LRANGE", KEYS[2], 0, -1)
+for index = #messages, 1, -1 do
+    redis.call("LPUSH", KEYS[1], messages[index])
+end
+redis.call("DEL", KEYS[2])
+redis.call("ZREM", KEYS[3], KEYS[2])
+return #messages
+"""
+
+
+class NotificationQueue:
+    # Reservation emails waiting to be sent, as JSON template contexts in a
+    # Redis list
+    def __init__(self, url, key="notifications"):
+        self.redis = redis.Redis.from_url(url)
+        self.key = key
+        # Processing lists of the batches being sent, by the time they were
+        # claimed
+        self.batches_key = f"{key}:batches"
+        self.claim_script = self.redis.register_script(CLAIM_SCRIPT)
+        self.restore_script = self.redis.register_script(RESTORE_SCRIPT)
+
+    def __len__(self):
+        return self.redis.llen(self.key)
+
+    def push(self, context):
+        self.push_many([context])
+
+    def push_many(self, contexts):
+        messages = [json.dumps(context) for context in contexts]
+        if messages:
+            self.redis.rpush(self.key, *messages)
+
+    def claim(self, count):
+        # Moves a batch to a processing list of its own in one step. It stays
+        # there until the send is acknowledged, a worker dying mid send loses
+        # nothing.
+        batch_key = f"{self.key}:batch:{uuid.uuid4().hex}"
+        messages = self.claim_script(
+            keys=[self.key, batch_key, self.batches_key], args=[count, time.time()]
+        )
+        return batch_key, [json.loads(message) for message in messages]
+
+    def ack(self, batch_key, retried=()):
+        # Drops the sent batch and queues the messages to retry in one step
+        messages = [json.dumps(context) for context in retried]
+        with self.redis.pipeline() as pipeline:
+            pipeline.delete(batch_key)
+            pipeline.zrem(self.batches_key, batch_key)
+            if messages:
+                pipeline.rpush(self.key, *messages)
+            pipeline.execute()
+
+    def restore(self, batch_key):
+        # Back at the head of the queue, in their original order
+        self.restore_script(keys=[self.key, batch_key, self.batches_key])
+
+    def recover(self):
+        # Batches of workers that died before acknowledging them
+        claimed_before = time.time() - settings.NOTIFICATION_PROCESSING_TIMEOUT_SECONDS
+        for batch_key in self.redis.zrangebyscore(
+            self.batches_key, "-inf", claimed_before
+        ):
+            self.restore(batch_key.decode())
+
+    def back_off(self):
+        self.redis.set(
+            f"{self.key}:backoff", 1, ex=settings.NOTIFICATION_BACKOFF_SECONDS
+        )
+
+    def is_backing_off(self):
+        return bool(self.redis.exists(f"{self.key}:backoff"))
+
+    @staticmethod
+    def get_retries(contexts):
+        # Messages Mailjet did not send are tried again by the next drains and
+        # dropped once they run out of attempts
+        retried = []
+        for context in contexts:
+            context["attempts"] = context.get("attempts", 0) + 1
+            if context["attempts"] < settings.NOTIFICATION_MAX_ATTEMPTS:
+                retried.append(context)
+            else:
+                print(f"Dropping the notification to {context['email']}")
+        return retried
+
+    def drain(self, client, batch_size):
+        if self.is_backing_off():
+            return 0
+        self.recover()
+
+        sent = 0
+        # Messages queued again by this drain are left to the next one
+        remaining = len(self)
+        while remaining > 0:
+            batch_key, contexts = self.claim(min(batch_size, remaining))
+            if not contexts:
+                break
+            remaining -= len(contexts)
+
+            try:
+                failed_contexts = client.send_batch(contexts)
+            except Exception as error:
+                # Mailjet is unreachable or throttling us, the batch waits for
+                # the first drain after the backoff
+                self.restore(batch_key)
+                self.back_off()
+                print(f"Could not send {len(contexts)} notifications: {error}")
+                break
+
+            sent += len(contexts) - len(failed_contexts)
+            if failed_contexts:
+                print(
+                    f"Mailjet did not send {len(failed_contexts)} of "
+                    f"{len(contexts)} notifications"
+                )
+            self.ack(batch_key, self.get_retries(failed_contexts))
+        return sent
+
+
+notification_queue = NotificationQueue(settings.NOTIFICATION_QUEUE_URL)
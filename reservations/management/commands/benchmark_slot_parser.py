@@ -0,0 +1,134 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from reservations.enums import StatusCode
+from reservations.parsers.slots import RESERVED, SEPET, parse_slot_grid, sls
+
+
+def show_slots_soup(content, show_future_slots=True):
+    # The BeautifulSoup implementation the lxml parser replaced, kept as the
+    # baseline to measure against
+    data = {}
+    slots = []
+
+    r = re.compile(r"(Pazartesi|Salı|Çarşamba|Perşembe|\bCuma\b|Cumartesi|Pazar)")
+
+    page = BeautifulSoup(content, "lxml")
+
+    panel_infos = page.find_all("div", {"class": "panel panel-info"})
+    court_data = page.find("select", {"id": "ddlSalonFiltre"}).find(
+        "option", {"selected": "selected"}
+    )
+    data["court"] = court_data.text
+    data["court_id"] = court_data["value"]
+
+    reservation_hours_range = range(0, 72)
+    now = datetime.now().replace(tzinfo=None)
+    now_in_turkish_timezone = now + timedelta(hours=3)
+
+    for pinfo in panel_infos:
+        h3 = pinfo.find("h3").text
+        day = r.match(h3).group()
+        date = re.search(r"(\d+\.\d+\.\d+)", h3).group()
+
+        wells = pinfo.find_all("div", {"class": "well wellPlus"})
+
+        day_info = {"day": day, "date": date, "slots": []}
+        day_slots = day_info["slots"]
+
+        for well in wells:
+            status = well.find("div").text
+            if RESERVED in status:
+                continue
+            slot = well.find("span").text
+            anchor = well.select('a[href^="javascript:__doPostBack"]')
+            if anchor:
+                is_reservable = True
+                href = anchor[0].get("href")
+                eventtarget = href[
+                    href.find("ctl") : href.find("Rezervasyon") + len("Rezervasyon")
+                ]
+            else:
+                eventtarget = None
+                is_reservable = False
+
+            if is_reservable:
+                status_code = StatusCode.RESERVABLE.value
+                status = "Reservable"
+            else:
+                status_code = (
+                    StatusCode.ANOTHER_BASKET.value
+                    if SEPET in status
+                    else StatusCode.NO_SLOTS.value
+                )
+
+            day_slots.append(
+                {
+                    "slot": slot,
+                    "status": status,
+                    "status_code": status_code,
+                    "is_reservable": is_reservable,
+                    "event_target": eventtarget,
+                }
+            )
+
+        if not day_slots and show_future_slots:
+            date_obj = datetime.strptime(date, "%d.%m.%Y")
+            time_diff_in_hours = (
+                (date_obj - now_in_turkish_timezone).total_seconds() // 60 // 60
+            )
+            if (time_diff_in_hours not in reservation_hours_range) and (
+                date_obj > now_in_turkish_timezone
+            ):
+                [
+                    day_slots.append(
+                        {
+                            "slot": sl,
+                            "status": "Reservable ETA",
+                            "status_code": StatusCode.WILL_BE_AVAILABLE.value,
+                            "is_reservable": True,
+                            "event_target": None,
+                        }
+                    )
+                    for sl in sls
+                ]
+
+        slots.append(day_info)
+    data["slots"] = slots
+    return data
+
+
+class Command(BaseCommand):
+    help = "Compares the lxml slot grid parser with the BeautifulSoup one on captured court pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("pages", nargs="+", help="Captured court page files")
+        parser.add_argument("--iterations", type=int, default=100)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        for path in options["pages"]:
+            with open(path, "rb") as page_file:
+                content = page_file.read()
+
+            if parse_slot_grid(content) != show_slots_soup(content):
+                self.stderr.write(f"{path}: parsers disagree")
+                continue
+
+            soup_time = self.measure(show_slots_soup, content, iterations)
+            lxml_time = self.measure(parse_slot_grid, content, iterations)
+            self.stdout.write(
+                f"{path}: BeautifulSoup {soup_time * 1000:.2f}ms, "
+                f"lxml {lxml_time * 1000:.2f}ms, {soup_time / lxml_time:.1f}x faster"
+            )
+
+    @staticmethod
+    def measure(parse, content, iterations):
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            parse(content)
+        return (time.perf_counter() - started_at) / iterations
@@ -0,0 +1,149 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from reservations.commands.base import (AddToCartCommand, FillFormCommand,
+                                        LoginCommand, ReservationChoiceCommand,
+                                        ReservationClickCommand,
+                                        ReservationCommandRunner,
+                                        ResolveEventTargetCommand)
+from reservations.fake_upstream import HOURS, FakeUpstream
+from reservations.sessions import session_pool
+from selections.constants import COMPLEX_MALTEPE_ID
+from selections.models import Selection, Slot, SportSelection
+
+
+class Command(BaseCommand):
+    help = "Drives concurrent reservation chains against the fake upstream site"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runners", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument(
+            "--slots",
+            type=int,
+            default=10,
+            help="Distinct slots the runners compete for",
+        )
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument("--jitter", type=float, default=0.0)
+        parser.add_argument("--capacity", type=int, default=1)
+        parser.add_argument(
+            "--known-event-targets",
+            action="store_true",
+            help="Start the chains with the event target of their slot, as a fresh availability snapshot would",
+        )
+        parser.add_argument(
+            "--upstream-url",
+            help="Use an already running fake upstream instead of starting one",
+        )
+
+    def handle(self, *args, **options):
+        fake = None
+        upstream_url = options["upstream_url"]
+        if not upstream_url:
+            fake = FakeUpstream(
+                capacity=options["capacity"],
+                latency=options["latency"],
+                jitter=options["jitter"],
+            )
+            upstream_url = fake.start()
+
+        # Chains keep off the database, Redis and the transcript directory. The
+        # session pool is built at import time, its mode is switched directly.
+        shared = session_pool.shared
+        session_pool.shared = False
+        try:
+            with override_settings(
+                UPSTREAM_BASE_URL=upstream_url,
+                FORM_STATE_CACHE_ENABLED=False,
+                RESERVATION_TRANSCRIPT_DIR=None,
+                RESERVATION_ATTEMPTS_ENABLED=False,
+                RESERVATION_PACING_MODE="fast",
+            ):
+                upstream = fake or FakeUpstream()
+                runners = [
+                    self.build_runner(
+                        index,
+                        upstream,
+                        options["slots"],
+                        options["known_event_targets"],
+                    )
+                    for index in range(options["runners"])
+                ]
+                started_at = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                    durations = list(executor.map(self.run, runners))
+                elapsed = time.perf_counter() - started_at
+        finally:
+            session_pool.shared = shared
+
+        if fake:
+            fake.stop()
+        self.report(runners, durations, elapsed, fake)
+
+    @staticmethod
+    def build_runner(index, fake, slot_count, known_event_target=False):
+        user = get_user_model()(
+            pk=index + 1, tckn=f"{index:011d}", third_party_app_password="loadtest"
+        )
+        slot_index = index % slot_count
+        court_id = fake.courts[slot_index % len(fake.courts)]
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        hour = HOURS[(slot_index // len(fake.courts)) % len(HOURS)]
+        sport_selection = SportSelection(
+            pitch_id=court_id, complex_id=COMPLEX_MALTEPE_ID
+        )
+        slot = Slot(
+            date_time=datetime(tomorrow.year, tomorrow.month, tomorrow.day, hour)
+        )
+        return ReservationCommandRunner(
+            user,
+            Selection(sport_selection=sport_selection, slot=slot),
+            sport_selection,
+            event_target=fake.event_target(tomorrow, hour)
+            if known_event_target
+            else None,
+            commands=[
+                LoginCommand(),
+                FillFormCommand(),
+                ResolveEventTargetCommand(),
+                ReservationClickCommand(),
+                ReservationChoiceCommand(),
+                AddToCartCommand(),
+            ],
+        )
+
+    @staticmethod
+    def run(runner):
+        started_at = time.perf_counter()
+        try:
+            runner()
+        except Exception as error:
+            print(f"Chain raised {error!r}")
+            runner.is_failure = True
+        return time.perf_counter() - started_at
+
+    def report(self, runners, durations, elapsed, fake):
+        durations = sorted(durations)
+        successes = sum(not runner.is_failure for runner in runners)
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+        self.stdout.write(
+            f"{len(runners)} chains in {elapsed:.2f}s, "
+            f"{len(runners) / elapsed:.1f} chains/s, "
+            f"p50 {statistics.median(durations) * 1000:.0f}ms, "
+            f"p99 {p99 * 1000:.0f}ms, "
+            f"success rate {successes / len(runners):.1%}"
+        )
+        if fake:
+            self.stdout.write(
+                f"Upstream served {fake.stats['requests']} requests, "
+                f"{fake.stats['connections']} connections, "
+                f"{fake.stats['logins']} logins, "
+                f"{fake.stats['contention_losses']} contention losses"
+            )
@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from reservations.mail.client import mail_client
+from reservations.mail.fake_mailjet import FakeMailjet
+from reservations.mail.queue import NotificationQueue
+
+
+class Command(BaseCommand):
+    help = "Drains queued notifications into the fake Mailjet API and measures the throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notifications", type=int, default=1000)
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.NOTIFICATION_BATCH_SIZE
+        )
+        parser.add_argument("--latency", type=float, default=0.1)
+        parser.add_argument(
+            "--mailjet-url",
+            help="Use an already running fake Mailjet instead of starting one",
+        )
+
+    def handle(self, *args, **options):
+        fake = None
+        mailjet_url = options["mailjet_url"]
+        if not mailjet_url:
+            fake = FakeMailjet(latency=options["latency"])
+            mailjet_url = fake.start()
+
+        # A key of its own, the queued reservation emails stay untouched
+        queue = NotificationQueue(
+            settings.NOTIFICATION_QUEUE_URL, key="notifications-loadtest"
+        )
+        queue.redis.delete(queue.key)
+        queue.push_many(
+            {
+                "email": f"loadtest-{index}@example.com",
+                "first_name": "Load Test",
+                "slot": "01.01.2030 10:00",
+                "info": "Maltepe Tenis Kortu",
+                "status": "IN_CART",
+            }
+            for index in range(options["notifications"])
+        )
+
+        with override_settings(MAILJET_API_URL=mailjet_url, MAIL_ENABLED=True):
+            started_at = time.perf_counter()
+            sent = queue.drain(mail_client, options["batch_size"])
+            elapsed = time.perf_counter() - started_at
+
+        queue.redis.delete(queue.key)
+        if fake:
+            fake.stop()
+        self.stdout.write(
+            f"{sent} notifications in {elapsed:.2f}s, {sent / elapsed:.1f} notifications/s"
+        )
+        if fake:
+            self.stdout.write(
+                f"Mailjet served {fake.stats['calls']} send calls, "
+                f"{fake.stats['rejected_calls']} rejected"
+            )
@@ -0,0 +1,91 @@
+import statistics
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from reservations.commands.base import (AddToCartCommand, FillFormCommand,
+                                        LoginCommand, ReservationChoiceCommand,
+                                        ReservationClickCommand,
+                                        ReservationCommandRunner,
+                                        ResolveEventTargetCommand)
+from reservations.pacing import PacingPolicy
+from reservations.transcripts import get_replay_session, load_transcript
+from selections.models import Selection, Slot, SportSelection
+
+# Everything but the waiting and the database writes of the recorded chain
+REPLAYED_COMMANDS = {
+    command.__name__: command
+    for command in (
+        LoginCommand,
+        FillFormCommand,
+        ResolveEventTargetCommand,
+        ReservationClickCommand,
+        ReservationChoiceCommand,
+        AddToCartCommand,
+    )
+}
+
+
+class Command(BaseCommand):
+    help = "Replays recorded reservation chains offline and measures the chain overhead"
+
+    def add_arguments(self, parser):
+        parser.add_argument("transcripts", nargs="+", help="Recorded transcript files")
+        parser.add_argument("--iterations", type=int, default=20)
+
+    # Nothing is written to the database or the cache while replaying
+    @override_settings(
+        FORM_STATE_CACHE_ENABLED=False,
+        UPSTREAM_SESSION_POOL_ENABLED=False,
+        RESERVATION_TRANSCRIPT_DIR=None,
+        RESERVATION_ATTEMPTS_ENABLED=False,
+    )
+    def handle(self, *args, **options):
+        for path in options["transcripts"]:
+            transcript = load_transcript(path)
+            durations = []
+            for _ in range(options["iterations"]):
+                runner = self.build_runner(transcript)
+                started_at = time.perf_counter()
+                runner()
+                durations.append(time.perf_counter() - started_at)
+                if runner.is_failure:
+                    self.stderr.write(f"{path}: chain failed on replay")
+                    break
+            else:
+                self.stdout.write(
+                    f"{path}: {len(transcript['exchanges'])} exchanges, "
+                    f"median {statistics.median(durations) * 1000:.2f}ms, "
+                    f"max {max(durations) * 1000:.2f}ms"
+                )
+                self.stdout.write(f"  {runner.format_step_timings()}")
+
+    @staticmethod
+    def build_runner(transcript):
+        meta = transcript["meta"]
+        user = get_user_model()(tckn="00000000000", third_party_app_password="replay")
+        sport_selection = SportSelection(
+            pitch_id=meta["court_selection"], complex_id=meta["complex_id"]
+        )
+        selection = None
+        if meta["slot_date_time"]:
+            slot = Slot(date_time=datetime.fromisoformat(meta["slot_date_time"]))
+            selection = Selection(sport_selection=sport_selection, slot=slot)
+
+        commands = [
+            REPLAYED_COMMANDS[name]()
+            for name in meta["commands"]
+            if name in REPLAYED_COMMANDS
+        ]
+        return ReservationCommandRunner(
+            user,
+            selection,
+            sport_selection,
+            commands=commands,
+            court_selection=meta["court_selection"],
+            pacing=PacingPolicy(),
+            session=get_replay_session(transcript),
+        )
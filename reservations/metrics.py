@@ -0,0 +1,91 @@
+import os
+from contextvars import ContextVar
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+COMMAND_DURATION = Histogram(
+    "reservation_command_duration_seconds",
+    "Time spent executing a reservation command",
+    ["command", "court", "chain"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+COMMAND_OUTCOMES = Counter(
+    "reservation_command_outcomes_total",
+    "Reservation command executions by outcome",
+    ["command", "court", "chain", "outcome"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_http_requests_total",
+    "Requests sent to the upstream site",
+    ["method", "status"],
+)
+UPSTREAM_BYTES = Counter(
+    "upstream_http_bytes_total",
+    "Bytes exchanged with the upstream site",
+    ["direction"],
+)
+
+
+# Step of the reservation chain running in the current thread or task
+current_step = ContextVar("current_step", default=None)
+
+
+def observe_command(runner_instance, command_name, duration, outcome):
+    labels = (
+        command_name,
+        runner_instance.court_selection or "",
+        runner_instance.chain_type,
+    )
+    COMMAND_DURATION.labels(*labels).observe(duration)
+    COMMAND_OUTCOMES.labels(*labels, outcome).inc()
+
+
+def observe_upstream_response(method, status, sent, received):
+    UPSTREAM_REQUESTS.labels(method, status).inc()
+    UPSTREAM_BYTES.labels("sent").inc(sent)
+    UPSTREAM_BYTES.labels("received").inc(received)
+
+    step = current_step.get()
+    if step is not None:
+        step["status_codes"].append(status)
+        step["bytes_sent"] += sent
+        step["bytes_received"] += received
+
+
+def count_response(response, *args, **kwargs):
+    # requests response hook
+    body = response.request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    observe_upstream_response(
+        response.request.method, response.status_code, len(body), len(response.content)
+    )
+
+
+async def async_count_response(response):
+    # httpx response hook, the body is not read yet
+    await response.aread()
+    observe_upstream_response(
+        response.request.method,
+        response.status_code,
+        len(response.request.content),
+        len(response.content),
+    )
+
+
+def get_metrics():
+    # gunicorn and celery run several processes, each writing its samples to
+    # PROMETHEUS_MULTIPROC_DIR
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
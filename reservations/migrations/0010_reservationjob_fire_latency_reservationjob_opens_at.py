@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0009_alter_reservation_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservationjob",
+            name="fire_latency",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="reservationjob",
+            name="opens_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("selections", "0003_slotavailability"),
+        ("reservations", "0010_reservationjob_fire_latency_reservationjob_opens_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReservationAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("chain_type", models.CharField(max_length=50)),
+                (
+                    "court_selection",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "event_target",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField()),
+                ("is_success", models.BooleanField(default=False)),
+                (
+                    "failure_reason",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "reservation_job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="attempts",
+                        to="reservations.reservationjob",
+                    ),
+                ),
+                (
+                    "selection",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="selections.selection",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservation_attempts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-started_at",),
+            },
+        ),
+        migrations.CreateModel(
+            name="ReservationAttemptStep",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("position", models.PositiveSmallIntegerField()),
+                ("command", models.CharField(max_length=100)),
+                ("outcome", models.CharField(max_length=50)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField()),
+                ("duration", models.FloatField()),
+                ("waited", models.FloatField(default=0)),
+                ("status_codes", models.JSONField(blank=True, default=list)),
+                ("bytes_sent", models.PositiveIntegerField(default=0)),
+                ("bytes_received", models.PositiveIntegerField(default=0)),
+                (
+                    "attempt",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="steps",
+                        to="reservations.reservationattempt",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("attempt", "position"),
+            },
+        ),
+    ]
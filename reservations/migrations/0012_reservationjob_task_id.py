@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0011_reservationattempt_reservationattemptstep"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservationjob",
+            name="task_id",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
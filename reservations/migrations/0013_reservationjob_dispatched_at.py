@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+def mark_existing_jobs_dispatched(apps, schema_editor):
+    # Jobs created so far were handed to the broker when they were created
+    ReservationJob = apps.get_model("reservations", "ReservationJob")
+    ReservationJob.objects.update(dispatched_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0012_reservationjob_task_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservationjob",
+            name="dispatched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="reservationjob",
+            index=models.Index(
+                fields=["status", "execution_time"],
+                name="reservation_status_fedd84_idx",
+            ),
+        ),
+        migrations.RunPython(mark_existing_jobs_dispatched, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0013_reservationjob_dispatched_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservationjob",
+            name="dispatch_token",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
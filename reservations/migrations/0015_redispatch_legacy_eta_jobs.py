@@ -0,0 +1,52 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:02
+
+from datetime import timedelta
+
+from celery.task.control import revoke
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def redispatch_legacy_eta_jobs(apps, schema_editor):
+    # ETAs queued days ahead before the dispatcher existed outlive the shorter
+    # visibility timeout and would be redelivered every hour. Their tasks are
+    # revoked and the jobs handed back to the dispatcher, which queues them
+    # again with a dispatch token once they are due.
+    if not settings.RESERVATION_DISPATCHER_ENABLED:
+        return
+
+    ReservationJob = apps.get_model("reservations", "ReservationJob")
+    due_before = timezone.now() + timedelta(
+        seconds=settings.RESERVATION_DISPATCH_WINDOW_SECONDS
+    )
+    legacy_jobs = ReservationJob.objects.filter(
+        status="PENDING",
+        execution_type="ETA",
+        execution_time__gt=due_before,
+        dispatched_at__isnull=False,
+        dispatch_token__isnull=True,
+    )
+    # Only the jobs created since 0012 stored the id of their task. Tasks
+    # without a token are skipped once the job is dispatched again, revoked
+    # or not.
+    task_ids = list(
+        legacy_jobs.exclude(task_id__isnull=True).values_list("task_id", flat=True)
+    )
+    if task_ids:
+        try:
+            revoke(task_ids)
+        except Exception as error:
+            print(f"Could not revoke {len(task_ids)} legacy reservation tasks: {error}")
+    legacy_jobs.update(dispatched_at=None, task_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0014_reservationjob_dispatch_token"),
+    ]
+
+    operations = [
+        migrations.RunPython(redispatch_legacy_eta_jobs, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,14 @@
+import uuid
 from datetime import timedelta
 
-from celery.task.control import inspect, revoke
-from dateutil.relativedelta import relativedelta
+from celery.task.control import revoke
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
-from reservations.tasks import check_basket, execute_reservation_job
+from reservations.tasks import (execute_reservation_job,
+                                schedule_reservation_burst)
 
 User = get_user_model()
 
@@ -39,6 +42,14 @@ class ReservationJob(TimestampedModel):
     EXECUTION_TYPE_CHOICES = ((ETA, "ETA"), (IMMEDIATE, "IMMEDIATE"))
 
     execution_time = models.DateTimeField()
+    opens_at = models.DateTimeField(null=True, blank=True)
+    fire_latency = models.FloatField(null=True, blank=True)
+    # Celery task the job was dispatched with, jobs fired by a burst have none
+    task_id = models.CharField(max_length=255, null=True, blank=True)
+    # ETA jobs wait in the database until the dispatcher hands them over. The
+    # token is claimed with the dispatch, tasks carrying another one are stale.
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    dispatch_token = models.UUIDField(null=True, blank=True)
     execution_type = models.CharField(
         max_length=100,
         null=True,
@@ -63,23 +74,71 @@ class ReservationJob(TimestampedModel):
 
     class Meta:
         ordering = ("selection__slot__date_time",)
+        # Looked up by the dispatcher for the pending jobs due soon
+        indexes = [models.Index(fields=["status", "execution_time"])]
 
     def revoke(self):
-        i = inspect()
-        scheduled_tasks = i.scheduled()
-        for _, tasks in scheduled_tasks.items():
-            rj_task = [task for task in tasks if task["request"]["args"][0] == self.id]
-            if rj_task:
-                revoke(rj_task[0]["request"]["id"])
+        if self.task_id:
+            revoke(self.task_id)
+
+    @classmethod
+    def cancel_many(cls, reservation_jobs):
+        # One revoke broadcast for all the jobs, without saving them one by one
+        task_ids = list(
+            reservation_jobs.exclude(task_id__isnull=True).values_list(
+                "task_id", flat=True
+            )
+        )
+        if task_ids:
+            revoke(task_ids)
+        return reservation_jobs.update(status=cls.CANCELLED)
 
     def execute(self):
         if self.status == self.CANCELLED:
             return
 
+        # Jobs due later are left to dispatch_reservation_jobs, the broker
+        # only ever holds the ETAs of the dispatch window
+        if (
+            self.execution_type == self.IMMEDIATE
+            or not settings.RESERVATION_DISPATCHER_ENABLED
+        ):
+            self.dispatch()
+
+    def dispatch(self):
+        # Only the first save or dispatcher run claiming the job enqueues it
+        dispatched_at = timezone.now()
+        dispatch_token = uuid.uuid4()
+        if not ReservationJob.objects.filter(
+            id=self.id, dispatched_at__isnull=True
+        ).update(dispatched_at=dispatched_at, dispatch_token=dispatch_token):
+            return
+        self.dispatched_at = dispatched_at
+        self.dispatch_token = dispatch_token
+
+        # Enqueued once the claim is committed, a rolled back dispatch leaves
+        # no task behind and workers never run ahead of the job's row
+        transaction.on_commit(lambda: self.enqueue(dispatch_token))
+
+    def enqueue(self, dispatch_token):
+        kwargs = {"dispatch_token": str(dispatch_token)}
         if self.execution_type == self.IMMEDIATE:
-            execute_reservation_job.delay(self.id)
+            self.task_id = execute_reservation_job.apply_async((self.id,), kwargs).id
+        elif (
+            self.opens_at
+            and settings.RESERVATION_BURST_ENABLED
+            and schedule_reservation_burst(self.opens_at, self.execution_time)
+        ):
+            # A burst only fires the jobs still pending, there is no task of
+            # this job to revoke. Jobs dispatched after their burst started
+            # are enqueued on their own.
+            return
         else:
-            execute_reservation_job.apply_async((self.id,), eta=self.execution_time)
+            self.task_id = execute_reservation_job.apply_async(
+                (self.id,), kwargs, eta=self.execution_time
+            ).id
+        # Stored with update(), save() would run execute() again
+        ReservationJob.objects.filter(id=self.id).update(task_id=self.task_id)
 
     def save(
         self, force_insert=False, force_update=False, using=None, update_fields=None
@@ -143,7 +202,53 @@ class Reservation(TimestampedModel):
                 user=self.user, selection=self.selection
             ).update(status=status)
 
-        if self.status == Reservation.IN_CART:
-            check_basket.apply_async(
-                (self.id,), eta=self.created_at + relativedelta(minutes=30)
-            )
+
+class ReservationAttempt(TimestampedModel):
+    user = models.ForeignKey(
+        User, related_name="reservation_attempts", on_delete=models.CASCADE
+    )
+    selection = models.ForeignKey(
+        "selections.Selection", on_delete=models.CASCADE, null=True, blank=True
+    )
+    reservation_job = models.ForeignKey(
+        ReservationJob,
+        related_name="attempts",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    chain_type = models.CharField(max_length=50)
+    court_selection = models.CharField(max_length=255, null=True, blank=True)
+    event_target = models.CharField(max_length=255, null=True, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    is_success = models.BooleanField(default=False)
+    failure_reason = models.CharField(max_length=255, null=True, blank=True)
+
+    def __str__(self):
+        return f"<ReservationAttempt> {self.user} {self.chain_type} {self.started_at}"
+
+    class Meta:
+        ordering = ("-started_at",)
+
+
+class ReservationAttemptStep(TimestampedModel):
+    attempt = models.ForeignKey(
+        ReservationAttempt, related_name="steps", on_delete=models.CASCADE
+    )
+    position = models.PositiveSmallIntegerField()
+    command = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=50)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    duration = models.FloatField()
+    waited = models.FloatField(default=0)
+    status_codes = models.JSONField(default=list, blank=True)
+    bytes_sent = models.PositiveIntegerField(default=0)
+    bytes_received = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"<ReservationAttemptStep> {self.command} {self.outcome}"
+
+    class Meta:
+        ordering = ("attempt", "position")
@@ -0,0 +1,85 @@
+import asyncio
+import random
+import time
+
+from django.conf import settings
+
+SPIN_SECONDS = 0.05
+
+
+def wait_until(timestamp):
+    # Sleep most of the way, then spin so the deadline is met to the millisecond
+    remaining = timestamp - time.time()
+    if remaining > SPIN_SECONDS:
+        time.sleep(remaining - SPIN_SECONDS)
+    while time.time() < timestamp:
+        pass
+
+
+async def async_wait_until(timestamp):
+    # Spins by yielding to the loop, the other chains waiting for the same
+    # instant must get to fire too
+    remaining = timestamp - time.time()
+    if remaining > SPIN_SECONDS:
+        await asyncio.sleep(remaining - SPIN_SECONDS)
+    while time.time() < timestamp:
+        await asyncio.sleep(0)
+
+
+class PacingPolicy:
+    FAST = "fast"
+    POLITE = "polite"
+
+    # Delays the chain used to sleep before each step, measured from the
+    # previous upstream response
+    POLITE_DELAYS = {
+        "complex": 0.5,
+        "court": 0.8,
+        "click": 1.5,
+        "choice": 1,
+        "add_to_cart": 1,
+    }
+
+    def __init__(self, mode=FAST, min_gap=0, jitter=0):
+        self.mode = mode
+        self.min_gap = min_gap
+        self.jitter = jitter
+        self.last_response_at = None
+        self.waited = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            mode=settings.RESERVATION_PACING_MODE,
+            min_gap=settings.RESERVATION_PACING_MIN_GAP_SECONDS,
+            jitter=settings.RESERVATION_PACING_JITTER_SECONDS,
+        )
+
+    def get_delay(self, step):
+        gap = self.POLITE_DELAYS.get(step, 0) if self.mode == self.POLITE else 0
+        gap = max(gap, self.min_gap)
+        if self.last_response_at is not None:
+            gap -= time.monotonic() - self.last_response_at
+        delay = max(gap, 0)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        return delay
+
+    def wait(self, step):
+        delay = self.get_delay(step)
+        if delay:
+            time.sleep(delay)
+        self.waited += delay
+
+    async def async_wait(self, step):
+        delay = self.get_delay(step)
+        if delay:
+            await asyncio.sleep(delay)
+        self.waited += delay
+
+    def mark(self):
+        self.last_response_at = time.monotonic()
+
+    def pop_waited(self):
+        waited, self.waited = self.waited, 0
+        return waited
@@ -0,0 +1,87 @@
+import re
+
+ANCHOR_REGEX = rb'<a\b[^>]*\bid="%s"[^>]*>'
+HREF_REGEX = re.compile(rb'\bhref="([^"]*)"')
+POSTBACK_TARGET_REGEX = re.compile(rb"__doPostBack\((?:&#39;|')([^'&]+)")
+
+
+class DeltaParseError(Exception):
+    pass
+
+
+class DeltaResponse:
+    # ASP.NET UpdatePanel responses are a flat list of length|type|id|content|
+    # entries, the length counting characters of the content
+    def __init__(self, content):
+        self.text = content.decode("utf-8") if isinstance(content, bytes) else content
+        self.entries = {}
+        self.parse()
+
+    def parse(self):
+        text = self.text
+        position = 0
+        while position < len(text):
+            length_end = text.find("|", position)
+            type_end = text.find("|", length_end + 1)
+            id_end = text.find("|", type_end + 1)
+            if -1 in (length_end, type_end, id_end):
+                raise DeltaParseError(f"Truncated delta entry at {position}")
+
+            length = text[position:length_end]
+            if not length.isdigit():
+                raise DeltaParseError(f"Invalid delta entry length at {position}")
+
+            start = id_end + 1
+            end = start + int(length)
+            if text[end : end + 1] != "|":
+                raise DeltaParseError(f"Delta entry length mismatch at {position}")
+
+            entry_type = text[length_end + 1 : type_end]
+            entry_id = text[type_end + 1 : id_end]
+            self.entries[(entry_type, entry_id)] = (start, end)
+            position = end + 1
+
+    def get(self, entry_type, entry_id=""):
+        bounds = self.entries.get((entry_type, entry_id))
+        if bounds is None:
+            return None
+        return self.text[bounds[0] : bounds[1]]
+
+    def hidden_field(self, name):
+        return self.get("hiddenField", name)
+
+    @property
+    def viewstate(self):
+        return self.hidden_field("__VIEWSTATE")
+
+    def panel(self, panel_id):
+        return self.get("updatePanel", panel_id)
+
+    @property
+    def panel_ids(self):
+        return [
+            entry_id
+            for entry_type, entry_id in self.entries
+            if entry_type == "updatePanel"
+        ]
+
+    @property
+    def error(self):
+        for entry_type, entry_id in self.entries:
+            if entry_type == "error":
+                return self.get(entry_type, entry_id)
+        return None
+
+
+def find_postback_target(content, anchor_id):
+    # Works on full pages and delta panels alike, without building a DOM
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    anchor = re.search(ANCHOR_REGEX % re.escape(anchor_id.encode()), content)
+    if anchor is None:
+        return None
+    href = HREF_REGEX.search(anchor.group())
+    if href is None:
+        return None
+    target = POSTBACK_TARGET_REGEX.search(href.group(1))
+    return target.group(1).decode() if target else None
@@ -0,0 +1,37 @@
+import re
+from datetime import datetime
+
+from lxml import etree
+
+from reservations.parsers.slots import parse_document
+
+PAID = "Satış Yapıldı"
+
+MEMBER_RESERVATION_ROWS = etree.XPath("//table[@id='dtUyeSpor']/tbody/tr")
+ROW_CELLS = etree.XPath("./td")
+HOUR_REGEX = re.compile(r"(\d{2}):\d{2}:\d{2}\s-\s\d{2}")
+DATE_REGEX = re.compile(r"(\d+\.\d+\.\d+)\s-\s\d+\.\d+\.\d+")
+
+
+def index_member_reservations(content):
+    # Status of every row of the member's reservations page by (date, hour),
+    # a paid row wins over older rows of the same slot
+    statuses = {}
+    for row in MEMBER_RESERVATION_ROWS(parse_document(content)):
+        cells = [cell.text_content() for cell in ROW_CELLS(row)]
+        if len(cells) < 5:
+            continue
+        hour_match = HOUR_REGEX.search(cells[2])
+        date_match = DATE_REGEX.search(cells[3])
+        if not (hour_match and date_match):
+            continue
+
+        date = datetime.strptime(date_match.group(1), "%d.%m.%Y").date()
+        key = (date, int(hour_match.group(1)))
+        if statuses.get(key) != PAID:
+            statuses[key] = cells[4].strip()
+    return statuses
+
+
+def is_paid(statuses, slot_date_time):
+    return statuses.get((slot_date_time.date(), slot_date_time.hour)) == PAID
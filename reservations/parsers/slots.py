@@ -0,0 +1,171 @@
+import re
+import threading
+from datetime import datetime, timedelta
+
+from lxml import etree, html
+
+from reservations.enums import StatusCode
+
+sls = [
+    "07:00 - 08:00",
+    "08:00 - 09:00",
+    "09:00 - 10:00",
+    "10:00 - 11:00",
+    "11:00 - 12:00",
+    "12:00 - 13:00",
+    "13:00 - 14:00",
+    "14:00 - 15:00",
+    "16:00 - 17:00",
+    "17:00 - 18:00",
+    "18:00 - 19:00",
+    "19:00 - 20:00",
+]
+RESERVED = "Rezervasyonu"
+SEPET = "Sepetinde"
+
+DAY_REGEX = re.compile(r"(Pazartesi|Salı|Çarşamba|Perşembe|\bCuma\b|Cumartesi|Pazar)")
+DATE_REGEX = re.compile(r"(\d+\.\d+\.\d+)")
+
+PANELS = etree.XPath("//div[@class='panel panel-info']")
+SELECTED_COURT = etree.XPath(
+    "//select[@id='ddlSalonFiltre']/option[@selected='selected']"
+)
+PANEL_TITLE = etree.XPath("string((.//h3)[1])")
+WELLS = etree.XPath(".//div[@class='well wellPlus']")
+WELL_STATUS = etree.XPath("string((.//div)[1])")
+WELL_SLOT = etree.XPath("string((.//span)[1])")
+WELL_POSTBACK_HREF = etree.XPath(
+    "(.//a[starts-with(@href, 'javascript:__doPostBack')])[1]/@href"
+)
+
+# lxml parsers must not be shared between threads
+_local = threading.local()
+
+
+def get_parser():
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def parse_document(content):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return etree.fromstring(content, get_parser())
+
+
+def get_event_target(href):
+    return href[href.find("ctl") : href.find("Rezervasyon") + len("Rezervasyon")]
+
+
+def parse_well(well):
+    status = WELL_STATUS(well)
+    if RESERVED in status:
+        return None
+
+    hrefs = WELL_POSTBACK_HREF(well)
+    if hrefs:
+        return {
+            "slot": WELL_SLOT(well),
+            "status": "Reservable",
+            "status_code": StatusCode.RESERVABLE.value,
+            "is_reservable": True,
+            "event_target": get_event_target(hrefs[0]),
+        }
+    return {
+        "slot": WELL_SLOT(well),
+        "status": status,
+        "status_code": StatusCode.ANOTHER_BASKET.value
+        if SEPET in status
+        else StatusCode.NO_SLOTS.value,
+        "is_reservable": False,
+        "event_target": None,
+    }
+
+
+def is_future_reservable(date, now_in_turkish_timezone):
+    date_obj = datetime.strptime(date, "%d.%m.%Y")
+    time_diff_in_hours = (
+        (date_obj - now_in_turkish_timezone).total_seconds() // 60 // 60
+    )
+    return (time_diff_in_hours not in range(0, 72)) and (
+        date_obj > now_in_turkish_timezone
+    )
+
+
+def parse_slot_grid(content, show_future_slots=True):
+    document = parse_document(content)
+
+    court_data = SELECTED_COURT(document)[0]
+    data = {"court": court_data.text_content(), "court_id": court_data.get("value")}
+
+    slots = []
+    now_in_turkish_timezone = None
+    for panel in PANELS(document):
+        h3 = PANEL_TITLE(panel)
+        date = DATE_REGEX.search(h3).group()
+        day_slots = [
+            slot for slot in (parse_well(well) for well in WELLS(panel)) if slot
+        ]
+
+        if not day_slots and show_future_slots:
+            if now_in_turkish_timezone is None:
+                now = datetime.now().replace(tzinfo=None)
+                now_in_turkish_timezone = now + timedelta(hours=3)
+            if is_future_reservable(date, now_in_turkish_timezone):
+                day_slots = [
+                    {
+                        "slot": sl,
+                        "status": "Reservable ETA",
+                        "status_code": StatusCode.WILL_BE_AVAILABLE.value,
+                        "is_reservable": True,
+                        "event_target": None,
+                    }
+                    for sl in sls
+                ]
+
+        slots.append(
+            {"day": DAY_REGEX.match(h3).group(), "date": date, "slots": day_slots}
+        )
+
+    data["slots"] = slots
+    return data
+
+
+def find_day_panel(document, date):
+    for panel in PANELS(document):
+        match = DATE_REGEX.search(PANEL_TITLE(panel))
+        if match and match.group() == date:
+            return panel
+    return None
+
+
+def iter_reservable_wells(panel):
+    for well in WELLS(panel):
+        if RESERVED in WELL_STATUS(well):
+            continue
+        hrefs = WELL_POSTBACK_HREF(well)
+        if hrefs:
+            yield int(WELL_SLOT(well)[:2]), get_event_target(hrefs[0])
+
+
+def resolve_event_target(content, slot_date_time):
+    # Walks the panel of the requested day only and stops at the requested
+    # hour, the rest of the day is only indexed when that hour is taken
+    date = slot_date_time.strftime("%d.%m.%Y")
+    panel = find_day_panel(parse_document(content), date)
+    if panel is None:
+        return None, []
+
+    reservables = {}
+    for hour, event_target in iter_reservable_wells(panel):
+        if hour == slot_date_time.hour:
+            return event_target, []
+        reservables[(date, hour)] = event_target
+
+    # Closest hours first
+    ranked = sorted(
+        reservables, key=lambda key: (abs(key[1] - slot_date_time.hour), key[1])
+    )
+    return None, [(key[1], reservables[key]) for key in ranked]
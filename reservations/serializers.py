@@ -22,8 +22,21 @@ class ReservationJobSerializer(drf_serializers.ModelSerializer):
 
     class Meta:
         model = ReservationJob
-        fields = ("id", "selection", "execution_type", "execution_time", "status")
-        read_only_fields = ("execution_type", "execution_time")
+        fields = (
+            "id",
+            "selection",
+            "execution_type",
+            "execution_time",
+            "opens_at",
+            "fire_latency",
+            "status",
+        )
+        read_only_fields = (
+            "execution_type",
+            "execution_time",
+            "opens_at",
+            "fire_latency",
+        )
 
     def create(self, validated_data):
         # Slot
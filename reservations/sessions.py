@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from requests.utils import dict_from_cookiejar
+
+from reservations.utils import get_legacy_session
+
+
+class UpstreamSession:
+    def __init__(self, user_id, session, cookie, validated_at=None, last_used_at=None):
+        self.user_id = user_id
+        self.session = session
+        self.cookie = cookie
+        self.validated_at = validated_at or time.time()
+        self.last_used_at = last_used_at or time.time()
+
+    def is_expired(self, ttl):
+        return time.time() - self.last_used_at > ttl
+
+    @property
+    def needs_probe(self):
+        return time.time() - self.validated_at > settings.UPSTREAM_SESSION_PROBE_SECONDS
+
+
+class UpstreamSessionPool:
+    CACHE_KEY = "upstream-session:{}"
+
+    def __init__(self, max_size, ttl, shared=False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, user):
+        # Sessions are checked out exclusively, so two runners of the same user
+        # in one process never share a cookie jar at the same time
+        with self._lock:
+            entry = self._sessions.pop(user.pk, None)
+
+        if entry is None and self.shared:
+            entry = self._load_shared(user)
+
+        if entry is None or entry.is_expired(self.ttl):
+            return None
+        return entry
+
+    def release(self, user, session, cookie, validated_at):
+        entry = UpstreamSession(user.pk, session, cookie, validated_at=validated_at)
+        with self._lock:
+            self._sessions[user.pk] = entry
+            self._sessions.move_to_end(user.pk)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+
+        if self.shared:
+            cache.set(
+                self.CACHE_KEY.format(user.pk),
+                {
+                    "cookies": dict_from_cookiejar(session.cookies),
+                    "cookie": cookie,
+                    "validated_at": entry.validated_at,
+                    "last_used_at": entry.last_used_at,
+                },
+                timeout=self.ttl,
+            )
+
+    def invalidate(self, user):
+        with self._lock:
+            self._sessions.pop(user.pk, None)
+
+        if self.shared:
+            cache.delete(self.CACHE_KEY.format(user.pk))
+
+    def _load_shared(self, user):
+        data = cache.get(self.CACHE_KEY.format(user.pk))
+        if not data:
+            return None
+
+        session = get_legacy_session()
+        session.cookies.update(data["cookies"])
+        return UpstreamSession(
+            user.pk,
+            session,
+            data["cookie"],
+            validated_at=data["validated_at"],
+            last_used_at=data["last_used_at"],
+        )
+
+
+session_pool = UpstreamSessionPool(
+    max_size=settings.UPSTREAM_SESSION_POOL_SIZE,
+    ttl=settings.UPSTREAM_SESSION_TTL_SECONDS,
+    shared=settings.UPSTREAM_SESSION_POOL_SHARED,
+)
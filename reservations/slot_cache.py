@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SlotAvailabilityCache:
+    CACHE_KEY = "slot-availability:{}:{}"
+    REFRESH_LOCK_KEY = "slot-availability-refresh:{}:{}"
+    REFRESH_LOCK_SECONDS = 60
+
+    WAIT_INTERVAL_SECONDS = 0.1
+
+    def __init__(self, ttl, stale_ttl, fill_wait):
+        # Snapshots are fresh for ttl seconds and served stale, while a
+        # refresh runs, until stale_ttl seconds
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fill_wait = fill_wait
+
+    def get(self, court_selection, show_future_slots):
+        return cache.get(self.CACHE_KEY.format(court_selection, int(show_future_slots)))
+
+    def set(self, court_selection, show_future_slots, data):
+        snapshot = {"data": data, "observed_at": time.time()}
+        cache.set(
+            self.CACHE_KEY.format(court_selection, int(show_future_slots)),
+            snapshot,
+            timeout=self.stale_ttl,
+        )
+        return snapshot
+
+    def wait(self, court_selection, show_future_slots):
+        # For the snapshot another request is fetching, None if it takes longer
+        # than fill_wait seconds
+        deadline = time.monotonic() + self.fill_wait
+        while True:
+            snapshot = self.get(court_selection, show_future_slots)
+            if snapshot is not None or time.monotonic() >= deadline:
+                return snapshot
+            time.sleep(self.WAIT_INTERVAL_SECONDS)
+
+    def is_fresh(self, snapshot):
+        return self.get_age(snapshot) <= self.ttl
+
+    @staticmethod
+    def get_age(snapshot):
+        return time.time() - snapshot["observed_at"]
+
+    def acquire_refresh(self, court_selection, show_future_slots):
+        # Only one background refresh per snapshot at a time
+        return cache.add(
+            self.REFRESH_LOCK_KEY.format(court_selection, int(show_future_slots)),
+            True,
+            timeout=self.REFRESH_LOCK_SECONDS,
+        )
+
+    def release_refresh(self, court_selection, show_future_slots):
+        cache.delete(
+            self.REFRESH_LOCK_KEY.format(court_selection, int(show_future_slots))
+        )
+
+
+slot_cache = SlotAvailabilityCache(
+    ttl=settings.SLOT_CACHE_TTL_SECONDS,
+    stale_ttl=settings.SLOT_CACHE_STALE_TTL_SECONDS,
+    fill_wait=settings.SLOT_CACHE_FILL_WAIT_SECONDS,
+)
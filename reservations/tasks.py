@@ -1,5 +1,45 @@
+import asyncio
+import statistics
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
 from celery.task import task
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+RESERVATION_BURST_KEY = "reservation-burst:{}"
+BURST_SCHEDULED = "scheduled"
+BURST_STARTED = "started"
+RESERVATION_LOCK_KEY = "reservation-lock:{}:{}"
+BASKET_CHECK_FAILURES_KEY = "basket-check-failures:{}"
+
+
+def get_reservation_lock_key(reservation_job):
+    return RESERVATION_LOCK_KEY.format(
+        reservation_job.user_id, reservation_job.selection_id
+    )
+
+
+def acquire_reservation_lock(reservation_job):
+    # One chain at a time per user and selection, whatever dispatched it
+    return cache.add(
+        get_reservation_lock_key(reservation_job),
+        True,
+        settings.RESERVATION_LOCK_TIMEOUT_SECONDS,
+    )
+
+
+def release_reservation_locks(reservation_jobs):
+    cache.delete_many(
+        [
+            get_reservation_lock_key(reservation_job)
+            for reservation_job in reservation_jobs
+        ]
+    )
 
 
 def try_to_reserve(current_selection, user):
@@ -7,6 +47,7 @@ def try_to_reserve(current_selection, user):
     from selections.models import Selection, Slot, SportSelection
 
     from .commands.base import ReservationCommandRunner
+    from .helpers import get_known_event_target
 
     current_pitch_id = current_selection.sport_selection.pitch_id
     other_pitch_ids = [
@@ -15,10 +56,8 @@ def try_to_reserve(current_selection, user):
 
     current_slot_date_obj = current_selection.slot.date_time
 
+    selections = []
     for pitch_id in other_pitch_ids:
-        print(
-            f"***** Trying to reserve {pitch_id} now for slot {current_slot_date_obj.date()} ******"
-        )
         slot, _ = Slot.objects.get_or_create(
             date_time__date=current_slot_date_obj,
             date_time__hour=current_slot_date_obj.hour,
@@ -30,8 +69,21 @@ def try_to_reserve(current_selection, user):
         selection, _ = Selection.objects.get_or_create(
             sport_selection=sport_selection, slot=slot
         )
+        selections.append(selection)
+
+    if settings.COURT_FAN_OUT_PARALLEL:
+        return try_to_reserve_concurrently(selections, user)
 
-        runner = ReservationCommandRunner(user, selection, selection.sport_selection)
+    for selection in selections:
+        print(
+            f"***** Trying to reserve {selection.sport_selection.pitch_id} now for slot {current_slot_date_obj.date()} ******"
+        )
+        runner = ReservationCommandRunner(
+            user,
+            selection,
+            selection.sport_selection,
+            event_target=get_known_event_target(selection),
+        )
         runner()
 
         if not runner.is_failure:
@@ -39,57 +91,422 @@ def try_to_reserve(current_selection, user):
     return False
 
 
+def try_to_reserve_concurrently(selections, user):
+    from .commands.base import (FirstSuccessCoordinator,
+                                ReservationCommandRunner)
+    from .helpers import get_known_event_target
+
+    coordinator = FirstSuccessCoordinator()
+
+    def attempt(selection):
+        print(
+            f"***** Trying to reserve {selection.sport_selection.pitch_id} now for slot {selection.slot.date_time.date()} ******"
+        )
+        try:
+            runner = ReservationCommandRunner(
+                user,
+                selection,
+                selection.sport_selection,
+                event_target=get_known_event_target(selection),
+                coordinator=coordinator,
+            )
+            runner()
+            return not runner.is_failure
+        finally:
+            connections.close_all()
+
+    if not selections:
+        return False
+
+    with ThreadPoolExecutor(max_workers=len(selections)) as executor:
+        return any(list(executor.map(attempt, selections)))
+
+
 @task(
     bind=True,
     max_retries=4,
     default_retry_delay=settings.DEFAULT_TASK_COUNTDOWN_SECONDS,
 )
-def execute_reservation_job(self, reservation_job_id, retry_count=0):
+def execute_reservation_job(
+    self, reservation_job_id, retry_count=0, dispatch_token=None
+):
     from .commands.base import ReservationCommandRunner
+    from .helpers import get_known_event_target
     from .models import ReservationJob
 
     reservation_job = ReservationJob.objects.get(id=reservation_job_id)
 
-    if reservation_job.status == ReservationJob.CANCELLED:
+    if reservation_job.status in (ReservationJob.CANCELLED, ReservationJob.COMPLETED):
         return
 
-    runner = ReservationCommandRunner(
-        reservation_job.user,
-        reservation_job.selection,
-        reservation_job.selection.sport_selection,
-        is_max_retry=self.max_retries == retry_count,
+    # A task of an earlier dispatch of the job, or one queued before dispatch
+    # tokens existed for a job dispatched again since
+    if reservation_job.dispatch_token and dispatch_token != str(
+        reservation_job.dispatch_token
+    ):
+        print(f"Skipping stale dispatch of reservation job {reservation_job_id}")
+        return
+
+    if not acquire_reservation_lock(reservation_job):
+        print(f"Reservation job {reservation_job_id} is already running, skipping")
+        return
+
+    try:
+        runner = ReservationCommandRunner(
+            reservation_job.user,
+            reservation_job.selection,
+            reservation_job.selection.sport_selection,
+            event_target=get_known_event_target(reservation_job.selection),
+            is_max_retry=self.max_retries == retry_count,
+            opens_at=reservation_job.opens_at,
+            reservation_job=reservation_job,
+        )
+        runner()
+
+        if runner.fire_latency is not None:
+            # Not saved through the model, saving a job schedules it again
+            ReservationJob.objects.filter(id=reservation_job_id).update(
+                fire_latency=runner.fire_latency
+            )
+
+        if runner.is_failure:
+            if runner.is_no_slot and try_to_reserve(
+                reservation_job.selection, reservation_job.user
+            ):
+                return
+            # Queued with a countdown, the lock is released by then
+            raise self.retry(
+                kwargs={
+                    "retry_count": retry_count + 1,
+                    "dispatch_token": dispatch_token,
+                }
+            )
+    finally:
+        release_reservation_locks([reservation_job])
+
+
+def fall_back_to_reservation_job(reservation_job):
+    # Failed burst chains fall back to the regular task, which retries and
+    # tries the other courts. It carries the token of the job's dispatch, the
+    # task is not a stale one.
+    dispatch_token = reservation_job.dispatch_token
+    execute_reservation_job.delay(
+        reservation_job.id, dispatch_token=dispatch_token and str(dispatch_token)
     )
-    runner()
 
-    if runner.is_failure:
-        if runner.is_no_slot and try_to_reserve(
-            reservation_job.selection, reservation_job.user
-        ):
-            return
-        raise self.retry(kwargs={"retry_count": retry_count + 1})
+
+def get_burst_timeout(opens_at):
+    # The burst key outlives the opening by an hour
+    return max((opens_at - timezone.now()).total_seconds(), 0) + 3600
+
+
+def schedule_reservation_burst(opens_at, execution_time):
+    # Every job opening at the same instant is fired by a single burst task,
+    # False once that burst has picked its jobs
+    key = RESERVATION_BURST_KEY.format(opens_at.isoformat())
+    if cache.add(key, BURST_SCHEDULED, get_burst_timeout(opens_at)):
+        execute_reservation_burst.apply_async(
+            (opens_at.isoformat(),), eta=execution_time
+        )
+        return True
+    return cache.get(key) == BURST_SCHEDULED
+
+
+def claim_for_burst(reservation_job):
+    from .models import ReservationJob
+
+    # A new dispatch token makes the earlier tasks of the job stale
+    dispatch_token = uuid.uuid4()
+    if not ReservationJob.objects.filter(
+        id=reservation_job.id, dispatch_token=reservation_job.dispatch_token
+    ).update(dispatch_token=dispatch_token):
+        return False
+    reservation_job.dispatch_token = dispatch_token
+    return True
 
 
 @task
-def check_basket(reservation_id):
-    from reservations.commands.base import (CheckReservationCommand,
-                                            LoginCommand)
+def execute_reservation_burst(opens_at):
+    from .commands.async_base import AsyncReservationCommandRunner, run_chains
+    from .helpers import get_known_event_target
+    from .models import ReservationJob
 
-    from .commands.base import ReservationCommandRunner
-    from .models import Reservation
+    # Kept until it times out, jobs dispatched from now on are enqueued on
+    # their own instead of scheduling a second burst
+    key = RESERVATION_BURST_KEY.format(opens_at)
+    opens_at = datetime.fromisoformat(opens_at)
+    started_at = timezone.now()
+    cache.set(key, BURST_STARTED, get_burst_timeout(opens_at))
+
+    reservation_jobs = []
+    for reservation_job in ReservationJob.objects.filter(
+        opens_at=opens_at,
+        status=ReservationJob.PENDING,
+        dispatched_at__lte=started_at,
+    ).select_related("user", "selection__slot", "selection__sport_selection"):
+        if not acquire_reservation_lock(reservation_job):
+            continue
+        if claim_for_burst(reservation_job):
+            reservation_jobs.append(reservation_job)
+        else:
+            release_reservation_locks([reservation_job])
+    if not reservation_jobs:
+        return
+
+    # All chains warm up together and are released at the opening instant by
+    # the same event loop
+    try:
+        runners = [
+            AsyncReservationCommandRunner(
+                reservation_job.user,
+                reservation_job.selection,
+                reservation_job.selection.sport_selection,
+                event_target=get_known_event_target(reservation_job.selection),
+                opens_at=opens_at,
+                reservation_job=reservation_job,
+            )
+            for reservation_job in reservation_jobs
+        ]
+        results = asyncio.run(run_chains(runners))
+    finally:
+        release_reservation_locks(reservation_jobs)
 
-    reservation = Reservation.objects.get(id=reservation_id)
+    released_at = [runner.released_at for runner in runners if runner.released_at]
+    dispatch_skew = max(released_at) - min(released_at) if released_at else 0
+    fire_latencies = [
+        runner.fire_latency for runner in runners if runner.fire_latency is not None
+    ] or [0]
+    print(
+        f"Burst {opens_at.isoformat()}: {len(runners)} jobs, "
+        f"{len(released_at)} released, dispatch skew {dispatch_skew * 1000:.1f}ms, "
+        f"fire latency median {statistics.median(fire_latencies):.3f}s "
+        f"max {max(fire_latencies):.3f}s"
+    )
+
+    for reservation_job, runner, result in zip(reservation_jobs, runners, results):
+        if runner.fire_latency is not None:
+            ReservationJob.objects.filter(id=reservation_job.id).update(
+                fire_latency=runner.fire_latency
+            )
+        if isinstance(result, Exception) or runner.is_failure:
+            fall_back_to_reservation_job(reservation_job)
 
-    selection = reservation.selection
+
+@task
+def dispatch_reservation_jobs():
+    from .models import ReservationJob
+
+    if not settings.RESERVATION_DISPATCHER_ENABLED:
+        return
+
+    # Locked rows are being dispatched by another dispatcher, skip them
+    due_before = timezone.now() + timedelta(
+        seconds=settings.RESERVATION_DISPATCH_WINDOW_SECONDS
+    )
+    with transaction.atomic():
+        reservation_jobs = list(
+            ReservationJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=ReservationJob.PENDING,
+                execution_time__lte=due_before,
+                dispatched_at__isnull=True,
+            )
+            .order_by("execution_time")[: settings.RESERVATION_DISPATCH_BATCH_SIZE]
+        )
+        for reservation_job in reservation_jobs:
+            reservation_job.dispatch()
+
+    if reservation_jobs:
+        print(f"Dispatched {len(reservation_jobs)} reservation jobs")
+
+
+@task
+def drain_notifications():
+    from .mail.client import mail_client
+    from .mail.queue import notification_queue
+
+    sent = notification_queue.drain(mail_client, settings.NOTIFICATION_BATCH_SIZE)
+    if sent:
+        print(f"Sent {sent} notifications")
+
+
+@task
+def refresh_slots(court_selection, show_future_slots, user_id):
+    from django.contrib.auth import get_user_model
+
+    from .helpers import fetch_slots
+    from .slot_cache import slot_cache
+
+    try:
+        user = get_user_model().objects.get(id=user_id)
+        slot_cache.set(
+            court_selection,
+            show_future_slots,
+            fetch_slots(user, court_selection, show_future_slots),
+        )
+    finally:
+        slot_cache.release_refresh(court_selection, show_future_slots)
+
+
+@task
+def crawl_slots():
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from selections.models import SportSelection
+
+    from .helpers import fetch_slots, save_slot_availability
+
+    if not settings.SLOT_CRAWLER_USER_TCKN:
+        print("No slot crawler user configured, skipping")
+        return
+
+    user = get_user_model().objects.get(tckn=settings.SLOT_CRAWLER_USER_TCKN)
+    for sport_selection in SportSelection.objects.all():
+        try:
+            slots_data = fetch_slots(
+                user, sport_selection.pitch_id, show_future_slots=False
+            )
+        except Exception as error:
+            print(f"Could not crawl {sport_selection}: {error}")
+            continue
+        save_slot_availability(sport_selection, slots_data, timezone.now())
+
+
+@task
+def prune_reservation_attempts():
+    from .models import ReservationAttempt
+
+    # In batches, the steps of every attempt are deleted along with it
+    started_before = timezone.now() - timedelta(
+        days=settings.RESERVATION_ATTEMPT_RETENTION_DAYS
+    )
+    deleted = 0
+    while True:
+        attempt_ids = list(
+            ReservationAttempt.objects.filter(
+                started_at__lt=started_before
+            ).values_list("id", flat=True)[:1000]
+        )
+        if not attempt_ids:
+            break
+        ReservationAttempt.objects.filter(id__in=attempt_ids).delete()
+        deleted += len(attempt_ids)
+    if deleted:
+        print(f"Pruned {deleted} reservation attempts")
+
+
+def check_user_basket(user, reservations):
+    from .commands.base import (CheckReservationCommand, LoginCommand,
+                                ReservationCommandRunner)
+
+    sport_selection = reservations[0].selection.sport_selection
     runner = ReservationCommandRunner(
-        reservation.user,
-        selection,
-        selection.sport_selection,
+        user,
+        None,
+        sport_selection,
         commands=[LoginCommand(), CheckReservationCommand()],
-        court_selection=selection.sport_selection.pitch_id,
+        court_selection=sport_selection.pitch_id,
+        chain_type="check-basket",
+    )
+    try:
+        return runner()
+    except Exception as error:
+        print(f"Could not check the basket of {user}: {error}")
+        return None
+    finally:
+        connections.close_all()
+
+
+def count_basket_check_failure(failures_key):
+    # Failures further apart than a few sweeps are not counted together
+    timeout = settings.BASKET_CHECK_INTERVAL_SECONDS * (
+        settings.BASKET_CHECK_MAX_LOGIN_FAILURES + 1
+    )
+    cache.add(failures_key, 0, timeout)
+    try:
+        return cache.incr(failures_key)
+    except ValueError:
+        # Expired in between
+        cache.set(failures_key, 1, timeout)
+        return 1
+
+
+def resolve_basket_statuses(reservations):
+    from .models import Reservation
+    from .parsers.reservations import is_paid
+
+    # One login and one page fetch per user, whatever the number of reservations
+    reservations_by_user = defaultdict(list)
+    for reservation in reservations:
+        reservations_by_user[reservation.user].append(reservation)
+    if not reservations_by_user:
+        return
+
+    with ThreadPoolExecutor(max_workers=settings.BASKET_CHECK_CONCURRENCY) as executor:
+        statuses_by_user = list(
+            executor.map(
+                check_user_basket,
+                reservations_by_user.keys(),
+                reservations_by_user.values(),
+            )
+        )
+
+    paid_ids, expired_ids = [], []
+    for (user, user_reservations), statuses in zip(
+        reservations_by_user.items(), statuses_by_user
+    ):
+        failures_key = BASKET_CHECK_FAILURES_KEY.format(user.id)
+        if statuses is None:
+            # Checked again by the next sweeps, until the login has failed too
+            # many times in a row and the cart is given up on
+            failures = count_basket_check_failure(failures_key)
+            if failures < settings.BASKET_CHECK_MAX_LOGIN_FAILURES:
+                continue
+            print(f"Giving up on the basket of {user}, its login keeps failing")
+            cache.delete(failures_key)
+            expired_ids.extend(reservation.id for reservation in user_reservations)
+            continue
+
+        cache.delete(failures_key)
+        for reservation in user_reservations:
+            if is_paid(statuses, reservation.selection.slot.date_time):
+                paid_ids.append(reservation.id)
+            else:
+                expired_ids.append(reservation.id)
+
+    # Reservations resolved by a concurrent sweep keep their status
+    now = timezone.now()
+    for status, ids in (
+        (Reservation.PAID, paid_ids),
+        (Reservation.EXPIRED, expired_ids),
+    ):
+        if ids:
+            Reservation.objects.filter(id__in=ids, status=Reservation.IN_CART).update(
+                status=status, modified_at=now
+            )
+    print(f"Checked baskets: {len(paid_ids)} paid, {len(expired_ids)} expired")
+
+
+@task
+def check_baskets():
+    from .models import Reservation
+
+    due_before = timezone.now() - timedelta(seconds=settings.BASKET_CHECK_DELAY_SECONDS)
+    resolve_basket_statuses(
+        Reservation.objects.filter(
+            status=Reservation.IN_CART, created_at__lte=due_before
+        ).select_related("user", "selection__slot", "selection__sport_selection")
+    )
+
+
+@task
+def check_basket(reservation_id):
+    from .models import Reservation
+
+    # ETA tasks scheduled before the periodic sweep
+    resolve_basket_statuses(
+        Reservation.objects.filter(
+            id=reservation_id, status=Reservation.IN_CART
+        ).select_related("user", "selection__slot", "selection__sport_selection")
     )
-    is_paid = runner()
-    if is_paid:
-        reservation.status = Reservation.PAID
-    else:
-        reservation.status = Reservation.EXPIRED
-    reservation.save()
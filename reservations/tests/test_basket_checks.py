@@ -0,0 +1,95 @@
+from datetime import date, datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from reservations.models import Reservation
+from reservations.parsers.reservations import PAID
+from reservations.tasks import (BASKET_CHECK_FAILURES_KEY,
+                                resolve_basket_statuses)
+from selections.models import Selection, Slot, SportSelection
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, BASKET_CHECK_MAX_LOGIN_FAILURES=3)
+@mock.patch("reservations.tasks.check_user_basket")
+class ResolveBasketStatusesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            tckn="00000000001", email="member@example.com"
+        )
+        sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        # bulk_create skips save(), which emails the member
+        self.reservations = Reservation.objects.bulk_create(
+            Reservation(
+                user=self.user,
+                selection=Selection.objects.create(
+                    sport_selection=sport_selection,
+                    slot=Slot.objects.create(
+                        date_time=timezone.make_aware(datetime(2023, 3, 17, hour))
+                    ),
+                ),
+                status=Reservation.IN_CART,
+            )
+            for hour in (10, 11)
+        )
+
+    def resolve(self):
+        resolve_basket_statuses(
+            Reservation.objects.filter(status=Reservation.IN_CART).select_related(
+                "user", "selection__slot", "selection__sport_selection"
+            )
+        )
+
+    def statuses(self):
+        return [
+            Reservation.objects.get(id=reservation.id).status
+            for reservation in self.reservations
+        ]
+
+    def test_paid_and_expired_reservations(self, check_user_basket):
+        check_user_basket.return_value = {(date(2023, 3, 17), 10): PAID}
+
+        self.resolve()
+
+        check_user_basket.assert_called_once()
+        self.assertEqual(self.statuses(), [Reservation.PAID, Reservation.EXPIRED])
+
+    def test_failed_login_is_retried_by_the_next_sweeps(self, check_user_basket):
+        check_user_basket.return_value = None
+
+        self.resolve()
+        self.resolve()
+
+        self.assertEqual(self.statuses(), [Reservation.IN_CART, Reservation.IN_CART])
+
+    def test_reservations_expire_once_the_login_keeps_failing(self, check_user_basket):
+        check_user_basket.return_value = None
+
+        for _sweep in range(3):
+            self.resolve()
+
+        self.assertEqual(self.statuses(), [Reservation.EXPIRED, Reservation.EXPIRED])
+        self.assertEqual(check_user_basket.call_count, 3)
+
+    def test_successful_check_resets_the_failures(self, check_user_basket):
+        check_user_basket.return_value = None
+        self.resolve()
+        self.resolve()
+
+        check_user_basket.return_value = {(date(2023, 3, 17), 10): PAID}
+        self.resolve()
+
+        self.assertIsNone(cache.get(BASKET_CHECK_FAILURES_KEY.format(self.user.id)))
+        self.assertEqual(self.statuses(), [Reservation.PAID, Reservation.EXPIRED])
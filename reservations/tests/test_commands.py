@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+
+from reservations.commands.async_base import (AsyncAddToCartCommand,
+                                              AsyncFillFormCommand,
+                                              AsyncFirstSuccessCoordinator,
+                                              AsyncLoginCommand,
+                                              AsyncReservationChoiceCommand,
+                                              AsyncReservationClickCommand,
+                                              AsyncReservationCommandRunner,
+                                              run_chains)
+from reservations.commands.base import ResolveEventTargetCommand
+from reservations.fake_upstream import FakeUpstream
+from reservations.utils import loop_shared_transport
+from selections.constants import COMPLEX_MALTEPE_ID
+from selections.models import Selection, Slot, SportSelection
+
+
+@override_settings(
+    FORM_STATE_CACHE_ENABLED=False,
+    UPSTREAM_SESSION_POOL_ENABLED=False,
+    RESERVATION_TRANSCRIPT_DIR=None,
+    RESERVATION_ATTEMPTS_ENABLED=False,
+    RESERVATION_PACING_MODE="fast",
+)
+class AsyncChainTestCase(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeUpstream(latency=0)
+        url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+        settings_override = override_settings(UPSTREAM_BASE_URL=url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build_runner(self, court_id, coordinator):
+        user = get_user_model()(pk=1, tckn="00000000001", third_party_app_password="x")
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        sport_selection = SportSelection(
+            pitch_id=court_id, complex_id=COMPLEX_MALTEPE_ID
+        )
+        slot = Slot(date_time=datetime(tomorrow.year, tomorrow.month, tomorrow.day, 10))
+        return AsyncReservationCommandRunner(
+            user,
+            Selection(sport_selection=sport_selection, slot=slot),
+            sport_selection,
+            coordinator=coordinator,
+            commands=[
+                AsyncLoginCommand(),
+                AsyncFillFormCommand(),
+                ResolveEventTargetCommand(),
+                AsyncReservationClickCommand(),
+                AsyncReservationChoiceCommand(),
+                AsyncAddToCartCommand(),
+            ],
+        )
+
+
+class AsyncAddToCartCommandTest(AsyncChainTestCase):
+    def test_only_the_first_alternative_is_added_to_the_cart(self):
+        coordinator = AsyncFirstSuccessCoordinator()
+        runners = [
+            self.build_runner(court_id, coordinator)
+            for court_id in self.fake.courts[:3]
+        ]
+
+        asyncio.run(run_chains(runners))
+
+        self.assertEqual(sum(not runner.is_failure for runner in runners), 1)
+        self.assertIs(coordinator.winner, next(r for r in runners if not r.is_failure))
+        baskets = [session["basket"] for session in self.fake.sessions.values()]
+        self.assertEqual(sum(len(basket) for basket in baskets), 1)
+
+    def test_chains_without_a_coordinator_all_add_to_the_cart(self):
+        runners = [
+            self.build_runner(court_id, None) for court_id in self.fake.courts[:2]
+        ]
+
+        asyncio.run(run_chains(runners))
+
+        self.assertTrue(all(not runner.is_failure for runner in runners))
+
+
+class LoopSharedTransportTest(AsyncChainTestCase):
+    def run_one_after_another(self, runners):
+        async def run():
+            try:
+                for runner in runners:
+                    await runner()
+            finally:
+                await loop_shared_transport.close_pool()
+
+        asyncio.run(run())
+
+    @override_settings(UPSTREAM_CONNECTION_POOL_SHARED=True)
+    def test_chains_of_a_loop_share_the_connections(self):
+        runners = [
+            self.build_runner(court_id, None) for court_id in self.fake.courts[:3]
+        ]
+
+        self.run_one_after_another(runners)
+
+        self.assertTrue(all(not runner.is_failure for runner in runners))
+        self.assertEqual(self.fake.stats["connections"], 1)
+        self.assertEqual(self.fake.stats["logins"], 3)
+
+    @override_settings(UPSTREAM_CONNECTION_POOL_SHARED=False)
+    def test_chains_open_their_own_connections_without_the_shared_pool(self):
+        runners = [
+            self.build_runner(court_id, None) for court_id in self.fake.courts[:3]
+        ]
+
+        self.run_one_after_another(runners)
+
+        self.assertEqual(self.fake.stats["connections"], 3)
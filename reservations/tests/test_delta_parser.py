@@ -0,0 +1,119 @@
+from django.test import SimpleTestCase
+
+from reservations.parsers.delta import (DeltaParseError, DeltaResponse,
+                                        find_postback_target)
+
+# Reservation click response of the court page, the panel holding a "|"
+CHOICE_PANEL_DELTA = (
+    "1|#||4|424|updatePanel|pageContent_UpdatePanel1|\r\n"
+    '            <div id="pageContent_pnlKiralikSatis" class="panel">\r\n'
+    "<h4>Kiralama Seçimi | Maltepe Kapalı Kort 1</h4>\r\n"
+    '<input id="pageContent_rblKiralikTenisSatisTuru_2" type="radio" '
+    'name="ctl00$pageContent$rblKiralikTenisSatisTuru" value="3" />\r\n'
+    '<a id="pageContent_lbtnSepeteEkle" class="btn btn-success" '
+    'href="javascript:__doPostBack(&#39;ctl00$pageContent$lbtnSepeteEkle&#39;,&#39;&#39;)">'
+    "Sepete Ekle</a>\r\n"
+    "</div>\r\n"
+    "        |0|hiddenField|__EVENTTARGET||0|hiddenField|__EVENTARGUMENT||"
+    "36|hiddenField|__VIEWSTATE|/wEPDwUKMTY1NDU2MTA1MmRk7vXqQ2pXyT0=|"
+    "8|hiddenField|__VIEWSTATEGENERATOR|BA851843|0|asyncPostBackControlIDs|||"
+    "0|postBackControlIDs|||"
+    "56|updatePanelIDs||tctl00$pageContent$UpdatePanel1,pageContent_UpdatePanel1|"
+    "0|childUpdatePanelIDs|||"
+    "55|panelsToRefreshIDs||ctl00$pageContent$UpdatePanel1,pageContent_UpdatePanel1|"
+    "2|asyncPostBackTimeout||90|14|formAction||./satiskiralik|"
+    "34|pageTitle||\r\n\tSatış Kiralık - Spor İstanbul\r\n|"
+)
+ERROR_DELTA = (
+    "1|#||4|53|error|500|Seçtiğiniz seans başka bir üye tarafından alınmıştır.|"
+)
+
+
+class DeltaResponseTest(SimpleTestCase):
+    def test_entries_are_read_by_their_character_length(self):
+        delta = DeltaResponse(CHOICE_PANEL_DELTA.encode("utf-8"))
+
+        panel = delta.panel("pageContent_UpdatePanel1")
+        self.assertIn("Kiralama Seçimi | Maltepe Kapalı Kort 1", panel)
+        self.assertTrue(panel.endswith("</div>\r\n        "))
+        self.assertEqual(delta.viewstate, "/wEPDwUKMTY1NDU2MTA1MmRk7vXqQ2pXyT0=")
+        self.assertEqual(delta.hidden_field("__VIEWSTATEGENERATOR"), "BA851843")
+        self.assertEqual(delta.hidden_field("__EVENTTARGET"), "")
+        self.assertEqual(delta.get("formAction"), "./satiskiralik")
+        self.assertEqual(
+            delta.get("pageTitle"), "\r\n\tSatış Kiralık - Spor İstanbul\r\n"
+        )
+        self.assertEqual(delta.panel_ids, ["pageContent_UpdatePanel1"])
+        self.assertIsNone(delta.error)
+
+    def test_missing_entries_are_none(self):
+        delta = DeltaResponse(CHOICE_PANEL_DELTA)
+
+        self.assertIsNone(delta.panel("pageContent_UpdatePanel2"))
+        self.assertIsNone(delta.hidden_field("__LASTFOCUS"))
+
+    def test_error_entry(self):
+        delta = DeltaResponse(ERROR_DELTA)
+
+        self.assertEqual(
+            delta.error, "Seçtiğiniz seans başka bir üye tarafından alınmıştır."
+        )
+        self.assertEqual(delta.panel_ids, [])
+
+    def test_empty_response_has_no_entries(self):
+        self.assertEqual(DeltaResponse(b"").entries, {})
+
+    def test_truncated_response_raises(self):
+        # Cut inside the view state, as a dropped connection would
+        content = CHOICE_PANEL_DELTA[: CHOICE_PANEL_DELTA.index("/wEPDw") + 10]
+
+        with self.assertRaisesMessage(DeltaParseError, "length mismatch"):
+            DeltaResponse(content)
+
+    def test_response_cut_in_an_entry_header_raises(self):
+        content = CHOICE_PANEL_DELTA[: CHOICE_PANEL_DELTA.index("|hiddenField|") + 5]
+
+        with self.assertRaisesMessage(DeltaParseError, "Truncated"):
+            DeltaResponse(content)
+
+    def test_byte_counted_length_raises(self):
+        # The length counts characters, not UTF-8 bytes
+        content = CHOICE_PANEL_DELTA.replace("424|updatePanel", "430|updatePanel", 1)
+
+        with self.assertRaises(DeltaParseError):
+            DeltaResponse(content)
+
+    def test_full_html_page_raises(self):
+        # An expired session answers the postback with the login page
+        with self.assertRaisesMessage(DeltaParseError, "Invalid delta entry length"):
+            DeltaResponse(
+                "<!DOCTYPE html><html><title>Giriş | Üye | Spor | İstanbul</title></html>"
+            )
+
+
+class FindPostbackTargetTest(SimpleTestCase):
+    def test_target_in_a_delta_panel(self):
+        self.assertEqual(
+            find_postback_target(CHOICE_PANEL_DELTA, "pageContent_lbtnSepeteEkle"),
+            "ctl00$pageContent$lbtnSepeteEkle",
+        )
+
+    def test_target_in_a_page_with_plain_quotes(self):
+        content = (
+            b'<html><body><a id="pageContent_lbtnSepeteEkle" '
+            b"href=\"javascript:__doPostBack('ctl00$pageContent$lbtnSepeteEkle','')\">"
+            b"Sepete Ekle</a></body></html>"
+        )
+
+        self.assertEqual(
+            find_postback_target(content, "pageContent_lbtnSepeteEkle"),
+            "ctl00$pageContent$lbtnSepeteEkle",
+        )
+
+    def test_anchor_id_must_match_exactly(self):
+        self.assertIsNone(find_postback_target(CHOICE_PANEL_DELTA, "lbtnSepeteEkle"))
+
+    def test_anchor_without_postback(self):
+        content = '<a id="pageContent_lbtnSepeteEkle" href="/uyesepet">Sepet</a>'
+
+        self.assertIsNone(find_postback_target(content, "pageContent_lbtnSepeteEkle"))
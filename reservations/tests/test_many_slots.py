@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+
+from reservations.fake_upstream import FakeUpstream
+from reservations.helpers import SlotFetchError, fetch_many_slots
+from selections.constants import CLOSED_COURT_IDS, COMPLEX_MALTEPE_ID
+from selections.models import SportSelection
+
+
+@override_settings(
+    FORM_STATE_CACHE_ENABLED=False,
+    UPSTREAM_SESSION_POOL_ENABLED=False,
+    RESERVATION_TRANSCRIPT_DIR=None,
+    RESERVATION_ATTEMPTS_ENABLED=False,
+    RESERVATION_PACING_MODE="fast",
+)
+class FetchManySlotsTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeUpstream(latency=0)
+        url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+        settings_override = override_settings(UPSTREAM_BASE_URL=url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.sport_selections = [
+            SportSelection(pitch_id=court_id, complex_id=COMPLEX_MALTEPE_ID)
+            for court_id in CLOSED_COURT_IDS[:2]
+        ]
+
+    def build_user(self, password="x"):
+        return get_user_model()(
+            pk=1, tckn="00000000001", third_party_app_password=password
+        )
+
+    def test_courts_are_fetched_on_a_single_login(self):
+        courts_data = fetch_many_slots(self.build_user(), self.sport_selections)
+
+        self.assertEqual(list(courts_data), CLOSED_COURT_IDS[:2])
+        self.assertTrue(all(data["slots"] for data in courts_data.values()))
+        self.assertEqual(self.fake.stats["logins"], 1)
+
+    def test_failed_login_fetches_no_court(self):
+        with self.assertRaises(SlotFetchError):
+            fetch_many_slots(self.build_user(password=None), self.sport_selections)
+
+        self.assertEqual(self.fake.stats["requests"], 0)
+
+    @mock.patch("reservations.helpers.show_slots")
+    def test_failed_court_fetch_is_not_parsed(self, show_slots):
+        def fail(runner_instance):
+            runner_instance.is_failure = True
+
+        with mock.patch(
+            "reservations.commands.base.FillFormCommand.execute", side_effect=fail
+        ):
+            with self.assertRaises(SlotFetchError):
+                fetch_many_slots(self.build_user(), self.sport_selections)
+
+        show_slots.assert_not_called()
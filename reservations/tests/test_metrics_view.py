@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"], METRICS_TOKEN="scrape-token")
+class MetricsViewTest(SimpleTestCase):
+    def test_public_request_is_refused(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_token_is_refused(self):
+        response = self.client.get(
+            "/metrics",
+            REMOTE_ADDR="203.0.113.7",
+            HTTP_AUTHORIZATION="Bearer guess",
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_allowed_address(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"reservation_command", response.content)
+
+    def test_bearer_token(self):
+        response = self.client.get(
+            "/metrics",
+            REMOTE_ADDR="203.0.113.7",
+            HTTP_AUTHORIZATION="Bearer scrape-token",
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_empty_token_is_never_accepted(self):
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="203.0.113.7", HTTP_AUTHORIZATION="Bearer "
+        )
+
+        self.assertEqual(response.status_code, 403)
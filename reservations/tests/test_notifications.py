@@ -0,0 +1,163 @@
+import itertools
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from reservations.mail.client import MailjetUnavailable, mail_client
+from reservations.mail.fake_mailjet import FakeMailjet
+from reservations.mail.queue import NotificationQueue
+
+
+def notification(index):
+    return {
+        "email": f"member-{index}@example.com",
+        "first_name": "Member",
+        "slot": "01.01.2030 10:00",
+        "info": "Maltepe Tenis Kortu",
+        "status": "IN_CART",
+    }
+
+
+class ListQueue(NotificationQueue):
+    # The Redis lists of the queue kept in memory
+    def __init__(self):
+        self.messages = []
+        self.batches = {}
+        self.batch_ids = itertools.count()
+        self.backing_off = False
+
+    def __len__(self):
+        return len(self.messages)
+
+    def push_many(self, contexts):
+        self.messages.extend(contexts)
+
+    def claim(self, count):
+        batch_key = f"batch-{next(self.batch_ids)}"
+        contexts, self.messages = self.messages[:count], self.messages[count:]
+        if contexts:
+            self.batches[batch_key] = contexts
+        return batch_key, contexts
+
+    def ack(self, batch_key, retried=()):
+        del self.batches[batch_key]
+        self.messages.extend(retried)
+
+    def restore(self, batch_key):
+        self.messages[:0] = self.batches.pop(batch_key)
+
+    def recover(self):
+        if settings.NOTIFICATION_PROCESSING_TIMEOUT_SECONDS == 0:
+            for batch_key in list(self.batches):
+                self.restore(batch_key)
+
+    def back_off(self):
+        self.backing_off = True
+
+    def is_backing_off(self):
+        return self.backing_off
+
+
+class FakeMailjetTestCase(SimpleTestCase):
+    fake_options = {}
+
+    def setUp(self):
+        self.fake = FakeMailjet(latency=0, **self.fake_options)
+        url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+
+        settings_override = override_settings(MAILJET_API_URL=url, MAIL_ENABLED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class MailJetClientTest(FakeMailjetTestCase):
+    fake_options = {"rejected_emails": ["member-1@example.com"]}
+
+    def test_messages_mailjet_did_not_send_are_returned(self):
+        contexts = [notification(index) for index in range(3)]
+
+        self.assertEqual(mail_client.send_batch(contexts), [contexts[1]])
+        self.assertEqual(self.fake.stats["messages"], 2)
+
+    def test_send_tells_whether_the_email_was_sent(self):
+        self.assertIs(mail_client.send(notification(0)), True)
+        self.assertIs(mail_client.send(notification(1)), False)
+
+    def test_client_is_built_once_per_api_url(self):
+        self.assertIs(mail_client.client, mail_client.client)
+
+    def test_nothing_is_sent_when_mails_are_off(self):
+        contexts = [notification(0)]
+
+        with override_settings(MAIL_ENABLED=False):
+            self.assertEqual(mail_client.send_batch(contexts), contexts)
+        self.assertEqual(self.fake.stats["calls"], 0)
+
+
+class UnavailableMailjetTest(FakeMailjetTestCase):
+    fake_options = {"error_status": 503}
+
+    def test_server_error_raises(self):
+        with self.assertRaises(MailjetUnavailable):
+            mail_client.send_batch([notification(0)])
+
+    def test_send_is_false(self):
+        self.assertIs(mail_client.send(notification(0)), False)
+
+    def test_drain_keeps_the_batch_and_backs_off(self):
+        queue = ListQueue()
+        queue.push_many([notification(index) for index in range(3)])
+
+        self.assertEqual(queue.drain(mail_client, batch_size=2), 0)
+
+        self.assertTrue(queue.backing_off)
+        self.assertEqual(
+            [context["email"] for context in queue.messages],
+            [notification(index)["email"] for index in range(3)],
+        )
+        self.assertNotIn("attempts", queue.messages[0])
+        self.assertEqual(self.fake.stats["failed_calls"], 1)
+
+        # Drains during the backoff leave Mailjet alone
+        self.assertEqual(queue.drain(mail_client, batch_size=2), 0)
+        self.assertEqual(self.fake.stats["failed_calls"], 1)
+
+
+@override_settings(NOTIFICATION_MAX_ATTEMPTS=2)
+class DrainRejectedMessagesTest(FakeMailjetTestCase):
+    fake_options = {"rejected_emails": ["member-1@example.com"]}
+
+    def test_rejected_message_is_retried_then_dropped(self):
+        queue = ListQueue()
+        queue.push_many([notification(index) for index in range(3)])
+
+        self.assertEqual(queue.drain(mail_client, batch_size=2), 2)
+        self.assertEqual(queue.messages, [{**notification(1), "attempts": 1}])
+
+        self.assertEqual(queue.drain(mail_client, batch_size=2), 0)
+        self.assertEqual(queue.messages, [])
+        self.assertEqual(self.fake.stats["messages"], 2)
+
+
+class DrainOrphanedBatchTest(FakeMailjetTestCase):
+    def test_batch_of_a_dead_worker_is_sent_again(self):
+        queue = ListQueue()
+        queue.push_many([notification(index) for index in range(3)])
+        # Claimed by a worker that died before sending it
+        queue.claim(2)
+
+        with override_settings(NOTIFICATION_PROCESSING_TIMEOUT_SECONDS=0):
+            self.assertEqual(queue.drain(mail_client, batch_size=2), 3)
+
+        self.assertEqual(queue.messages, [])
+        self.assertEqual(queue.batches, {})
+
+    def test_sent_batch_is_acknowledged(self):
+        queue = ListQueue()
+        queue.push_many([notification(index) for index in range(3)])
+
+        self.assertEqual(queue.drain(mail_client, batch_size=2), 3)
+
+        self.assertEqual(queue.batches, {})
+        self.assertEqual(self.fake.stats["calls"], 2)
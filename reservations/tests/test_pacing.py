@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+from django.test import SimpleTestCase
+
+from reservations.pacing import SPIN_SECONDS, async_wait_until
+
+
+class AsyncWaitUntilTest(SimpleTestCase):
+    def test_other_chains_run_while_spinning(self):
+        deadline = time.time() + SPIN_SECONDS / 2
+        ticks = []
+
+        async def other_chain():
+            while time.time() < deadline:
+                ticks.append(time.time())
+                await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(async_wait_until(deadline), other_chain())
+
+        asyncio.run(main())
+
+        self.assertGreater(len(ticks), 1)
+        self.assertGreaterEqual(time.time(), deadline)
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from reservations.commands.base import LoginCommand, ReservationCommandRunner
+from reservations.fake_upstream import FakeUpstream
+from reservations.helpers import fetch_many_slots
+from reservations.models import ReservationAttempt, ReservationAttemptStep
+from reservations.tasks import prune_reservation_attempts
+from selections.constants import COMPLEX_MALTEPE_ID
+from selections.models import SportSelection
+
+FAKE_UPSTREAM_SETTINGS = {
+    "FORM_STATE_CACHE_ENABLED": False,
+    "UPSTREAM_SESSION_POOL_ENABLED": False,
+    "RESERVATION_TRANSCRIPT_DIR": None,
+    "RESERVATION_PACING_MODE": "fast",
+}
+
+
+class FakeUpstreamMixin:
+    def setUp(self):
+        super().setUp()
+        self.fake = FakeUpstream(latency=0)
+        url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+        settings_override = override_settings(UPSTREAM_BASE_URL=url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+@override_settings(RESERVATION_ATTEMPTS_ENABLED=True, **FAKE_UPSTREAM_SETTINGS)
+class SaveAttemptTest(FakeUpstreamMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create(
+            tckn="00000000001", email="member@example.com", third_party_app_password="x"
+        )
+
+    def run_chain(self, chain_type):
+        ReservationCommandRunner(
+            self.user,
+            None,
+            SportSelection(pitch_id=self.fake.courts[0], complex_id=COMPLEX_MALTEPE_ID),
+            commands=[LoginCommand()],
+            court_selection=self.fake.courts[0],
+            chain_type=chain_type,
+        )()
+
+    def test_reservation_chains_are_recorded(self):
+        self.run_chain("reserve")
+
+        attempt = ReservationAttempt.objects.get()
+        self.assertEqual(attempt.chain_type, "reserve")
+        self.assertEqual(attempt.steps.count(), 1)
+
+    def test_slot_fetches_are_not_recorded(self):
+        self.run_chain("show-slots")
+
+        self.assertFalse(ReservationAttempt.objects.exists())
+
+
+class PruneReservationAttemptsTest(TestCase):
+    def create_attempt(self, user, started_at):
+        attempt = ReservationAttempt.objects.create(
+            user=user,
+            chain_type="reserve",
+            started_at=started_at,
+            finished_at=started_at,
+        )
+        ReservationAttemptStep.objects.create(
+            attempt=attempt,
+            position=0,
+            command="LoginCommand",
+            outcome="success",
+            started_at=started_at,
+            finished_at=started_at,
+            duration=0.1,
+        )
+        return attempt
+
+    @override_settings(RESERVATION_ATTEMPT_RETENTION_DAYS=30)
+    def test_attempts_past_the_retention_are_deleted_with_their_steps(self):
+        user = get_user_model().objects.create(tckn="00000000001", email="a@b.com")
+        now = timezone.now()
+        kept = self.create_attempt(user, now - timedelta(days=29))
+        for days in (31, 60):
+            self.create_attempt(user, now - timedelta(days=days))
+
+        prune_reservation_attempts()
+
+        self.assertEqual(list(ReservationAttempt.objects.all()), [kept])
+        self.assertEqual(ReservationAttemptStep.objects.count(), 1)
+
+
+@override_settings(RESERVATION_ATTEMPTS_ENABLED=False, **FAKE_UPSTREAM_SETTINGS)
+class FetchManySlotsTest(FakeUpstreamMixin, SimpleTestCase):
+    def test_court_fetches_close_their_database_connections(self):
+        user = get_user_model()(pk=1, tckn="00000000001", third_party_app_password="x")
+        sport_selections = [
+            SportSelection(pitch_id=court_id, complex_id=COMPLEX_MALTEPE_ID)
+            for court_id in self.fake.courts[:3]
+        ]
+
+        with mock.patch("reservations.helpers.connections") as connections:
+            courts_data = fetch_many_slots(user, sport_selections)
+
+        self.assertEqual(set(courts_data), set(self.fake.courts[:3]))
+        self.assertEqual(connections.close_all.call_count, 3)
@@ -0,0 +1,369 @@
+import uuid
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from reservations.helpers import create_reservation_job
+from reservations.models import ReservationJob
+from reservations.tasks import (dispatch_reservation_jobs,
+                                execute_reservation_burst,
+                                execute_reservation_job)
+from selections.models import Selection, Slot, SportSelection
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CreateReservationJobTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            tckn="00000000001", email="member@example.com"
+        )
+        sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        # Slots are stored with the Turkish wall clock time
+        slot_date = timezone.now().date() + timedelta(days=5)
+        self.slot = Slot.objects.create(
+            date_time=timezone.make_aware(
+                datetime(slot_date.year, slot_date.month, slot_date.day, 10)
+            )
+        )
+        self.selection = Selection.objects.create(
+            sport_selection=sport_selection, slot=self.slot
+        )
+
+    @override_settings(
+        RESERVATION_BURST_ENABLED=True, RESERVATION_DISPATCHER_ENABLED=False
+    )
+    @mock.patch("reservations.tasks.execute_reservation_burst.apply_async")
+    def test_eta_job_schedules_a_burst_at_the_opening_instant(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation_job = create_reservation_job(self.selection, self.user)
+
+        self.assertEqual(reservation_job.execution_type, ReservationJob.ETA)
+        self.assertTrue(timezone.is_aware(reservation_job.opens_at))
+        self.assertEqual(
+            reservation_job.opens_at,
+            self.slot.date_time - timedelta(days=3, hours=3),
+        )
+        apply_async.assert_called_once_with(
+            (reservation_job.opens_at.isoformat(),),
+            eta=reservation_job.execution_time,
+        )
+
+    @override_settings(
+        RESERVATION_BURST_ENABLED=True, RESERVATION_DISPATCHER_ENABLED=False
+    )
+    @mock.patch("reservations.tasks.execute_reservation_burst.apply_async")
+    def test_jobs_opening_at_the_same_instant_share_a_burst(self, apply_async):
+        other_user = get_user_model().objects.create(
+            tckn="00000000002", email="other@example.com"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            create_reservation_job(self.selection, self.user)
+            create_reservation_job(self.selection, other_user)
+
+        apply_async.assert_called_once()
+
+    @override_settings(
+        RESERVATION_BURST_ENABLED=True, RESERVATION_DISPATCHER_ENABLED=True
+    )
+    @mock.patch("reservations.tasks.execute_reservation_burst.apply_async")
+    def test_eta_job_waits_for_the_dispatcher(self, apply_async):
+        reservation_job = create_reservation_job(self.selection, self.user)
+
+        apply_async.assert_not_called()
+        self.assertIsNone(reservation_job.dispatched_at)
+
+    @override_settings(
+        RESERVATION_BURST_ENABLED=False, RESERVATION_DISPATCHER_ENABLED=False
+    )
+    @mock.patch("reservations.tasks.execute_reservation_job.apply_async")
+    def test_eta_job_without_bursts_is_enqueued_with_its_eta(self, apply_async):
+        apply_async.return_value.id = "task-id"
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            reservation_job = create_reservation_job(self.selection, self.user)
+
+        # Nothing reaches the broker before the job is committed
+        apply_async.assert_not_called()
+        callbacks[0]()
+        _, kwargs = apply_async.call_args
+        self.assertEqual(kwargs["eta"], reservation_job.execution_time)
+        reservation_job.refresh_from_db()
+        self.assertEqual(reservation_job.task_id, "task-id")
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    RESERVATION_BURST_ENABLED=True,
+    RESERVATION_DISPATCHER_ENABLED=False,
+)
+@mock.patch("reservations.tasks.execute_reservation_job.apply_async")
+@mock.patch("reservations.tasks.execute_reservation_burst.apply_async")
+@mock.patch("reservations.commands.async_base.AsyncReservationCommandRunner")
+class ReservationBurstTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        slot_date = timezone.now().date() + timedelta(days=5)
+        self.selection = Selection.objects.create(
+            sport_selection=sport_selection,
+            slot=Slot.objects.create(
+                date_time=timezone.make_aware(
+                    datetime(slot_date.year, slot_date.month, slot_date.day, 10)
+                )
+            ),
+        )
+        self.users = [
+            get_user_model().objects.create(
+                tckn=f"0000000000{index}", email=f"member-{index}@example.com"
+            )
+            for index in range(1, 4)
+        ]
+
+    def create_job(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_reservation_job(self.selection, user)
+
+    def run_burst(self, reservation_job, runner_class, results):
+        runner_class.return_value = mock.Mock(
+            is_failure=False, released_at=None, fire_latency=None
+        )
+
+        async def run_chains(runners):
+            return results[: len(runners)]
+
+        with mock.patch("reservations.commands.async_base.run_chains", run_chains):
+            execute_reservation_burst(reservation_job.opens_at.isoformat())
+        return [call.kwargs["reservation_job"] for call in runner_class.call_args_list]
+
+    def test_burst_claims_the_jobs_dispatched_before_it(
+        self, runner_class, burst_apply_async, job_apply_async
+    ):
+        reservation_job = self.create_job(self.users[0])
+        dispatch_token = reservation_job.dispatch_token
+
+        fired = self.run_burst(reservation_job, runner_class, [None])
+
+        self.assertEqual([job.id for job in fired], [reservation_job.id])
+        reservation_job.refresh_from_db()
+        # Tasks carrying the dispatch token are stale now
+        self.assertNotEqual(reservation_job.dispatch_token, dispatch_token)
+        job_apply_async.assert_not_called()
+
+    def test_job_dispatched_after_the_burst_started_runs_alone(
+        self, runner_class, burst_apply_async, job_apply_async
+    ):
+        job_apply_async.return_value.id = "task-id"
+        reservation_job = self.create_job(self.users[0])
+        self.run_burst(reservation_job, runner_class, [None])
+
+        late_job = self.create_job(self.users[1])
+
+        # No second burst runs the chains of the first one again
+        burst_apply_async.assert_called_once()
+        _, kwargs = job_apply_async.call_args
+        self.assertEqual(kwargs["eta"], late_job.execution_time)
+
+    def test_jobs_not_dispatched_are_left_out(
+        self, runner_class, burst_apply_async, job_apply_async
+    ):
+        reservation_job = self.create_job(self.users[0])
+        with override_settings(RESERVATION_DISPATCHER_ENABLED=True):
+            waiting_job = self.create_job(self.users[1])
+        self.assertEqual(waiting_job.opens_at, reservation_job.opens_at)
+
+        fired = self.run_burst(reservation_job, runner_class, [None, None])
+
+        self.assertEqual([job.id for job in fired], [reservation_job.id])
+
+    def test_failed_chain_falls_back_with_the_burst_token(
+        self, runner_class, burst_apply_async, job_apply_async
+    ):
+        reservation_job = self.create_job(self.users[0])
+
+        with mock.patch("reservations.tasks.execute_reservation_job.delay") as delay:
+            self.run_burst(reservation_job, runner_class, [Exception("timeout")])
+
+        reservation_job.refresh_from_db()
+        delay.assert_called_once_with(
+            reservation_job.id, dispatch_token=str(reservation_job.dispatch_token)
+        )
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    RESERVATION_BURST_ENABLED=False,
+    RESERVATION_DISPATCHER_ENABLED=True,
+    RESERVATION_DISPATCH_WINDOW_SECONDS=120,
+)
+@mock.patch("reservations.tasks.execute_reservation_job.apply_async")
+class DispatchReservationJobsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            tckn="00000000001", email="member@example.com"
+        )
+        sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        slot = Slot.objects.create(date_time=timezone.now() + timedelta(days=5))
+        self.selection = Selection.objects.create(
+            sport_selection=sport_selection, slot=slot
+        )
+
+    def create_job(self, execution_time):
+        return ReservationJob.objects.create(
+            selection=self.selection, user=self.user, execution_time=execution_time
+        )
+
+    def test_due_job_is_enqueued_with_its_dispatch_token(self, apply_async):
+        apply_async.return_value.id = "task-id"
+        reservation_job = self.create_job(timezone.now() + timedelta(seconds=60))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_reservation_jobs()
+
+        reservation_job.refresh_from_db()
+        apply_async.assert_called_once_with(
+            (reservation_job.id,),
+            {"dispatch_token": str(reservation_job.dispatch_token)},
+            eta=reservation_job.execution_time,
+        )
+        self.assertIsNotNone(reservation_job.dispatched_at)
+        self.assertEqual(reservation_job.task_id, "task-id")
+
+    def test_job_due_after_the_window_waits(self, apply_async):
+        reservation_job = self.create_job(timezone.now() + timedelta(minutes=10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_reservation_jobs()
+
+        apply_async.assert_not_called()
+        reservation_job.refresh_from_db()
+        self.assertIsNone(reservation_job.dispatched_at)
+
+    def test_dispatched_job_is_not_enqueued_again(self, apply_async):
+        apply_async.return_value.id = "task-id"
+        self.create_job(timezone.now() + timedelta(seconds=60))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_reservation_jobs()
+            dispatch_reservation_jobs()
+
+        apply_async.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RESERVATION_DISPATCHER_ENABLED=True)
+class LegacyEtaJobTest(TestCase):
+    migration = import_module("reservations.migrations.0015_redispatch_legacy_eta_jobs")
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create(
+            tckn="00000000001", email="member@example.com"
+        )
+        sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        slot = Slot.objects.create(date_time=timezone.now() + timedelta(days=5))
+        selection = Selection.objects.create(sport_selection=sport_selection, slot=slot)
+        self.reservation_job = ReservationJob.objects.create(
+            selection=selection,
+            user=user,
+            execution_time=timezone.now() + timedelta(days=2),
+        )
+
+    def mark_legacy_jobs_dispatched(self):
+        # What 0013 left behind for the jobs queued at creation
+        import_module(
+            "reservations.migrations.0013_reservationjob_dispatched_at"
+        ).mark_existing_jobs_dispatched(apps, None)
+
+    def test_legacy_eta_beyond_the_window_is_handed_to_the_dispatcher(self):
+        # Jobs created before 0012 stored no task id
+        self.mark_legacy_jobs_dispatched()
+
+        with mock.patch.object(self.migration, "revoke") as revoke:
+            self.migration.redispatch_legacy_eta_jobs(apps, None)
+
+        revoke.assert_not_called()
+        self.reservation_job.refresh_from_db()
+        self.assertIsNone(self.reservation_job.dispatched_at)
+        self.assertIsNone(self.reservation_job.task_id)
+
+    def test_stored_task_of_a_legacy_eta_is_revoked(self):
+        ReservationJob.objects.filter(id=self.reservation_job.id).update(
+            task_id="legacy-task"
+        )
+        self.mark_legacy_jobs_dispatched()
+
+        with mock.patch.object(self.migration, "revoke") as revoke:
+            self.migration.redispatch_legacy_eta_jobs(apps, None)
+
+        revoke.assert_called_once_with(["legacy-task"])
+        self.reservation_job.refresh_from_db()
+        self.assertIsNone(self.reservation_job.dispatched_at)
+        self.assertIsNone(self.reservation_job.task_id)
+
+    def test_legacy_eta_due_within_the_window_is_left_queued(self):
+        ReservationJob.objects.filter(id=self.reservation_job.id).update(
+            execution_time=timezone.now() + timedelta(seconds=30)
+        )
+        self.mark_legacy_jobs_dispatched()
+
+        with mock.patch.object(self.migration, "revoke") as revoke:
+            self.migration.redispatch_legacy_eta_jobs(apps, None)
+
+        revoke.assert_not_called()
+        self.reservation_job.refresh_from_db()
+        self.assertIsNotNone(self.reservation_job.dispatched_at)
+
+    @mock.patch("reservations.tasks.execute_reservation_job.apply_async")
+    def test_handed_back_job_is_dispatched_with_a_token_when_due(self, apply_async):
+        apply_async.return_value.id = "task-id"
+        self.mark_legacy_jobs_dispatched()
+        with mock.patch.object(self.migration, "revoke"):
+            self.migration.redispatch_legacy_eta_jobs(apps, None)
+        ReservationJob.objects.filter(id=self.reservation_job.id).update(
+            execution_time=timezone.now() + timedelta(seconds=30)
+        )
+
+        with self.settings(RESERVATION_BURST_ENABLED=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                dispatch_reservation_jobs()
+
+        self.reservation_job.refresh_from_db()
+        self.assertIsNotNone(self.reservation_job.dispatch_token)
+        apply_async.assert_called_once()
+
+    @mock.patch("reservations.tasks.acquire_reservation_lock")
+    def test_legacy_task_of_a_job_dispatched_again_is_skipped(self, acquire_lock):
+        ReservationJob.objects.filter(id=self.reservation_job.id).update(
+            dispatched_at=timezone.now(), dispatch_token=uuid.uuid4()
+        )
+
+        execute_reservation_job(self.reservation_job.id)
+
+        acquire_lock.assert_not_called()
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+from django.test import SimpleTestCase
+
+from reservations.parsers.reservations import (PAID, index_member_reservations,
+                                               is_paid)
+
+
+def row(slot_date, hour, status):
+    day = slot_date.strftime("%d.%m.%Y")
+    return (
+        f"<tr><td>1</td><td>Maltepe Kapalı Kort 1</td>"
+        f"<td>{hour:02d}:00:00 - {hour + 1:02d}:00:00</td>"
+        f"<td>{day} - {day}</td><td>{status}</td><td>-</td></tr>"
+    )
+
+
+def member_reservations_page(*rows):
+    return (
+        '<form method="post" action="./uyespor" id="form1">'
+        '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="VS"/>'
+        f'<table id="dtUyeSpor"><tbody>{"".join(rows)}</tbody></table></form>'
+    ).encode("utf-8")
+
+
+class IndexMemberReservationsTest(SimpleTestCase):
+    def test_rows_are_indexed_by_date_and_hour(self):
+        content = member_reservations_page(
+            row(date(2023, 3, 17), 10, "Sepette"),
+            row(date(2023, 3, 18), 21, PAID),
+        )
+
+        self.assertEqual(
+            index_member_reservations(content),
+            {(date(2023, 3, 17), 10): "Sepette", (date(2023, 3, 18), 21): PAID},
+        )
+
+    def test_paid_row_wins_over_later_rows_of_the_same_slot(self):
+        content = member_reservations_page(
+            row(date(2023, 3, 17), 10, PAID),
+            row(date(2023, 3, 17), 10, "İptal Edildi"),
+        )
+
+        self.assertEqual(
+            index_member_reservations(content), {(date(2023, 3, 17), 10): PAID}
+        )
+
+    def test_later_row_replaces_an_unpaid_one(self):
+        content = member_reservations_page(
+            row(date(2023, 3, 17), 10, "İptal Edildi"),
+            row(date(2023, 3, 17), 10, PAID),
+        )
+
+        self.assertEqual(
+            index_member_reservations(content), {(date(2023, 3, 17), 10): PAID}
+        )
+
+    def test_short_and_unparsable_rows_are_skipped(self):
+        content = member_reservations_page(
+            "<tr><td colspan='6'>Kayıt bulunamadı</td></tr>",
+            "<tr><td>1</td><td>Kort</td><td>-</td><td>-</td><td>Sepette</td></tr>",
+        )
+
+        self.assertEqual(index_member_reservations(content), {})
+
+    def test_page_without_the_table(self):
+        self.assertEqual(index_member_reservations(b"<html></html>"), {})
+
+
+class IsPaidTest(SimpleTestCase):
+    statuses = {(date(2023, 3, 17), 10): PAID, (date(2023, 3, 17), 11): "Sepette"}
+
+    def test_paid_slot(self):
+        self.assertTrue(is_paid(self.statuses, datetime(2023, 3, 17, 10)))
+
+    def test_slot_still_in_the_cart(self):
+        self.assertFalse(is_paid(self.statuses, datetime(2023, 3, 17, 11)))
+
+    def test_slot_missing_from_the_page(self):
+        self.assertFalse(is_paid(self.statuses, datetime(2023, 3, 18, 10)))
@@ -0,0 +1,157 @@
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from freezegun import freeze_time
+
+from reservations.enums import StatusCode
+from reservations.helpers import get_known_event_target, save_slot_availability
+from selections.models import Selection, Slot, SlotAvailability, SportSelection
+
+EVENT_TARGET = "ctl00$pageContent$rptList$ctl01$repeaterSeans$ctl03$lbtnRezervasyon"
+
+
+def slots_data(*slots):
+    return {
+        "court": "Maltepe Kapalı Kort 1",
+        "court_id": "1234",
+        "slots": [{"day": "Cuma", "date": "17.03.2023", "slots": list(slots)}],
+    }
+
+
+def reservable(hour, event_target):
+    return {
+        "slot": f"{hour:02d}:00 - {hour + 1:02d}:00",
+        "status": "Reservable",
+        "status_code": StatusCode.RESERVABLE.value,
+        "is_reservable": True,
+        "event_target": event_target,
+    }
+
+
+class SaveSlotAvailabilityTest(TestCase):
+    def setUp(self):
+        self.sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        self.slot = Slot.objects.create(
+            date_time=timezone.make_aware(datetime(2023, 3, 17, 10))
+        )
+        self.selection = Selection.objects.create(
+            sport_selection=self.sport_selection, slot=self.slot
+        )
+
+    def test_reservable_slot_keeps_its_event_target(self):
+        save_slot_availability(
+            self.sport_selection,
+            slots_data(reservable(10, EVENT_TARGET)),
+            timezone.now(),
+        )
+
+        availability = SlotAvailability.objects.get(date=date(2023, 3, 17), hour=10)
+        self.assertEqual(availability.status_code, StatusCode.RESERVABLE.value)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.event_target, EVENT_TARGET)
+        self.assertEqual(get_known_event_target(self.selection), EVENT_TARGET)
+
+    def test_slot_missing_from_a_later_crawl_is_taken(self):
+        observed_at = timezone.now()
+        save_slot_availability(
+            self.sport_selection,
+            slots_data(reservable(10, EVENT_TARGET), reservable(11, "other")),
+            observed_at - timedelta(minutes=1),
+        )
+
+        # The reserved well of 10:00 is left out of the grid
+        save_slot_availability(
+            self.sport_selection, slots_data(reservable(11, "other")), observed_at
+        )
+
+        availability = SlotAvailability.objects.get(date=date(2023, 3, 17), hour=10)
+        self.assertEqual(availability.status_code, StatusCode.ANOTHER_RESERVATION.value)
+        self.assertIsNone(availability.event_target)
+        self.assertEqual(availability.observed_at, observed_at)
+        self.slot.refresh_from_db()
+        self.assertIsNone(self.slot.event_target)
+        self.assertIsNone(get_known_event_target(self.selection))
+
+    def test_days_missing_from_the_crawl_are_left_alone(self):
+        save_slot_availability(
+            self.sport_selection,
+            slots_data(reservable(10, EVENT_TARGET)),
+            timezone.now(),
+        )
+
+        save_slot_availability(
+            self.sport_selection,
+            {"court": "", "court_id": "1234", "slots": []},
+            timezone.now(),
+        )
+
+        availability = SlotAvailability.objects.get(date=date(2023, 3, 17), hour=10)
+        self.assertEqual(availability.status_code, StatusCode.RESERVABLE.value)
+
+
+class GetKnownEventTargetTest(TestCase):
+    def setUp(self):
+        self.sport_selection = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="1234",
+        )
+        self.slot = Slot.objects.create(
+            date_time=timezone.make_aware(datetime(2023, 3, 20, 10))
+        )
+        self.selection = Selection.objects.create(
+            sport_selection=self.sport_selection, slot=self.slot
+        )
+
+    def crawl(self, sport_selection, observed_at):
+        save_slot_availability(
+            sport_selection,
+            {
+                "court": "Maltepe Kapalı Kort 1",
+                "court_id": sport_selection.pitch_id,
+                "slots": [
+                    {
+                        "day": "Pazartesi",
+                        "date": "20.03.2023",
+                        "slots": [reservable(10, EVENT_TARGET)],
+                    }
+                ],
+            },
+            observed_at,
+        )
+
+    @freeze_time("2023-03-17 20:50:00")
+    def test_target_crawled_today_upstream(self):
+        # 23:45 in Istanbul
+        self.crawl(self.sport_selection, timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(get_known_event_target(self.selection), EVENT_TARGET)
+
+    @freeze_time("2023-03-17 21:02:00")
+    def test_target_crawled_before_upstream_midnight_is_not_reused(self):
+        # 23:55 in Istanbul, the grid has shifted by a day at 00:00
+        self.crawl(self.sport_selection, timezone.now() - timedelta(minutes=7))
+
+        self.assertIsNone(get_known_event_target(self.selection))
+
+    def test_target_of_another_court_is_not_reused(self):
+        other_court = SportSelection.objects.create(
+            branch_id="59b7bd71-1aab-4751-8248-7af4a7790f8c",
+            complex_id="1",
+            pitch_id="5678",
+        )
+        self.crawl(other_court, timezone.now())
+
+        self.assertIsNone(get_known_event_target(self.selection))
+
+    def test_target_stored_on_the_slot_is_not_reused(self):
+        # Slots are shared by every court, their target may be of another one
+        self.slot.event_target = EVENT_TARGET
+        self.slot.save()
+
+        self.assertIsNone(get_known_event_target(self.selection))
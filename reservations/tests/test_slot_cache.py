@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from reservations.helpers import get_cached_slots, get_many_cached_slots
+from selections.models import SportSelection
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ColdSlotCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model()(pk=1, tckn="00000000001")
+        self.fetches = []
+        self.lock = threading.Lock()
+
+    def slow_fetch(self, result):
+        def fetch(*args):
+            with self.lock:
+                self.fetches.append(args)
+            time.sleep(0.2)
+            return result(*args)
+
+        return fetch
+
+    def test_concurrent_misses_fetch_the_snapshot_once(self):
+        fetch_slots = self.slow_fetch(lambda user, court_selection, _: court_selection)
+        with mock.patch("reservations.helpers.fetch_slots", fetch_slots):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                snapshots = list(
+                    executor.map(
+                        lambda _: get_cached_slots(self.user, "1234", True), range(8)
+                    )
+                )
+
+        self.assertEqual(len(self.fetches), 1)
+        self.assertTrue(all(snapshot["data"] == "1234" for snapshot in snapshots))
+
+    def test_waiting_request_fetches_when_the_filling_one_takes_too_long(self):
+        fetch_slots = self.slow_fetch(lambda user, court_selection, _: court_selection)
+        with mock.patch("reservations.helpers.fetch_slots", fetch_slots), mock.patch(
+            "reservations.slot_cache.slot_cache.fill_wait", 0
+        ):
+            cache.add("slot-availability-refresh:1234:1", True)
+            snapshot = get_cached_slots(self.user, "1234", True)
+
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(snapshot["data"], "1234")
+
+    def test_concurrent_misses_of_many_courts_fetch_each_snapshot_once(self):
+        sport_selections = [
+            SportSelection(pitch_id=pitch_id) for pitch_id in ("1234", "5678")
+        ]
+        fetch_many_slots = self.slow_fetch(
+            lambda user, selections, _: {
+                selection.pitch_id: selection.pitch_id for selection in selections
+            }
+        )
+        with mock.patch("reservations.helpers.fetch_many_slots", fetch_many_slots):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(
+                    executor.map(
+                        lambda _: get_many_cached_slots(
+                            self.user, sport_selections, True
+                        ),
+                        range(8),
+                    )
+                )
+
+        fetched = [
+            selection.pitch_id
+            for _, selections, _ in self.fetches
+            for selection in selections
+        ]
+        self.assertEqual(sorted(fetched), ["1234", "5678"])
+        self.assertTrue(
+            all(
+                [snapshot["data"] for snapshot in snapshots] == ["1234", "5678"]
+                for snapshots in results
+            )
+        )
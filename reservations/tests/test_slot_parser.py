@@ -0,0 +1,198 @@
+from datetime import datetime
+
+from django.test import SimpleTestCase
+from freezegun import freeze_time
+
+from reservations.enums import StatusCode
+from reservations.parsers.slots import parse_slot_grid, resolve_event_target
+
+RESERVATION_TARGET = (
+    "ctl00$pageContent$rptList$ctl{:02d}$repeaterSeans$ctl{:02d}$lbtnRezervasyon"
+)
+
+
+def well(status, hour, event_target=None):
+    link = (
+        f'<a href="javascript:__doPostBack(&#39;{event_target}&#39;,&#39;&#39;)">'
+        "Rezervasyon</a>"
+        if event_target
+        else ""
+    )
+    return (
+        f'<div class="well wellPlus"><div>{status}</div>'
+        f"<span>{hour:02d}:00 - {hour + 1:02d}:00</span>{link}</div>"
+    )
+
+
+def day_panel(title, wells):
+    return (
+        f'<div class="panel panel-info"><div class="panel-heading"><h3>{title}</h3></div>'
+        f'<div class="panel-body">{"".join(wells)}</div></div>'
+    )
+
+
+def court_page(*panels):
+    return (
+        '<html><body><form method="post" action="./satiskiralik" id="form1">'
+        '<select name="ctl00$pageContent$ddlSalonFiltre" id="ddlSalonFiltre">'
+        '<option value="">Seçiniz</option>'
+        '<option selected="selected" value="1234">Maltepe Kapalı Kort 1</option>'
+        "</select>" + "".join(panels) + "</form></body></html>"
+    )
+
+
+class ParseSlotGridTest(SimpleTestCase):
+    def test_wells_are_parsed_by_status(self):
+        content = court_page(
+            day_panel(
+                "Cuma 17.03.2023",
+                [
+                    well("Rezervasyon", 9, RESERVATION_TARGET.format(0, 2)),
+                    well("Başka Üye Sepetinde", 10),
+                    well("Uygun Değil", 11),
+                ],
+            )
+        )
+
+        data = parse_slot_grid(content, show_future_slots=False)
+
+        self.assertEqual(data["court"], "Maltepe Kapalı Kort 1")
+        self.assertEqual(data["court_id"], "1234")
+        [day] = data["slots"]
+        self.assertEqual((day["day"], day["date"]), ("Cuma", "17.03.2023"))
+        self.assertEqual(
+            day["slots"],
+            [
+                {
+                    "slot": "09:00 - 10:00",
+                    "status": "Reservable",
+                    "status_code": StatusCode.RESERVABLE.value,
+                    "is_reservable": True,
+                    "event_target": RESERVATION_TARGET.format(0, 2),
+                },
+                {
+                    "slot": "10:00 - 11:00",
+                    "status": "Başka Üye Sepetinde",
+                    "status_code": StatusCode.ANOTHER_BASKET.value,
+                    "is_reservable": False,
+                    "event_target": None,
+                },
+                {
+                    "slot": "11:00 - 12:00",
+                    "status": "Uygun Değil",
+                    "status_code": StatusCode.NO_SLOTS.value,
+                    "is_reservable": False,
+                    "event_target": None,
+                },
+            ],
+        )
+
+    def test_reserved_wells_are_left_out(self):
+        content = court_page(
+            day_panel("Cuma 17.03.2023", [well("Başka Üye Rezervasyonu", 9)])
+        )
+
+        data = parse_slot_grid(content, show_future_slots=False)
+
+        self.assertEqual(data["slots"][0]["slots"], [])
+
+    def test_utf8_bytes_are_parsed(self):
+        content = court_page(
+            day_panel(
+                "Çarşamba 15.03.2023",
+                [well("Rezervasyon", 9, RESERVATION_TARGET.format(0, 2))],
+            )
+        ).encode("utf-8")
+
+        data = parse_slot_grid(content, show_future_slots=False)
+
+        self.assertEqual(data["slots"][0]["day"], "Çarşamba")
+        self.assertEqual(data["court"], "Maltepe Kapalı Kort 1")
+
+    @freeze_time("2023-03-15 09:00:00")
+    def test_empty_days_past_the_reservation_window_will_be_available(self):
+        content = court_page(
+            day_panel("Perşembe 16.03.2023", []),
+            day_panel("Pazartesi 20.03.2023", []),
+        )
+
+        data = parse_slot_grid(content)
+
+        within_window, future = data["slots"]
+        self.assertEqual(within_window["slots"], [])
+        self.assertTrue(future["slots"])
+        self.assertTrue(
+            all(
+                slot["status_code"] == StatusCode.WILL_BE_AVAILABLE.value
+                and slot["event_target"] is None
+                for slot in future["slots"]
+            )
+        )
+
+    def test_empty_days_stay_empty_without_future_slots(self):
+        content = court_page(day_panel("Pazartesi 20.03.2023", []))
+
+        data = parse_slot_grid(content, show_future_slots=False)
+
+        self.assertEqual(data["slots"][0]["slots"], [])
+
+
+class ResolveEventTargetTest(SimpleTestCase):
+    def setUp(self):
+        self.content = court_page(
+            day_panel(
+                "Perşembe 16.03.2023",
+                [well("Rezervasyon", 10, RESERVATION_TARGET.format(0, 3))],
+            ),
+            day_panel(
+                "Cuma 17.03.2023",
+                [
+                    well("Rezervasyon", 8, RESERVATION_TARGET.format(1, 1)),
+                    well("Başka Üye Rezervasyonu", 9),
+                    well("Başka Üye Sepetinde", 10),
+                    well("Rezervasyon", 11, RESERVATION_TARGET.format(1, 4)),
+                    well("Rezervasyon", 12, RESERVATION_TARGET.format(1, 5)),
+                ],
+            ),
+        )
+
+    def test_requested_hour_of_the_requested_day(self):
+        self.assertEqual(
+            resolve_event_target(self.content, datetime(2023, 3, 17, 11)),
+            (RESERVATION_TARGET.format(1, 4), []),
+        )
+
+    def test_same_hour_of_another_day_is_not_picked(self):
+        self.assertEqual(
+            resolve_event_target(self.content, datetime(2023, 3, 16, 10)),
+            (RESERVATION_TARGET.format(0, 3), []),
+        )
+
+    def test_taken_hour_ranks_the_reservable_hours_of_the_day_by_distance(self):
+        event_target, reservables = resolve_event_target(
+            self.content, datetime(2023, 3, 17, 10)
+        )
+
+        self.assertIsNone(event_target)
+        # Ties go to the earlier hour, reserved wells are never offered
+        self.assertEqual(
+            reservables,
+            [
+                (11, RESERVATION_TARGET.format(1, 4)),
+                (8, RESERVATION_TARGET.format(1, 1)),
+                (12, RESERVATION_TARGET.format(1, 5)),
+            ],
+        )
+
+    def test_reserved_hour_is_not_resolved(self):
+        event_target, reservables = resolve_event_target(
+            self.content, datetime(2023, 3, 17, 9)
+        )
+
+        self.assertIsNone(event_target)
+        self.assertEqual([hour for hour, _ in reservables], [8, 11, 12])
+
+    def test_day_missing_from_the_grid(self):
+        self.assertEqual(
+            resolve_event_target(self.content, datetime(2023, 3, 18, 10)), (None, [])
+        )
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+
+from reservations.commands.base import (AddToCartCommand, FillFormCommand,
+                                        LoginCommand, ReservationChoiceCommand,
+                                        ReservationClickCommand,
+                                        ReservationCommandRunner,
+                                        ResolveEventTargetCommand)
+from reservations.fake_upstream import FakeUpstream
+from reservations.management.commands.replay_transcript import \
+    Command as ReplayCommand
+from reservations.transcripts import (REDACTED, TranscriptRecorder,
+                                      load_transcript, redact_header)
+from reservations.utils import get_legacy_session
+from selections.constants import COMPLEX_MALTEPE_ID
+from selections.models import Selection, Slot, SportSelection
+
+
+class RedactHeaderTest(SimpleTestCase):
+    def test_set_cookie_keeps_its_name_and_attributes(self):
+        self.assertEqual(
+            redact_header(
+                "Set-Cookie", ".ASPXAUTH=8F3A0B==; expires=Fri, 17-Mar-2023; path=/"
+            ),
+            f".ASPXAUTH={REDACTED}; expires=Fri, 17-Mar-2023; path=/",
+        )
+
+    def test_cookie_values_are_redacted(self):
+        self.assertEqual(
+            redact_header("Cookie", "ASP.NET_SessionId=abc; .ASPXAUTH=def"),
+            f"ASP.NET_SessionId={REDACTED}; .ASPXAUTH={REDACTED}",
+        )
+
+    def test_other_headers_are_kept(self):
+        self.assertEqual(
+            redact_header("Content-Type", "text/html; charset=utf-8"),
+            "text/html; charset=utf-8",
+        )
+
+
+@override_settings(
+    FORM_STATE_CACHE_ENABLED=False,
+    UPSTREAM_SESSION_POOL_ENABLED=False,
+    RESERVATION_ATTEMPTS_ENABLED=False,
+    RESERVATION_PACING_MODE="fast",
+)
+class TranscriptRecorderTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeUpstream(latency=0)
+        self.url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.directory = directory.name
+        self.addCleanup(directory.cleanup)
+
+    def record_chain(self):
+        user = get_user_model()(pk=1, tckn="00000000001", third_party_app_password="x")
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        sport_selection = SportSelection(
+            pitch_id=self.fake.courts[0], complex_id=COMPLEX_MALTEPE_ID
+        )
+        slot = Slot(date_time=datetime(tomorrow.year, tomorrow.month, tomorrow.day, 10))
+        with override_settings(
+            UPSTREAM_BASE_URL=self.url, RESERVATION_TRANSCRIPT_DIR=self.directory
+        ):
+            runner = ReservationCommandRunner(
+                user,
+                Selection(sport_selection=sport_selection, slot=slot),
+                sport_selection,
+                commands=[
+                    LoginCommand(),
+                    FillFormCommand(),
+                    ResolveEventTargetCommand(),
+                    ReservationClickCommand(),
+                    ReservationChoiceCommand(),
+                    AddToCartCommand(),
+                ],
+            )
+            runner()
+        self.assertFalse(runner.is_failure)
+
+    def test_recorded_chain_holds_no_session_cookie_and_replays(self):
+        self.record_chain()
+
+        [name] = os.listdir(self.directory)
+        transcript = load_transcript(os.path.join(self.directory, name))
+        session_ids = list(self.fake.sessions)
+        for exchange in transcript["exchanges"]:
+            for name, value in exchange["headers"]:
+                self.assertFalse(any(session_id in value for session_id in session_ids))
+        set_cookies = [
+            value
+            for exchange in transcript["exchanges"]
+            for name, value in exchange["headers"]
+            if name.lower() == "set-cookie"
+        ]
+        self.assertEqual(set_cookies, [f"ASP.NET_SessionId={REDACTED}; path=/"])
+
+        with override_settings(
+            UPSTREAM_BASE_URL=self.url, RESERVATION_TRANSCRIPT_DIR=None
+        ):
+            runner = ReplayCommand.build_runner(transcript)
+            runner()
+        self.assertFalse(runner.is_failure)
+
+    def test_member_pages_are_left_out(self):
+        session = get_legacy_session()
+        recorder = TranscriptRecorder()
+        recorder.attach(session)
+        session.post(
+            f"{self.url}/uyegiris",
+            data={"txtTCPasaport": "00000000001", "txtSifre": "x"},
+        )
+        session.get(f"{self.url}/uyespor")
+        recorder.detach()
+
+        bodies = {
+            exchange["url"].replace(self.url, ""): exchange["body"]
+            for exchange in recorder.exchanges
+        }
+        self.assertEqual(bodies["/uyespor"], "")
+        self.assertIn("/anasayfa", bodies)
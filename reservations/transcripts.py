@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+import time
+from collections import deque
+from http.client import HTTPMessage
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Bodies are stored already decoded
+SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+REDACTED = "REDACTED"
+# Member pages other than the login form hold the member's personal data
+PUBLIC_MEMBER_PATHS = ("/uyegiris",)
+
+
+class TranscriptMismatchError(Exception):
+    pass
+
+
+def encode_body(content):
+    # Keeps the body readable in the fixture while surviving invalid UTF-8
+    return content.decode("utf-8", "surrogateescape")
+
+
+def decode_body(body):
+    return body.encode("utf-8", "surrogateescape")
+
+
+def redact_cookies(value):
+    return "; ".join(
+        f"{pair.partition('=')[0].strip()}={REDACTED}" for pair in value.split(";")
+    )
+
+
+def redact_header(name, value):
+    # The session and auth cookies keep their names, replayed chains send
+    # the redacted values back
+    name = name.lower()
+    if name == "set-cookie":
+        cookie, _, attributes = value.partition(";")
+        return redact_cookies(cookie) + (f";{attributes}" if attributes else "")
+    if name == "cookie":
+        return redact_cookies(value)
+    return value
+
+
+def is_personal_page(url):
+    path = urlparse(url).path.rstrip("/")
+    return path.startswith("/uye") and path not in PUBLIC_MEMBER_PATHS
+
+
+class TranscriptRecorder:
+    def __init__(self):
+        self.exchanges = []
+        self.session = None
+
+    def attach(self, session):
+        self.session = session
+        session.hooks["response"].append(self.record)
+
+    def detach(self):
+        if self.session is not None:
+            self.session.hooks["response"].remove(self.record)
+            self.session = None
+
+    def record(self, response, *args, **kwargs):
+        # Request bodies and headers are left out, they carry the credentials.
+        # Cookies and personal member pages are redacted from the responses.
+        original_response = getattr(response.raw, "_original_response", None)
+        headers = (
+            original_response.msg.items()
+            if original_response is not None
+            else response.headers.items()
+        )
+        self.exchanges.append(
+            {
+                "method": response.request.method,
+                "url": response.request.url,
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": [
+                    [name, redact_header(name, value)]
+                    for name, value in headers
+                    if name.lower() not in SKIPPED_HEADERS
+                ],
+                "body": ""
+                if is_personal_page(response.request.url)
+                else encode_body(response.content),
+            }
+        )
+
+    def save(self, runner_instance, directory):
+        self.detach()
+        selection = runner_instance.selection
+        meta = {
+            "court_selection": runner_instance.court_selection,
+            "complex_id": runner_instance.sport_selection.complex_id,
+            "slot_date_time": selection.slot.date_time.isoformat()
+            if selection
+            else None,
+            "commands": [timing["command"] for timing in runner_instance.step_timings],
+        }
+        path = os.path.join(
+            directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{runner_instance.court_selection}.json.gz",
+        )
+        with gzip.open(path, "wt", encoding="utf-8") as transcript_file:
+            json.dump({"meta": meta, "exchanges": self.exchanges}, transcript_file)
+        print(f"Recorded {len(self.exchanges)} exchanges to {path}")
+        return path
+
+
+def load_transcript(path):
+    with gzip.open(path, "rt", encoding="utf-8") as transcript_file:
+        return json.load(transcript_file)
+
+
+class ReplayAdapter(BaseAdapter):
+    # Serves recorded responses in order, without any network access
+    def __init__(self, exchanges):
+        super().__init__()
+        self.exchanges = deque(exchanges)
+
+    def send(self, request, **kwargs):
+        if not self.exchanges:
+            raise TranscriptMismatchError(
+                f"No recorded response left for {request.method} {request.url}"
+            )
+        exchange = self.exchanges.popleft()
+        if (exchange["method"], exchange["url"]) != (request.method, request.url):
+            raise TranscriptMismatchError(
+                f"Expected {exchange['method']} {exchange['url']}, "
+                f"got {request.method} {request.url}"
+            )
+
+        message = HTTPMessage()
+        for name, value in exchange["headers"]:
+            message.add_header(name, value)
+
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.reason = exchange["reason"]
+        response.headers = CaseInsensitiveDict(
+            {name: ", ".join(message.get_all(name)) for name in message.keys()}
+        )
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = decode_body(exchange["body"])
+        # What the session reads the Set-Cookie headers from
+        response.raw = SimpleNamespace(_original_response=SimpleNamespace(msg=message))
+        return response
+
+    def close(self):
+        pass
+
+
+def get_replay_session(transcript):
+    session = requests.session()
+    adapter = ReplayAdapter(transcript["exchanges"])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
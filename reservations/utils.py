@@ -1,7 +1,16 @@
+import asyncio
+import os
 import ssl
+import threading
+import weakref
+from functools import lru_cache
 
+import httpx
 import requests
 import urllib3
+from django.conf import settings
+
+from reservations.metrics import async_count_response, count_response
 
 
 class CustomHttpAdapter(requests.adapters.HTTPAdapter):
@@ -18,11 +27,99 @@ class CustomHttpAdapter(requests.adapters.HTTPAdapter):
         )
 
 
-def get_legacy_session():
+class SharedHttpAdapter(CustomHttpAdapter):
+    # Mounted on every legacy session of the process, closing one session must
+    # not close the sockets the others are using
+    def close(self):
+        pass
+
+
+_shared_adapter = None
+_shared_adapter_pid = None
+_shared_adapter_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_legacy_ssl_context():
     ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
     ctx.check_hostname = False
     ctx.verify_mode = ssl.CERT_NONE
     ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+    return ctx
+
+
+def get_shared_adapter():
+    global _shared_adapter, _shared_adapter_pid
+
+    # Keep-alive sockets are shared by the runners of a process, but never
+    # with the process it was forked from
+    with _shared_adapter_lock:
+        if _shared_adapter is None or _shared_adapter_pid != os.getpid():
+            _shared_adapter = SharedHttpAdapter(
+                get_legacy_ssl_context(),
+                pool_maxsize=settings.UPSTREAM_CONNECTION_POOL_SIZE,
+            )
+            _shared_adapter_pid = os.getpid()
+        return _shared_adapter
+
+
+def get_legacy_session():
+    # Cookie jars stay per session, connections are pooled per process
     session = requests.session()
-    session.mount("https://", CustomHttpAdapter(ctx))
+    if settings.UPSTREAM_CONNECTION_POOL_SHARED:
+        adapter = get_shared_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    else:
+        session.mount("https://", CustomHttpAdapter(get_legacy_ssl_context()))
+    session.hooks["response"].append(count_response)
     return session
+
+
+class LoopSharedTransport(httpx.AsyncBaseTransport):
+    # Hands the requests of every async client to the connection pool of the
+    # running event loop, closing one client must not close the sockets the
+    # others are using
+    def __init__(self):
+        self._pools = weakref.WeakKeyDictionary()
+
+    def get_pool(self):
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = self._pools[loop] = httpx.AsyncHTTPTransport(
+                verify=get_legacy_ssl_context(),
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=settings.UPSTREAM_CONNECTION_POOL_SIZE,
+                ),
+            )
+        return pool
+
+    async def handle_async_request(self, request):
+        return await self.get_pool().handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+    async def close_pool(self):
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+loop_shared_transport = LoopSharedTransport()
+
+
+def get_async_legacy_client(cookies=None):
+    # Cookie jars stay per client, connections are pooled per event loop
+    transport = (
+        loop_shared_transport if settings.UPSTREAM_CONNECTION_POOL_SHARED else None
+    )
+    return httpx.AsyncClient(
+        verify=get_legacy_ssl_context(),
+        cookies=cookies,
+        transport=transport,
+        follow_redirects=True,
+        event_hooks={"response": [async_count_response]},
+    )
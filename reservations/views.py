@@ -1,35 +1,108 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from selections.models import Selection, SportSelection
+from selections.models import SportSelection
 
-from .commands.base import (FillFormCommand, LoginCommand,
-                            RemoveFromBasketCommand, ReservationCommandRunner)
+from .commands.base import (LoginCommand, RemoveFromBasketCommand,
+                            ReservationCommandRunner)
 from .filters import StatusFilter
-from .helpers import show_slots
+from .helpers import (SlotFetchError, fetch_many_slots, fetch_slots,
+                      get_cached_slots, get_many_cached_slots)
+from .metrics import get_metrics
 from .models import Reservation, ReservationJob
 from .serializers import ReservationJobSerializer, ReservationSerializer
+from .slot_cache import slot_cache
+
+
+def is_metrics_scraper(request):
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS:
+        return True
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization, f"Bearer {settings.METRICS_TOKEN}"
+    )
+
+
+def metrics(request):
+    # Not linked from the API, the app serves it to the scraper only
+    if not is_metrics_scraper(request):
+        return HttpResponseForbidden()
+    content, content_type = get_metrics()
+    return HttpResponse(content, content_type=content_type)
 
 
 class ShowSlotsView(APIView):
     def get(self, request):
         court_selection = request.GET.get("court_selection")
         show_future_slots = bool(int(request.GET.get("sfs", 1)))
-        sport_selection = SportSelection.objects.get(pitch_id=court_selection)
-        selection = Selection.objects.filter(sport_selection=sport_selection).last()
-        runner = ReservationCommandRunner(
-            request.user,
-            selection,
-            sport_selection,
-            commands=[LoginCommand(), FillFormCommand()],
-            court_selection=court_selection,
+        if not settings.SLOT_CACHE_ENABLED:
+            data = fetch_slots(request.user, court_selection, show_future_slots)
+            return Response({**data, "snapshot_age": 0})
+
+        snapshot = get_cached_slots(request.user, court_selection, show_future_slots)
+        return Response(
+            {**snapshot["data"], "snapshot_age": round(slot_cache.get_age(snapshot))}
+        )
+
+
+class ShowManySlotsView(APIView):
+    def get(self, request):
+        court_selections = request.GET.get("court_selections")
+        complex_id = request.GET.get("complex_id")
+        if court_selections:
+            sport_selections = SportSelection.objects.filter(
+                pitch_id__in=court_selections.split(",")
+            )
+        elif complex_id:
+            sport_selections = SportSelection.objects.filter(complex_id=complex_id)
+        else:
+            return Response(
+                {"detail": "court_selections or complex_id is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        sport_selections = list(sport_selections)
+        if not sport_selections:
+            return Response({"courts": []})
+
+        show_future_slots = bool(int(request.GET.get("sfs", 1)))
+        try:
+            if not settings.SLOT_CACHE_ENABLED:
+                courts_data = fetch_many_slots(
+                    request.user, sport_selections, show_future_slots
+                )
+                return Response(
+                    {
+                        "courts": [
+                            {**data, "snapshot_age": 0} for data in courts_data.values()
+                        ]
+                    }
+                )
+
+            snapshots = get_many_cached_slots(
+                request.user, sport_selections, show_future_slots
+            )
+        except SlotFetchError as error:
+            return Response({"detail": str(error)}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(
+            {
+                "courts": [
+                    {
+                        **snapshot["data"],
+                        "snapshot_age": round(slot_cache.get_age(snapshot)),
+                    }
+                    for snapshot in snapshots
+                ]
+            }
         )
-        runner()
-        data = show_slots(runner.browser, show_future_slots=show_future_slots)
-        return Response(data)
 
 
 class ReservationViewSet(ModelViewSet):
@@ -51,6 +124,7 @@ class ReservationViewSet(ModelViewSet):
             reservation.selection.sport_selection,
             commands=[LoginCommand(), RemoveFromBasketCommand()],
             court_selection=None,
+            chain_type="remove-basket",
         )
         runner()
         reservation.status = Reservation.REMOVED_FROM_BASKET
@@ -70,3 +144,11 @@ class ReservationJobViewSet(ModelViewSet):
     def perform_create(self, serializer):
         user = self.request.user
         serializer.save(user=user, **self.request.data)
+
+    @action(methods=["POST"], detail=False, url_path="cancel")
+    def cancel(self, request, *args, **kwargs):
+        reservation_jobs = self.get_queryset().filter(
+            id__in=request.data.get("ids", []), status=ReservationJob.PENDING
+        )
+        cancelled = ReservationJob.cancel_many(reservation_jobs)
+        return Response({"status": "OK", "cancelled": cancelled})
@@ -0,0 +1,66 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("selections", "0002_auto_20221226_1706"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="slot",
+            options={"ordering": ("-date_time",)},
+        ),
+        migrations.CreateModel(
+            name="SlotAvailability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("date", models.DateField()),
+                ("hour", models.PositiveSmallIntegerField()),
+                (
+                    "status_code",
+                    models.CharField(
+                        choices=[
+                            ("AR", "ANOTHER_RESERVATION"),
+                            ("AB", "ANOTHER_BASKET"),
+                            ("NS", "NO_SLOTS"),
+                            ("WBA", "WILL_BE_AVAILABLE"),
+                            ("RV", "RESERVABLE"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "event_target",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("observed_at", models.DateTimeField()),
+                (
+                    "sport_selection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availabilities",
+                        to="selections.sportselection",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("date", "hour"),
+                "unique_together": {("sport_selection", "date", "hour")},
+            },
+        ),
+    ]
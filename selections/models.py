@@ -1,5 +1,7 @@
 from django.db import models
 
+from reservations.enums import StatusCode
+
 
 class TimestampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -83,3 +85,25 @@ class Selection(TimestampedModel):
 
     class Meta:
         ordering = ("id",)
+
+
+class SlotAvailability(TimestampedModel):
+    STATUS_CODE_CHOICES = tuple(
+        (status_code.value, status_code.name) for status_code in StatusCode
+    )
+
+    sport_selection = models.ForeignKey(
+        SportSelection, related_name="availabilities", on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    status_code = models.CharField(max_length=10, choices=STATUS_CODE_CHOICES)
+    event_target = models.CharField(max_length=255, null=True, blank=True)
+    observed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"<SlotAvailability> {self.sport_selection} {self.date} {self.hour}:00 {self.status_code}"
+
+    class Meta:
+        unique_together = ["sport_selection", "date", "hour"]
+        ordering = ("date", "hour")
@@ -2,7 +2,7 @@ from rest_framework import serializers as drf_serializers
 
 from reservations.models import ReservationJob
 
-from .models import Selection, Slot, SportSelection
+from .models import Selection, Slot, SlotAvailability, SportSelection
 
 
 class SportSelectionSerializer(drf_serializers.ModelSerializer):
@@ -40,3 +40,17 @@ class SelectionSerializer(drf_serializers.ModelSerializer):
             selection=selection, user=self.context["request"].user
         ).last()
         return rj.status if rj else ""
+
+
+class SlotAvailabilitySerializer(drf_serializers.ModelSerializer):
+    class Meta:
+        model = SlotAvailability
+        fields = (
+            "id",
+            "sport_selection",
+            "date",
+            "hour",
+            "status_code",
+            "event_target",
+            "observed_at",
+        )
@@ -1,8 +1,9 @@
-from rest_framework.viewsets import ModelViewSet
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from .models import Selection, Slot, SportSelection
-from .serializers import (SelectionSerializer, SlotSerializer,
-                          SportSelectionSerializer)
+from .models import Selection, Slot, SlotAvailability, SportSelection
+from .serializers import (SelectionSerializer, SlotAvailabilitySerializer,
+                          SlotSerializer, SportSelectionSerializer)
 
 
 class SelectionViewSet(ModelViewSet):
@@ -18,3 +19,10 @@ class SlotViewSet(ModelViewSet):
 class SportSelectionViewSet(ModelViewSet):
     queryset = SportSelection.objects.all()
     serializer_class = SportSelectionSerializer
+
+
+class SlotAvailabilityViewSet(ReadOnlyModelViewSet):
+    queryset = SlotAvailability.objects.all()
+    serializer_class = SlotAvailabilitySerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["sport_selection", "date", "hour", "status_code"]